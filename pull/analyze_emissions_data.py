@@ -4,18 +4,31 @@ Scans products-data directory to find what impact and resource data is available
 """
 import yaml
 import os
+import sys
 import json
+import hashlib
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Use the libyaml C loader when PyYAML was built with it (several times faster than pure Python)
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def load_yaml(yaml_file_path):
+    """Load a YAML file with the fastest available safe loader"""
+    with open(yaml_file_path, 'r') as f:
+        return yaml.load(f, Loader=YamlLoader)
 
 def analyze_epd_file(yaml_file_path):
     """Analyze a single EPD file for impact categories and resource data"""
     try:
-        with open(yaml_file_path, 'r') as f:
-            epd = yaml.safe_load(f)
+        epd = load_yaml(yaml_file_path)
+        return analyze_epd(epd, yaml_file_path)
     except Exception as e:
         return {'error': str(e)}
-    
+
+def analyze_epd(epd, yaml_file_path):
+    """Analyze a loaded EPD for impact categories and resource data"""
     analysis = {
         'file_path': str(yaml_file_path),
         'has_gwp': 'gwp' in epd and epd.get('gwp') is not None,
@@ -71,32 +84,152 @@ def analyze_epd_file(yaml_file_path):
     
     return analysis
 
-def scan_all_epds(max_files=None):
-    """Scan all EPD files to find which have impact/resource data"""
-    base_path = Path("../../products-data")
-    
-    stats = {
+def _coverage_counts():
+    return {'total': 0, 'with_gwp': 0, 'with_impacts': 0, 'with_resources': 0}
+
+def new_stats():
+    """Empty aggregate stats as returned by scan_all_epds"""
+    return {
         'total_epds': 0,
         'with_gwp': 0,
         'with_impacts': 0,
         'with_resource_uses': 0,
         'impact_categories_found': defaultdict(int),
         'resource_types_found': defaultdict(int),
-        'by_country': defaultdict(lambda: {'total': 0, 'with_gwp': 0, 'with_impacts': 0, 'with_resources': 0}),
-        'by_category': defaultdict(lambda: {'total': 0, 'with_gwp': 0, 'with_impacts': 0, 'with_resources': 0}),
+        'by_country': defaultdict(_coverage_counts),
+        'by_category': defaultdict(_coverage_counts),
         'gwp_fields_found': defaultdict(int),
         'sample_epds_with_impacts': [],
         'sample_epds_with_resources': []
     }
+
+def add_analysis(stats, analysis, yaml_file):
+    """Add one analyze_epd_file result to the aggregate stats"""
+    stats['total_epds'] += 1
     
-    # Scan all YAML files
-    yaml_files = list(base_path.rglob("*.yaml"))
-    print(f"Found {len(yaml_files)} EPD files to analyze...")
+    if analysis['has_gwp']:
+        stats['with_gwp'] += 1
+        for field in analysis['gwp_fields'].keys():
+            stats['gwp_fields_found'][field] += 1
     
-    if max_files:
-        yaml_files = yaml_files[:max_files]
-        print(f"Limiting analysis to first {max_files} files for initial scan...")
+    if analysis['has_impacts']:
+        stats['with_impacts'] += 1
+        for key in analysis['impacts_keys']:
+            stats['impact_categories_found'][key] += 1
+        # Save sample EPDs with impacts
+        if len(stats['sample_epds_with_impacts']) < 5:
+            stats['sample_epds_with_impacts'].append({
+                'file': str(yaml_file),
+                'epd_id': analysis['epd_id'],
+                'category': analysis['category'],
+                'impacts': analysis['impact_values']
+            })
+    
+    if analysis['has_resource_uses']:
+        stats['with_resource_uses'] += 1
+        for key in analysis['resource_uses_keys']:
+            stats['resource_types_found'][key] += 1
+        # Save sample EPDs with resources
+        if len(stats['sample_epds_with_resources']) < 5:
+            stats['sample_epds_with_resources'].append({
+                'file': str(yaml_file),
+                'epd_id': analysis['epd_id'],
+                'category': analysis['category'],
+                'resource_uses': analysis['resource_values']
+            })
+    
+    if analysis['country']:
+        stats['by_country'][analysis['country']]['total'] += 1
+        if analysis['has_gwp']:
+            stats['by_country'][analysis['country']]['with_gwp'] += 1
+        if analysis['has_impacts']:
+            stats['by_country'][analysis['country']]['with_impacts'] += 1
+        if analysis['has_resource_uses']:
+            stats['by_country'][analysis['country']]['with_resources'] += 1
     
+    stats['by_category'][analysis['category']]['total'] += 1
+    if analysis['has_gwp']:
+        stats['by_category'][analysis['category']]['with_gwp'] += 1
+    if analysis['has_impacts']:
+        stats['by_category'][analysis['category']]['with_impacts'] += 1
+    if analysis['has_resource_uses']:
+        stats['by_category'][analysis['category']]['with_resources'] += 1
+
+def remove_analysis(stats, analysis, yaml_file):
+    """Subtract one analyze_epd_file result from the aggregate stats (file changed or deleted)"""
+    def decrement(counts, key):
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+
+    stats['total_epds'] -= 1
+    
+    if analysis['has_gwp']:
+        stats['with_gwp'] -= 1
+        for field in analysis['gwp_fields'].keys():
+            decrement(stats['gwp_fields_found'], field)
+    
+    if analysis['has_impacts']:
+        stats['with_impacts'] -= 1
+        for key in analysis['impacts_keys']:
+            decrement(stats['impact_categories_found'], key)
+    
+    if analysis['has_resource_uses']:
+        stats['with_resource_uses'] -= 1
+        for key in analysis['resource_uses_keys']:
+            decrement(stats['resource_types_found'], key)
+    
+    groups = [('by_category', analysis['category'])]
+    if analysis['country']:
+        groups.append(('by_country', analysis['country']))
+    for key, name in groups:
+        counts = stats[key][name]
+        counts['total'] -= 1
+        if analysis['has_gwp']:
+            counts['with_gwp'] -= 1
+        if analysis['has_impacts']:
+            counts['with_impacts'] -= 1
+        if analysis['has_resource_uses']:
+            counts['with_resources'] -= 1
+        if counts['total'] <= 0:
+            del stats[key][name]
+    
+    for key in ('sample_epds_with_impacts', 'sample_epds_with_resources'):
+        stats[key] = [sample for sample in stats[key] if sample['file'] != str(yaml_file)]
+
+def merge_stats(stats, partial):
+    """Merge partial stats (e.g. from a worker process) into stats"""
+    for key in ('total_epds', 'with_gwp', 'with_impacts', 'with_resource_uses'):
+        stats[key] += partial[key]
+    for key in ('impact_categories_found', 'resource_types_found', 'gwp_fields_found'):
+        for name, count in partial[key].items():
+            stats[key][name] += count
+    for key in ('by_country', 'by_category'):
+        for name, counts in partial[key].items():
+            for field, count in counts.items():
+                stats[key][name][field] += count
+    for key in ('sample_epds_with_impacts', 'sample_epds_with_resources'):
+        room = 5 - len(stats[key])
+        if room > 0:
+            stats[key].extend(partial[key][:room])
+    return stats
+
+def stats_from_plain(plain):
+    """Inverse of stats_to_plain: restore defaultdicts so stats can be updated"""
+    return merge_stats(new_stats(), plain)
+
+def stats_to_plain(stats):
+    """Convert defaultdicts to plain dicts so stats can be pickled or saved as JSON"""
+    plain = dict(stats)
+    for key in ('impact_categories_found', 'resource_types_found', 'gwp_fields_found'):
+        plain[key] = dict(stats[key])
+    for key in ('by_country', 'by_category'):
+        plain[key] = {name: dict(counts) for name, counts in stats[key].items()}
+    return plain
+
+def scan_files(yaml_files):
+    """Analyze a list of EPD files serially and return aggregate stats"""
+    stats = new_stats()
     for yaml_file in yaml_files:
         try:
             analysis = analyze_epd_file(yaml_file)
@@ -104,61 +237,196 @@ def scan_all_epds(max_files=None):
             if 'error' in analysis:
                 continue
             
-            stats['total_epds'] += 1
-            
-            if analysis['has_gwp']:
-                stats['with_gwp'] += 1
-                for field in analysis['gwp_fields'].keys():
-                    stats['gwp_fields_found'][field] += 1
-            
-            if analysis['has_impacts']:
-                stats['with_impacts'] += 1
-                for key in analysis['impacts_keys']:
-                    stats['impact_categories_found'][key] += 1
-                # Save sample EPDs with impacts
-                if len(stats['sample_epds_with_impacts']) < 5:
-                    stats['sample_epds_with_impacts'].append({
-                        'file': str(yaml_file),
-                        'epd_id': analysis['epd_id'],
-                        'category': analysis['category'],
-                        'impacts': analysis['impact_values']
-                    })
-            
-            if analysis['has_resource_uses']:
-                stats['with_resource_uses'] += 1
-                for key in analysis['resource_uses_keys']:
-                    stats['resource_types_found'][key] += 1
-                # Save sample EPDs with resources
-                if len(stats['sample_epds_with_resources']) < 5:
-                    stats['sample_epds_with_resources'].append({
-                        'file': str(yaml_file),
-                        'epd_id': analysis['epd_id'],
-                        'category': analysis['category'],
-                        'resource_uses': analysis['resource_values']
-                    })
-            
-            if analysis['country']:
-                stats['by_country'][analysis['country']]['total'] += 1
-                if analysis['has_gwp']:
-                    stats['by_country'][analysis['country']]['with_gwp'] += 1
-                if analysis['has_impacts']:
-                    stats['by_country'][analysis['country']]['with_impacts'] += 1
-                if analysis['has_resource_uses']:
-                    stats['by_country'][analysis['country']]['with_resources'] += 1
-            
-            stats['by_category'][analysis['category']]['total'] += 1
-            if analysis['has_gwp']:
-                stats['by_category'][analysis['category']]['with_gwp'] += 1
-            if analysis['has_impacts']:
-                stats['by_category'][analysis['category']]['with_impacts'] += 1
-            if analysis['has_resource_uses']:
-                stats['by_category'][analysis['category']]['with_resources'] += 1
+            add_analysis(stats, analysis, yaml_file)
                 
         except Exception as e:
             print(f"Error analyzing {yaml_file}: {e}")
+    return stats
+
+def _scan_shard(yaml_files):
+    """Process pool worker: returns picklable partial stats for one shard of files"""
+    return stats_to_plain(scan_files(yaml_files))
+
+def scan_all_epds(max_files=None, workers=None, base_path="../../products-data"):
+    """
+    Scan all EPD files to find which have impact/resource data.
+    
+    Args:
+        max_files: Optional limit on the number of files analyzed
+        workers: Number of worker processes (default: all CPU cores; 1 scans serially)
+        base_path: Root of the products-data tree
+    """
+    base_path = Path(base_path)
+    
+    # Scan all YAML files (EPDs live in region/category folders; top-level files are shared tables)
+    yaml_files = list(base_path.rglob("*/*.yaml"))
+    print(f"Found {len(yaml_files)} EPD files to analyze...")
+    
+    if max_files:
+        yaml_files = yaml_files[:max_files]
+        print(f"Limiting analysis to first {max_files} files for initial scan...")
     
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(yaml_files) < 200:
+        return scan_files(yaml_files)
+    
+    # Several shards per worker keeps all cores busy when some folders parse slower than others.
+    # Shards are merged in file order, so samples match a serial scan.
+    shard_count = min(len(yaml_files), workers * 4)
+    shard_size = -(-len(yaml_files) // shard_count)
+    shards = [yaml_files[i:i + shard_size] for i in range(0, len(yaml_files), shard_size)]
+    print(f"Scanning with {workers} worker processes ({len(shards)} shards)...")
+    
+    stats = new_stats()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(_scan_shard, shards):
+            merge_stats(stats, partial)
     return stats
 
+ANALYSIS_CACHE_FILE = "emissions_analysis_cache.json"
+ANALYSIS_CACHE_VERSION = 1
+
+def _file_sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+def analyze_file_with_hash(yaml_file_path):
+    """Read a file once, hash it and analyze it. Returns (path, sha1, analysis)"""
+    try:
+        with open(yaml_file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return str(yaml_file_path), None, {'error': str(e)}
+    try:
+        analysis = analyze_epd(yaml.load(data, Loader=YamlLoader), yaml_file_path)
+    except Exception as e:
+        analysis = {'error': str(e)}
+    return str(yaml_file_path), _file_sha1(data), analysis
+
+def _analyze_shard(yaml_files):
+    """Process pool worker: per-file analyses for one shard of files"""
+    return [analyze_file_with_hash(yaml_file) for yaml_file in yaml_files]
+
+def load_analysis_cache(cache_file):
+    """Load the per-file analysis cache, or return an empty one"""
+    try:
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+        if cache.get('version') == ANALYSIS_CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return _empty_cache()
+
+def _empty_cache():
+    return {'version': ANALYSIS_CACHE_VERSION, 'files': {}, 'stats': stats_to_plain(new_stats())}
+
+def save_analysis_cache(cache, cache_file):
+    """Write the cache atomically so an interrupted run never leaves a truncated file"""
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, cache_file)
+
+def scan_incremental(cache_file=ANALYSIS_CACHE_FILE, workers=None, base_path="../../products-data"):
+    """
+    Scan EPD files, re-parsing only files that changed since the cached run.
+    
+    Files are matched by path, mtime and size; when only the mtime changed the content
+    hash decides. Aggregates of changed and deleted files are subtracted from the cached
+    stats and the new analyses added, so a small delta pull costs a small rescan.
+    
+    Returns:
+        (stats, summary) where summary counts unchanged, changed, added and deleted files
+    """
+    cache = load_analysis_cache(cache_file)
+    if cache.get('base_path') != str(base_path):
+        # Cached entries for a different tree are useless
+        cache = _empty_cache()
+        cache['base_path'] = str(base_path)
+    entries = cache['files']
+    stats = stats_from_plain(cache['stats'])
+    
+    yaml_files = sorted(str(p) for p in Path(base_path).rglob("*/*.yaml"))
+    print(f"Found {len(yaml_files)} EPD files to analyze...")
+    
+    summary = {'unchanged': 0, 'changed': 0, 'added': 0, 'deleted': 0}
+    to_parse = []
+    current = {}
+    for path in yaml_files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        current[path] = (st.st_mtime_ns, st.st_size)
+        entry = entries.get(path)
+        if entry is None:
+            summary['added'] += 1
+            to_parse.append(path)
+        elif entry['mtime'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            summary['unchanged'] += 1
+        elif entry['size'] == st.st_size and entry.get('sha1'):
+            # Touched but possibly not modified (e.g. a fresh checkout); compare content
+            with open(path, 'rb') as f:
+                if _file_sha1(f.read()) == entry['sha1']:
+                    entry['mtime'] = st.st_mtime_ns
+                    summary['unchanged'] += 1
+                    continue
+            summary['changed'] += 1
+            to_parse.append(path)
+        else:
+            summary['changed'] += 1
+            to_parse.append(path)
+    
+    # Subtract aggregates of deleted and changed files
+    deleted = [path for path in entries if path not in current]
+    summary['deleted'] = len(deleted)
+    for path in deleted + to_parse:
+        entry = entries.pop(path, None)
+        if entry and 'error' not in entry['analysis']:
+            remove_analysis(stats, entry['analysis'], path)
+    
+    # Re-analyze new and changed files, in parallel when there are many
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(to_parse) < 200:
+        results = _analyze_shard(to_parse)
+    else:
+        shard_size = -(-len(to_parse) // (workers * 4))
+        shards = [to_parse[i:i + shard_size] for i in range(0, len(to_parse), shard_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = [result for shard in executor.map(_analyze_shard, shards) for result in shard]
+    
+    for path, sha1, analysis in results:
+        mtime, size = current[path]
+        entries[path] = {'mtime': mtime, 'size': size, 'sha1': sha1, 'analysis': analysis}
+        if 'error' not in analysis:
+            add_analysis(stats, analysis, path)
+    
+    # Refill samples that were dropped with changed or deleted files
+    for key, flag, values_key, field in (
+        ('sample_epds_with_impacts', 'has_impacts', 'impact_values', 'impacts'),
+        ('sample_epds_with_resources', 'has_resource_uses', 'resource_values', 'resource_uses'),
+    ):
+        if len(stats[key]) >= 5:
+            continue
+        sampled = {sample['file'] for sample in stats[key]}
+        for path, entry in entries.items():
+            if len(stats[key]) >= 5:
+                break
+            analysis = entry['analysis']
+            if analysis.get(flag) and path not in sampled:
+                stats[key].append({
+                    'file': path,
+                    'epd_id': analysis['epd_id'],
+                    'category': analysis['category'],
+                    field: analysis[values_key]
+                })
+    
+    cache['stats'] = stats_to_plain(stats)
+    save_analysis_cache(cache, cache_file)
+    print(f"Incremental scan: {summary['unchanged']} unchanged, {summary['changed']} changed, "
+          f"{summary['added']} added, {summary['deleted']} deleted")
+    return stats, summary
+
 def print_report(stats):
     """Print analysis report"""
     print("\n" + "="*70)
@@ -245,7 +513,6 @@ def print_report(stats):
 
 def save_report_to_file(stats, output_file="emissions_analysis_report.txt"):
     """Save report to file"""
-    import sys
     original_stdout = sys.stdout
     with open(output_file, 'w') as f:
         sys.stdout = f
@@ -258,8 +525,12 @@ if __name__ == "__main__":
     print("Starting EPD Emissions Data Analysis")
     print("="*70)
     
-    # Limit to first 500 files for initial scan (can be increased)
-    stats = scan_all_epds(max_files=500)
+    # Full tree, sharded across all CPU cores. Unchanged files are read from the
+    # analysis cache unless --no-cache is given.
+    if '--no-cache' in sys.argv:
+        stats = scan_all_epds()
+    else:
+        stats, _ = scan_incremental()
     print_report(stats)
     
     # Save report to file
@@ -0,0 +1,217 @@
+"""
+Microbenchmarks for the per-record processing functions of product-footprints.py.
+
+Each benchmark runs over seeded synthetic EPDs (synthetic_epds.py) at several sizes; the best of
+--repeat runs is kept. Results are written as JSON and compared with a stored baseline: a benchmark
+that got slower than the baseline by more than --threshold is reported as a regression and the
+script exits with status 1.
+
+The write benchmarks use the script's own ../../products-data paths, so everything runs inside a
+temporary folder and nothing is written next to the real outputs.
+
+Usage:
+    python benchmark.py                                  # 1k, 10k and 100k records
+    python benchmark.py --sizes 1000 10000 --repeat 5
+    python benchmark.py --only map_response yaml_dump
+    python benchmark.py --save-baseline                  # store this run as the baseline
+"""
+import argparse
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import yaml
+
+from dimensions import NoAliasDumper
+from merge_impact_data import extract_lcia_categories, merge_impact_data
+from synthetic_epds import generate_epds, openepd_counterpart
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25  # fail when more than 25% slower than the baseline
+REPEAT_BUDGET_SECONDS = 20  # stop repeating a benchmark once its runs took this long (yaml_dump at 100k)
+CSV_REGION = 'US-GA'      # no tariff table: state and cement CSVs only
+TARIFF_REGION = 'IN'      # has a tariff table: every record is classified
+
+def load_product_footprints():
+    """Import product-footprints.py (hyphenated name) as a module"""
+    if PULL_DIR not in sys.path:
+        sys.path.insert(0, PULL_DIR)
+    spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def clear_outputs():
+    """Remove what the write benchmarks created (paths relative to the working folder)"""
+    for path in ("../../products-data", "../../profile"):
+        shutil.rmtree(path, ignore_errors=True)
+
+def build_benchmarks(pf):
+    """
+    name -> (prepare, run). prepare(raw_epds) builds the input once per size (untimed);
+    run(data) is the timed call. Benchmarks that write files clear the outputs before each run.
+    """
+    def yaml_dump(epds):
+        # Same call as YamlSink, into memory so only serialization is timed
+        for epd in epds:
+            yaml.dump(epd, io.StringIO(), Dumper=NoAliasDumper, default_flow_style=False)
+
+    return {
+        'remove_null_values': (lambda raw: raw,
+                               lambda raw: [pf.remove_null_values(epd) for epd in raw]),
+        'map_response': (lambda raw: [pf.remove_null_values(epd) for epd in raw],
+                         lambda epds: [pf.map_response(epd) for epd in epds]),
+        'merge_impact_data': (lambda raw: [(pf.remove_null_values(epd), openepd_counterpart(epd)) for epd in raw],
+                              lambda pairs: [merge_impact_data(epd, other) for epd, other in pairs]),
+        'extract_lcia_categories': (lambda raw: [pf.remove_null_values(epd) for epd in raw],
+                                    lambda epds: [extract_lcia_categories(epd) for epd in epds]),
+        'yaml_dump': (lambda raw: [pf.remove_null_values(epd) for epd in raw], yaml_dump),
+        'write_epd_to_csv': (lambda raw: [pf.map_response(pf.remove_null_values(epd)) for epd in raw],
+                             lambda mapped: pf.write_epd_to_csv(mapped, CSV_REGION)),
+        'write_products_csv': (lambda raw: [pf.remove_null_values(epd) for epd in raw],
+                               lambda epds: pf.write_products_csv(epds, TARIFF_REGION)),
+    }
+
+WRITE_BENCHMARKS = {'write_epd_to_csv', 'write_products_csv'}
+
+def time_call(run, data, repeat, setup=None):
+    """
+    Best wall time of up to `repeat` calls of run(data), in seconds.
+    Returns: (best seconds, runs made); runs stop early once REPEAT_BUDGET_SECONDS is spent.
+    """
+    best, spent, runs = float('inf'), 0.0, 0
+    while runs < repeat and (runs == 0 or spent < REPEAT_BUDGET_SECONDS):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(data)
+        elapsed = time.perf_counter() - start
+        best, spent, runs = min(best, elapsed), spent + elapsed, runs + 1
+    return best, runs
+
+def run_benchmarks(sizes, repeat=DEFAULT_REPEAT, seed=0, only=None):
+    """
+    Run the benchmarks in a temporary folder.
+
+    Args:
+        sizes: Record counts to run each benchmark at
+        repeat: Runs per benchmark and size (the fastest is kept, see REPEAT_BUDGET_SECONDS)
+        seed: Synthetic EPD seed
+        only: Optional list of benchmark names
+    Returns:
+        Results dict (as saved to RESULTS_FILE)
+    """
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'seed': seed,
+        'repeat': repeat,
+        'benchmarks': {},
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        workdir = os.path.join(root, 'a', 'b')
+        os.makedirs(workdir)
+        os.chdir(workdir)
+        try:
+            pf = load_product_footprints()
+            benchmarks = build_benchmarks(pf)
+            names = only or list(benchmarks)
+            unknown = set(names) - set(benchmarks)
+            if unknown:
+                raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+            for size in sizes:
+                raw = generate_epds(size, seed)
+                print(f"\n{size} records:", flush=True)
+                for name in names:
+                    prepare, run = benchmarks[name]
+                    data = prepare(raw)
+                    seconds, runs = time_call(run, data, repeat, clear_outputs if name in WRITE_BENCHMARKS else None)
+                    results['benchmarks'].setdefault(name, {})[str(size)] = {
+                        'seconds': round(seconds, 6),
+                        'us_per_record': round(seconds / size * 1e6, 3),
+                        'runs': runs,
+                    }
+                    print(f"  {name:<26}{seconds:>10.4f} s{seconds / size * 1e6:>10.1f} µs/record", flush=True)
+                    del data
+                clear_outputs()
+        finally:
+            os.chdir(cwd)
+    return results
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare a run with the baseline, for every benchmark and size present in both.
+    Returns: list of (name, size, baseline seconds, seconds, ratio, regressed)
+    """
+    rows = []
+    for name, by_size in results['benchmarks'].items():
+        for size, current in by_size.items():
+            reference = baseline.get('benchmarks', {}).get(name, {}).get(size)
+            if not reference or not reference['seconds']:
+                continue
+            ratio = current['seconds'] / reference['seconds']
+            rows.append((name, int(size), reference['seconds'], current['seconds'], ratio, ratio > 1 + threshold))
+    return rows
+
+def format_comparison(rows):
+    lines = [f"{'Benchmark':<26}{'Records':>9}{'Baseline':>11}{'Now':>11}{'Ratio':>8}"]
+    for name, size, reference, seconds, ratio, regressed in rows:
+        mark = '✗' if regressed else '✓'
+        lines.append(f"{name:<26}{size:>9}{reference:>10.4f}s{seconds:>10.4f}s{ratio:>7.2f}x {mark}")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EPD processing functions on synthetic records")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Record counts")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Runs per benchmark (best kept)")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic EPD seed")
+    parser.add_argument('--only', nargs='+', help="Benchmarks to run (default: all)")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Results JSON")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline JSON to compare with")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Also store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"\n✓ Results saved to: {args.output}", flush=True)
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"✓ Baseline saved to: {args.baseline}", flush=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"⚠ No baseline at {args.baseline}; run with --save-baseline to store one", flush=True)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare_results(results, baseline, args.threshold)
+    print(f"\nCompared with {args.baseline} ({baseline.get('created_at', 'unknown date')}, "
+          f"threshold {args.threshold:.0%}):", flush=True)
+    print(format_comparison(rows), flush=True)
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) slower than the baseline", flush=True)
+        return 1
+    print("✓ No regressions", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
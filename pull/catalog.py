@@ -0,0 +1,108 @@
+"""
+Helpers for reading the pulled catalog (the products-data YAML tree).
+Shared by the stats, index and query tools so they parse EPDs the same way.
+"""
+import os
+import re
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze_emissions_data import load_yaml
+from dimensions import expand_references, load_reference_tables
+
+DEFAULT_BASE_PATH = "../../products-data"
+
+_QUANTITY_RE = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+def parse_quantity(value):
+    """
+    Parse the numeric part of an EC3 quantity string.
+    "53.38 kgCO2e" -> 53.38, 12 -> 12.0, None or unparseable -> None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _QUANTITY_RE.match(str(value))
+    return float(match.group(1)) if match else None
+
+def quantity_unit(value):
+    """Return the unit part of an EC3 quantity string ("53.38 kgCO2e" -> "kgCO2e")"""
+    if not isinstance(value, str):
+        return None
+    match = _QUANTITY_RE.match(value)
+    unit = value[match.end():].strip() if match else ''
+    return unit or None
+
+def epd_country(epd):
+    """Country code of the EPD's plant, e.g. 'US'"""
+    plant = epd.get('plant_or_group') or {}
+    manufacturer = epd.get('manufacturer') or {}
+    return plant.get('country') or manufacturer.get('country')
+
+def epd_state(epd):
+    """State/region code of the EPD's plant in the pull's format, e.g. 'US-GA', or None"""
+    plant = epd.get('plant_or_group') or {}
+    country = epd_country(epd)
+    district = plant.get('admin_district')
+    if not (country and district):
+        return None
+    return district if district.startswith(f"{country}-") else f"{country}-{district}"
+
+def iter_epd_files(base_path=DEFAULT_BASE_PATH):
+    """Yield paths of all EPD YAML files under base_path (top-level files are shared tables, not EPDs)"""
+    return (str(path) for path in Path(base_path).rglob("*/*.yaml"))
+
+def scan_changes(known_mtimes, base_path=DEFAULT_BASE_PATH):
+    """
+    Compare the catalog with previously indexed files.
+
+    Args:
+        known_mtimes: Dict of path -> st_mtime_ns recorded when the file was last indexed
+
+    Returns:
+        (changed, removed, unchanged_count) where changed is a list of (path, mtime) for
+        new or modified files and removed lists indexed paths that no longer exist
+    """
+    changed = []
+    seen = set()
+    unchanged = 0
+    for path in iter_epd_files(base_path):
+        seen.add(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        if known_mtimes.get(path) == mtime:
+            unchanged += 1
+        else:
+            changed.append((path, mtime))
+    removed = [path for path in known_mtimes if path not in seen]
+    return changed, removed, unchanged
+
+def _load_one(path):
+    try:
+        epd = load_yaml(path)
+    except Exception:
+        return path, None
+    return path, epd if isinstance(epd, dict) else None
+
+def iter_epds(base_path=DEFAULT_BASE_PATH, workers=None):
+    """
+    Yield (path, epd) for every parseable EPD file under base_path.
+    Files are parsed across a process pool unless workers == 1.
+    Category references (see dimensions.py) are expanded from the tables in base_path.
+    """
+    paths = list(iter_epd_files(base_path))
+    tables = load_reference_tables(base_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 200:
+        results = map(_load_one, paths)
+        for path, epd in results:
+            if epd is not None:
+                yield path, expand_references(epd, tables)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, epd in executor.map(_load_one, paths, chunksize=64):
+            if epd is not None:
+                yield path, expand_references(epd, tables)
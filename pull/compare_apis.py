@@ -1,12 +1,37 @@
 """
 Script to compare EC3 API and openEPD API responses for the same EPD.
 Helps determine which API has more complete impact and resource data.
+
+Bulk mode diffs two full snapshots (JSON, NDJSON or a products-data directory of EPD YAML files)
+instead of sampling a few records:
+
+    python compare_apis.py --fetch-snapshot ec3 --output ec3_snapshot.ndjson
+    python compare_apis.py --fetch-snapshot openepd --output openepd_snapshot.ndjson
+    python compare_apis.py --bulk ec3_snapshot.ndjson openepd_snapshot.ndjson
+    python compare_apis.py --bulk ../../products-data openepd_snapshot.ndjson
 """
+import argparse
+import csv
+import gzip
+import math
+import os
+import time
+from pathlib import Path
+
 import requests
 import json
 import yaml
+
+from catalog import iter_epd_files, parse_quantity
+from dimensions import expand_references, load_reference_tables
 from myconfig import email, password
 
+EC3_EPDS_URL = "https://buildingtransparency.org/api/epds"
+OPENEPD_EPDS_URL = "https://openepd.buildingtransparency.org/api/epds"
+ID_FIELDS = ('id', 'material_id', 'open_xpd_uuid')  # join keys, in priority order
+DIFF_SECTIONS = ('gwp', 'impacts', 'resource_uses')
+REL_TOLERANCE = 1e-6  # numeric values closer than this (relative) count as equal
+
 def get_auth():
     """Get authentication token"""
     url_auth = "https://buildingtransparency.org/api/rest-auth/login"
@@ -260,7 +285,294 @@ def save_comparison_results(results, filename="api_comparison_results.json"):
         json.dump(results, f, indent=2)
     print(f"\n✓ Comparison results saved to: {filename}")
 
+def fetch_snapshot(api_url, authorization, output, params=None, page_size=250, max_retries=3):
+    """
+    Page through an EPD listing endpoint and write every record to an NDJSON snapshot.
+
+    Returns:
+        Number of records written
+    """
+    headers = {"accept": "application/json", "Authorization": authorization}
+    written = 0
+    page = 1
+    total_pages = None
+    with open(output, 'w') as f:
+        while total_pages is None or page <= total_pages:
+            query = dict(params or {}, page_size=page_size, page_number=page)
+            for attempt in range(max_retries):
+                try:
+                    response = requests.get(api_url, headers=headers, params=query, timeout=60)
+                except requests.exceptions.RequestException as e:
+                    print(f"  Page {page} failed ({e}), retrying", flush=True)
+                    time.sleep(2 ** attempt + 1)
+                    continue
+                if response.status_code == 429:
+                    time.sleep(2 ** attempt + 5)
+                    continue
+                break
+            else:
+                print(f"✗ Giving up on page {page}", flush=True)
+                break
+            if response.status_code != 200:
+                print(f"✗ Page {page} returned status {response.status_code}", flush=True)
+                break
+            epds = response.json()
+            for epd in epds:
+                f.write(json.dumps(epd) + "\n")
+            written += len(epds)
+            if total_pages is None:
+                total_pages = int(response.headers.get('X-Total-Pages', 0)) or math.inf
+            print(f"  Page {page}/{total_pages}: {written} records", flush=True)
+            if len(epds) < page_size:
+                break
+            page += 1
+            time.sleep(0.5)
+    return written
+
+def _load_snapshot_file(path):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        name = str(path).removesuffix('.gz')
+        if name.endswith(('.yaml', '.yml')):
+            data = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        elif name.endswith(('.ndjson', '.jsonl')):
+            return [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        for key in ('epds', 'results', 'data'):
+            if isinstance(data.get(key), list):
+                return data[key]
+        return [data]
+    return data if isinstance(data, list) else []
+
+def load_snapshot(path):
+    """
+    Load EPD records from a snapshot: a JSON list or NDJSON file (may be gzipped), or a directory
+    laid out like products-data. In a directory only the EPD files are read (catalog.iter_epd_files,
+    <folder>/<id>.yaml); top-level tables, manifests and summaries are not EPDs.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return [r for r in _load_snapshot_file(path) if isinstance(r, dict)]
+    records = []
+    tables = load_reference_tables(path)
+    for file in sorted(iter_epd_files(path)):
+        try:
+            records.extend(expand_references(r, tables) for r in _load_snapshot_file(file) if isinstance(r, dict))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"  ⚠ Skipping {file}: {e}", flush=True)
+    return records
+
+def hash_join(ec3_records, openepd_records):
+    """
+    Pair EC3 and openEPD records that share any ID field.
+    One hash table per ID field over the openEPD side; each EC3 record probes them in
+    ID_FIELDS order, so matching is linear in the total number of records.
+
+    Returns:
+        (pairs, ec3_only, openepd_only, matched_by) where pairs is a list of
+        (ec3_record, openepd_record) and matched_by counts pairs per ID field
+    """
+    tables = {field: {} for field in ID_FIELDS}
+    for i, record in enumerate(openepd_records):
+        for field in ID_FIELDS:
+            value = record.get(field)
+            if value:
+                tables[field].setdefault(value, i)
+
+    pairs = []
+    ec3_only = []
+    matched = set()
+    matched_by = {field: 0 for field in ID_FIELDS}
+    for record in ec3_records:
+        for field in ID_FIELDS:
+            # openEPD's own id is EC3's open_xpd_uuid, so also probe the id table
+            value = record.get(field)
+            i = tables[field].get(value) if value else None
+            if i is None and value and field != 'id':
+                i = tables['id'].get(value)
+            if i is not None:
+                pairs.append((record, openepd_records[i]))
+                matched.add(i)
+                matched_by[field] += 1
+                break
+        else:
+            ec3_only.append(record)
+    openepd_only = [r for i, r in enumerate(openepd_records) if i not in matched]
+    return pairs, ec3_only, openepd_only, matched_by
+
+def flatten_fields(record, sections=DIFF_SECTIONS):
+    """
+    Leaf values of the compared sections as {dotted.path: value}.
+    Quantity strings ("12.3 kgCO2e") and numbers become floats; other leaves are kept as-is.
+    """
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f"{prefix}.{key}", child)
+        elif value is not None and value != '' and value != []:
+            number = parse_quantity(value) if not isinstance(value, list) else None
+            flat[prefix] = number if number is not None else value
+
+    for section in sections:
+        walk(section, record.get(section))
+    return flat
+
+def _values_equal(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=REL_TOLERANCE, abs_tol=1e-12)
+    return a == b
+
+def _new_field_stats():
+    return {'ec3': 0, 'openepd': 0, 'both': 0, 'ec3_only': 0, 'openepd_only': 0,
+            'equal': 0, 'different': 0, 'max_abs_diff': 0.0, 'sum_rel_diff': 0.0, 'numeric_diffs': 0}
+
+def diff_snapshots(ec3_records, openepd_records, diffs_csv=None):
+    """
+    Field-level coverage and value differences across every joined pair, in one pass.
+
+    Args:
+        diffs_csv: Optional path; each differing value is streamed there as a row
+
+    Returns:
+        Summary dict with record counts, join statistics and per-field statistics
+    """
+    pairs, ec3_only, openepd_only, matched_by = hash_join(ec3_records, openepd_records)
+    fields = {}
+    section_coverage = {section: {'ec3': 0, 'openepd': 0, 'both': 0} for section in DIFF_SECTIONS}
+
+    diff_file = open(diffs_csv, 'w', newline='') if diffs_csv else None
+    writer = csv.writer(diff_file) if diff_file else None
+    if writer:
+        writer.writerow(['material_id', 'field', 'ec3', 'openepd', 'abs_diff', 'rel_diff'])
+    try:
+        for ec3_epd, openepd_epd in pairs:
+            for section in DIFF_SECTIONS:
+                has_ec3, has_openepd = bool(ec3_epd.get(section)), bool(openepd_epd.get(section))
+                section_coverage[section]['ec3'] += has_ec3
+                section_coverage[section]['openepd'] += has_openepd
+                section_coverage[section]['both'] += has_ec3 and has_openepd
+
+            ec3_fields = flatten_fields(ec3_epd)
+            openepd_fields = flatten_fields(openepd_epd)
+            material_id = ec3_epd.get('material_id') or ec3_epd.get('id')
+            for name in ec3_fields.keys() | openepd_fields.keys():
+                stats = fields.get(name)
+                if stats is None:
+                    stats = fields[name] = _new_field_stats()
+                a, b = ec3_fields.get(name), openepd_fields.get(name)
+                if b is None:
+                    stats['ec3'] += 1
+                    stats['ec3_only'] += 1
+                    continue
+                if a is None:
+                    stats['openepd'] += 1
+                    stats['openepd_only'] += 1
+                    continue
+                stats['ec3'] += 1
+                stats['openepd'] += 1
+                stats['both'] += 1
+                if _values_equal(a, b):
+                    stats['equal'] += 1
+                    continue
+                stats['different'] += 1
+                abs_diff = rel_diff = ''
+                if isinstance(a, float) and isinstance(b, float):
+                    abs_diff = abs(a - b)
+                    rel_diff = abs_diff / max(abs(a), abs(b))
+                    stats['max_abs_diff'] = max(stats['max_abs_diff'], abs_diff)
+                    stats['sum_rel_diff'] += rel_diff
+                    stats['numeric_diffs'] += 1
+                if writer:
+                    writer.writerow([material_id, name, a, b, abs_diff, rel_diff])
+    finally:
+        if diff_file:
+            diff_file.close()
+
+    for stats in fields.values():
+        numeric, total = stats.pop('numeric_diffs'), stats.pop('sum_rel_diff')
+        stats['mean_rel_diff'] = total / numeric if numeric else None
+    return {
+        'records': {'ec3': len(ec3_records), 'openepd': len(openepd_records), 'matched': len(pairs),
+                    'ec3_only': len(ec3_only), 'openepd_only': len(openepd_only)},
+        'matched_by': matched_by,
+        'sections': section_coverage,
+        'fields': dict(sorted(fields.items())),
+        'unmatched_ec3_ids': [r.get('material_id') or r.get('id') for r in ec3_only],
+    }
+
+def save_bulk_results(summary, json_path="api_bulk_comparison.json", csv_path="api_bulk_comparison_fields.csv"):
+    """Save the bulk summary as JSON and the per-field statistics as CSV"""
+    with open(json_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    columns = ['field', 'ec3', 'openepd', 'both', 'ec3_only', 'openepd_only', 'equal', 'different',
+               'max_abs_diff', 'mean_rel_diff']
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for name, stats in summary['fields'].items():
+            writer.writerow(dict(stats, field=name))
+    print(f"\n✓ Bulk comparison saved to: {json_path} and {csv_path}")
+
+def print_bulk_summary(summary):
+    counts = summary['records']
+    print("\n" + "="*70)
+    print("Bulk Comparison Summary")
+    print("="*70)
+    print(f"EC3 records:      {counts['ec3']}")
+    print(f"openEPD records:  {counts['openepd']}")
+    print(f"Matched:          {counts['matched']} "
+          f"({', '.join(f'{k}: {v}' for k, v in summary['matched_by'].items() if v)})")
+    print(f"Only in EC3:      {counts['ec3_only']}")
+    print(f"Only in openEPD:  {counts['openepd_only']}")
+    matched = counts['matched'] or 1
+    for section, coverage in summary['sections'].items():
+        print(f"\n{section}: EC3 {coverage['ec3']/matched*100:.1f}%, openEPD {coverage['openepd']/matched*100:.1f}%, "
+              f"both {coverage['both']/matched*100:.1f}% of matched records")
+    differing = sorted(summary['fields'].items(), key=lambda item: -item[1]['different'])[:10]
+    if differing and differing[0][1]['different']:
+        print("\nFields with the most differing values:")
+        for name, stats in differing:
+            if stats['different']:
+                print(f"  {name}: {stats['different']}/{stats['both']} differ")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare EC3 and openEPD API data")
+    parser.add_argument('--bulk', nargs=2, metavar=('EC3_SNAPSHOT', 'OPENEPD_SNAPSHOT'),
+                        help="Diff two full snapshots (JSON, NDJSON or products-data directories)")
+    parser.add_argument('--fetch-snapshot', choices=['ec3', 'openepd'], help="Download a full snapshot as NDJSON")
+    parser.add_argument('--plant-geography', help="Limit --fetch-snapshot to a region, e.g. US-ME")
+    parser.add_argument('--output', help="Snapshot file for --fetch-snapshot, or JSON summary for --bulk")
+    parser.add_argument('--diffs-csv', default="api_bulk_comparison_diffs.csv",
+                        help="Every differing value, one row each (--bulk)")
+    args = parser.parse_args()
+
+    if args.bulk:
+        start = time.time()
+        ec3_records = load_snapshot(args.bulk[0])
+        openepd_records = load_snapshot(args.bulk[1])
+        print(f"Loaded {len(ec3_records)} EC3 and {len(openepd_records)} openEPD records", flush=True)
+        summary = diff_snapshots(ec3_records, openepd_records, diffs_csv=args.diffs_csv)
+        print_bulk_summary(summary)
+        json_path = args.output or "api_bulk_comparison.json"
+        save_bulk_results(summary, json_path, os.path.splitext(json_path)[0] + "_fields.csv")
+        print(f"Completed in {time.time() - start:.1f} seconds")
+        exit(0)
+
+    if args.fetch_snapshot:
+        auth = get_auth()
+        if not auth:
+            exit(1)
+        url = EC3_EPDS_URL if args.fetch_snapshot == 'ec3' else OPENEPD_EPDS_URL
+        params = {"plant_geography": args.plant_geography} if args.plant_geography else None
+        output = args.output or f"{args.fetch_snapshot}_snapshot.ndjson"
+        count = fetch_snapshot(url, auth, output, params)
+        print(f"✓ {count} records saved to: {output}")
+        exit(0)
+
     print("="*70)
     print("EC3 API vs openEPD API Comparison")
     print("="*70)
@@ -0,0 +1,184 @@
+"""
+Shared dimension tables for objects repeated across EPD records (categories, plants, manufacturers).
+Interning replaces equal sub-objects with one shared dict per id, so a region's records hold
+one copy of each category instead of one per product. With the reference layout, the YAML
+files store a short reference and the full objects are written once to products-data.
+"""
+import csv
+import json
+import os
+import threading
+from collections import Counter
+
+import yaml
+
+REFERENCE_KEY = '$ref'
+# Table name -> file under products-data holding the full objects
+REFERENCE_TABLE_FILES = {
+    'categories': 'categories.yaml',
+    'plants': 'plants.yaml',
+    'manufacturers': 'manufacturers.yaml',
+}
+# Columns of the plants.csv / manufacturers.csv exports; dotted names reach into nested objects
+PLANT_CSV_FIELDS = [
+    'id', 'name', 'owned_by.id', 'owned_by.name', 'address', 'admin_district', 'admin_district2',
+    'postal_code', 'country', 'latitude', 'longitude', 'carbon_intensity', 'web_domain',
+]
+MANUFACTURER_CSV_FIELDS = [
+    'id', 'name', 'web_domain', 'address', 'admin_district', 'postal_code', 'country', 'latitude', 'longitude',
+]
+
+class NoAliasDumper(yaml.Dumper):
+    """
+    yaml.Dumper that writes every object in full. Interned records share sub-objects (a plant's
+    owned_by is the EPD's manufacturer), which the stock Dumper would write as &id001/*id001 aliases.
+    """
+
+    def ignore_aliases(self, data):
+        return True
+
+class NoAliasSafeDumper(getattr(yaml, 'CSafeDumper', yaml.SafeDumper)):
+    """Safe (C where available) variant of NoAliasDumper for the table files"""
+
+    def ignore_aliases(self, data):
+        return True
+
+class DimensionTable:
+    """
+    Objects keyed by id, with one canonical dict per id.
+
+    Usage:
+        categories = DimensionTable.load('categories', 'products-data/categories.yaml')
+        epd['category'] = categories.intern(epd['category'])
+        stub = categories.reference(epd['category'], ('id', 'display_name'))
+    """
+
+    def __init__(self, name, key='id', rows=None):
+        self.name = name
+        self.key = key
+        self.rows = dict(rows or {})  # id -> canonical object
+        self.references = 0           # objects seen by intern()
+        self.counts = Counter()       # id -> objects seen by intern() (EPDs in this pull)
+        self.seen = set()             # ids seen by intern() since reset_counts, counted or not
+        self.variants = 0             # times an id arrived with different content
+        self._lock = threading.Lock()
+
+    def intern(self, obj, count=True):
+        """
+        Return the shared object for obj's id; a changed object replaces the stored one.
+        count=False skips the per-id product count (for records that will be interned again).
+        """
+        if not isinstance(obj, dict):
+            return obj
+        key = obj.get(self.key)
+        if key is None:
+            return obj
+        with self._lock:
+            self.seen.add(key)
+            if count:
+                self.references += 1
+                self.counts[key] += 1
+            current = self.rows.get(key)
+            if current is obj or current == obj:
+                return current
+            if current is not None:
+                self.variants += 1
+            self.rows[key] = obj
+            return obj
+
+    def reference(self, obj, keep=()):
+        """Short stand-in for obj: its id, the table name and any fields listed in keep"""
+        stub = {REFERENCE_KEY: self.name, self.key: obj.get(self.key)}
+        for field in keep:
+            if field in obj:
+                stub[field] = obj[field]
+        return stub
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = Counter()
+            self.seen = set()
+            self.references = 0
+
+    def seen_to_dict(self):
+        """Objects and product counts seen since the last reset_counts (for merging across processes)"""
+        with self._lock:
+            # Rows interned with count=False (manufacturers reached through plants) are included too
+            return {'rows': {key: self.rows[key] for key in self.seen}, 'counts': dict(self.counts)}
+
+    def merge_seen(self, data):
+        """Merge the output of seen_to_dict from another process into this table"""
+        for row in data['rows'].values():
+            self.intern(row, count=False)
+        with self._lock:
+            self.counts.update(data['counts'])
+            self.references += sum(data['counts'].values())
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, name, path, key='id'):
+        """Table saved by save(), or an empty table if the file is missing or unreadable"""
+        try:
+            with open(path, 'r') as f:
+                rows = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        except (OSError, yaml.YAMLError):
+            rows = None
+        return cls(name, key, rows if isinstance(rows, dict) else None)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            yaml.dump(dict(sorted(self.rows.items(), key=lambda item: str(item[0]))), f,
+                      Dumper=NoAliasSafeDumper, default_flow_style=False)
+        os.replace(tmp_path, path)
+
+    def save_csv(self, path, fields):
+        """
+        One row per object with the given columns plus 'products' (EPDs seen in this pull).
+        Nested dicts and lists that are not split out by a dotted column are written as JSON.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([field.replace('.', '_') for field in fields] + ['products'])
+            for key, obj in sorted(self.rows.items(), key=lambda item: str(item[0])):
+                writer.writerow([_csv_value(_lookup(obj, field)) for field in fields] + [self.counts.get(key, '')])
+
+def _lookup(obj, dotted):
+    for part in dotted.split('.'):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+def load_reference_tables(base_path):
+    """Tables written next to the catalog, keyed by table name (missing files are skipped)"""
+    tables = {}
+    for name, file_name in REFERENCE_TABLE_FILES.items():
+        path = os.path.join(base_path, file_name)
+        if os.path.exists(path):
+            tables[name] = DimensionTable.load(name, path)
+    return tables
+
+def expand_references(epd, tables):
+    """Replace reference stubs in an EPD with the full objects from tables (in place)"""
+    for field, value in epd.items():
+        if isinstance(value, dict) and REFERENCE_KEY in value:
+            table = tables.get(value[REFERENCE_KEY])
+            row = table.get(value.get(table.key)) if table is not None else None
+            if row is not None:
+                epd[field] = row
+    return epd
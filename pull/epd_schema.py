@@ -0,0 +1,156 @@
+"""
+Validation of EC3 EPD records before they reach the output sinks.
+The sinks index a few fields directly (material_id, category.display_name, plant_or_group, ...),
+so one malformed record used to raise and abort the rest of its region. EPD_SCHEMA lists those
+fields; compile_schema turns it into a flat list of checks once, and validate_page applies it to
+a whole page. Records that fail are written to a quarantine NDJSON file with the reason.
+
+Validation runs on records with nulls stripped, so a null field counts as missing.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+# Field -> required type, or a nested schema for a required dict
+EPD_SCHEMA = {
+    'material_id': str,
+    'name': str,
+    'open_xpd_uuid': str,
+    'category': {
+        'display_name': str,
+        'openepd_name': str,
+    },
+    'plant_or_group': dict,
+}
+# Id types the dimension tables can key on (a list or dict id would make interning raise)
+ID_TYPES = (str, int)
+# Fields that may be missing but must have this type when present. Dotted names reach into
+# nested dicts and are only checked when their parents are dicts.
+EPD_OPTIONAL_FIELDS = {
+    'manufacturer': dict,
+    'category.id': ID_TYPES,
+    'plant_or_group.id': ID_TYPES,
+    'plant_or_group.owned_by.id': ID_TYPES,
+    'manufacturer.id': ID_TYPES,
+}
+
+def _compile_rules(schema, prefix=()):
+    rules = []
+    for field, expected in schema.items():
+        path = prefix + (field,)
+        if isinstance(expected, dict):
+            rules.append((path, dict, True))
+            rules.extend(_compile_rules(expected, path))
+        else:
+            rules.append((path, expected, True))
+    return rules
+
+def compile_schema(schema, optional=None):
+    """
+    Compile a schema into a validator.
+
+    Args:
+        schema: Dict of field -> type, or field -> nested schema (the field must then be a dict)
+        optional: Dict of field -> type (or tuple of types) for fields that may be missing;
+            dotted names are nested fields, skipped when a parent is missing or not a dict
+
+    Returns:
+        Function taking a record and returning None when it is valid, else the reason it is not
+    """
+    rules = _compile_rules(schema)
+    rules.extend((tuple(field.split('.')), expected, False) for field, expected in (optional or {}).items())
+    # Dotted names are built once here rather than for every failing record
+    rules = tuple((path, '.'.join(path), expected, _type_name(expected), required)
+                  for path, expected, required in rules)
+
+    def validate(record):
+        if not isinstance(record, dict):
+            return f"record is {type(record).__name__}, not dict"
+        for path, name, expected, type_name, required in rules:
+            value = record
+            for field in path[:-1]:
+                # Required parents are checked first; optional ones may be missing
+                value = value.get(field)
+                if not isinstance(value, dict):
+                    break
+            else:
+                value = value.get(path[-1])
+                if value is None:
+                    if required:
+                        return f"missing {name}"
+                elif not isinstance(value, expected):
+                    return f"{name} is {type(value).__name__}, expected {type_name}"
+        return None
+
+    return validate
+
+def _type_name(expected):
+    if isinstance(expected, tuple):
+        return ' or '.join(t.__name__ for t in expected)
+    return expected.__name__
+
+def validate_page(records, validate):
+    """
+    Split a page of records into valid ones and rejected (record, reason) pairs.
+    """
+    valid = []
+    rejected = []
+    for record in records:
+        reason = validate(record)
+        if reason is None:
+            valid.append(record)
+        else:
+            rejected.append((record, reason))
+    return valid, rejected
+
+class Quarantine:
+    """
+    NDJSON file of rejected records, one line per record with its region, page and reason.
+    The file is replaced by the first write of a run. Safe to call from several threads.
+
+    Usage:
+        quarantine = Quarantine('quarantine.ndjson')
+        valid, rejected = validate_page(records, validate)
+        quarantine.write_many('US-GA', 3, rejected)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.counts = Counter()  # region -> records quarantined
+        self._file = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def write_many(self, region, page, rejected):
+        if not rejected:
+            return
+        quarantined_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        lines = ''.join(json.dumps({'region': region, 'page': page, 'reason': reason,
+                                    'quarantined_at': quarantined_at, 'record': record},
+                                   default=str) + '\n'
+                        for record, reason in rejected)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a' if self._started else 'w')
+                self._started = True
+            self._file.write(lines)
+            self._file.flush()
+            self.counts[region] += len(rejected)
+
+    def clear(self):
+        """Remove the previous run's file, so a clean run leaves none behind"""
+        with self._lock:
+            if self._file is None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
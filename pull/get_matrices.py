@@ -0,0 +1,271 @@
+"""
+Download the IO model API (sectors, flows, indicators, matrices and demand vectors)
+into pull/data/bt, like get-json/get-json-bt.js but with a bounded request pool and retries.
+
+Matrices are stored as .npy files (or one compressed .npz per model with --format npz)
+instead of dense JSON text. .npy files can be memory-mapped, so a calculation that only
+needs L and D never reads M or U. Sectors, flows, indicators and demands stay JSON.
+
+Usage:
+    python get_matrices.py --endpoint https://example.org/api --apikey KEY
+    python get_matrices.py --endpoint http://localhost/api --models USEEIOv2.0 --format npz --calculate
+
+--calculate computes results for every demand locally with io_calculate.py after the
+download; --remote-calculate POSTs each demand and perspective to /calculate instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import requests
+
+DEFAULT_ENDPOINT = "http://localhost/api"
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bt")
+MAX_CONCURRENT_REQUESTS = 8
+MAX_RETRIES = 4
+REQUEST_TIMEOUT = 120
+INDEX_PATHS = ["sectors", "flows", "indicators"]
+MATRICES = [
+    "A", "A_d", "B", "C", "D", "L",
+    "L_d", "M", "M_d", "N", "N_d",
+    "Phi", "q", "Rho", "U", "U_d",
+    "V", "x",
+]
+PERSPECTIVES = ["direct", "intermediate", "final"]
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class DownloadError(Exception):
+    pass
+
+class MatrixClient:
+    """
+    Bounded, retrying HTTP client. Requests run in worker threads (one requests.Session
+    per thread) and at most max_concurrent are in flight at once.
+    """
+
+    def __init__(self, endpoint, apikey=None, max_concurrent=MAX_CONCURRENT_REQUESTS, max_retries=MAX_RETRIES):
+        self.endpoint = endpoint.rstrip('/')
+        self.headers = {"x-api-key": apikey} if apikey else {}
+        self.max_retries = max_retries
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self._local = threading.local()
+        self.bytes_received = 0
+        self.retries = 0
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def _request(self, method, path, body=None):
+        url = f"{self.endpoint}{path}"
+        print(f"fetch data from {url}", flush=True)
+        response = self._session().request(method, url, json=body, timeout=REQUEST_TIMEOUT)
+        return response.status_code, response.reason, response.content
+
+    async def request(self, path, method='GET', body=None):
+        """Response body as bytes; retries connection errors, 429 and 5xx with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            async with self.semaphore:
+                try:
+                    status, reason, content = await asyncio.to_thread(self._request, method, path, body)
+                except requests.exceptions.RequestException as e:
+                    status, reason, content = None, str(e), b''
+            if status == 200:
+                self.bytes_received += len(content)
+                return content
+            if status is not None and status not in RETRY_STATUS:
+                raise DownloadError(f"{path}: status {status} {reason}")
+            if attempt == self.max_retries:
+                raise DownloadError(f"{path}: {status or ''} {reason} after {self.max_retries} retries")
+            self.retries += 1
+            # Back off outside the semaphore so waiting retries don't hold pool slots
+            await asyncio.sleep(min(60, 2 ** attempt) * (0.5 + random.random()))
+
+    async def get_json(self, path):
+        return json.loads(await self.request(path))
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def save_json(path, content):
+    _write_atomic(path, lambda f: f.write(content))
+
+def matrix_from_json(content, dtype=np.float64):
+    """Dense array from a matrix endpoint's JSON (nested lists of numbers)"""
+    return np.asarray(json.loads(content), dtype=dtype)
+
+def save_matrix(path, array):
+    """Save an array as .npy (loadable with mmap_mode='r')"""
+    _write_atomic(path, lambda f: np.save(f, array, allow_pickle=False))
+
+def load_matrix(model_dir, name, mmap=True):
+    """
+    Load a downloaded matrix, preferring .npy (memory-mapped), then matrices.npz,
+    then the JSON written by get-json-bt.js.
+    """
+    npy_path = os.path.join(model_dir, "matrix", f"{name}.npy")
+    if os.path.exists(npy_path):
+        return np.load(npy_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    npz_path = os.path.join(model_dir, "matrices.npz")
+    if os.path.exists(npz_path):
+        with np.load(npz_path, allow_pickle=False) as data:
+            if name in data.files:
+                return data[name]
+    json_path = os.path.join(model_dir, "matrix", f"{name}.json")
+    with open(json_path, 'rb') as f:
+        return matrix_from_json(f.read())
+
+def load_json(model_dir, name):
+    with open(os.path.join(model_dir, f"{name}.json"), 'r') as f:
+        return json.load(f)
+
+async def download_model(client, model_id, model_dir, matrix_format='npy', dtype=np.float64, calculate=False):
+    """
+    Download one model. Failures of individual files are reported and counted, not raised.
+
+    Returns:
+        (files written, failures)
+    """
+    for folder in (model_dir, os.path.join(model_dir, "matrix"), os.path.join(model_dir, "demands")):
+        os.makedirs(folder, exist_ok=True)
+    written = 0
+    failures = []
+    arrays = {}
+
+    async def index_file(name):
+        content = await client.request(f"/{model_id}/{name}")
+        await asyncio.to_thread(save_json, os.path.join(model_dir, f"{name}.json"), content)
+
+    async def matrix(name):
+        content = await client.request(f"/{model_id}/matrix/{name}")
+        array = await asyncio.to_thread(matrix_from_json, content, dtype)
+        if matrix_format == 'npz':
+            arrays[name] = array
+        else:
+            await asyncio.to_thread(save_matrix, os.path.join(model_dir, "matrix", f"{name}.npy"), array)
+
+    async def demand(demand_id):
+        content = await client.request(f"/{model_id}/demands/{demand_id}")
+        await asyncio.to_thread(save_json, os.path.join(model_dir, "demands", f"{demand_id}.json"), content)
+        if calculate:
+            await asyncio.gather(*(result(demand_id, json.loads(content), p) for p in PERSPECTIVES))
+
+    async def result(demand_id, demand_vector, perspective):
+        content = await client.request(f"/{model_id}/calculate", method='POST',
+                                       body={"perspective": perspective, "demand": demand_vector})
+        folder = os.path.join(model_dir, "results", perspective)
+        os.makedirs(folder, exist_ok=True)
+        await asyncio.to_thread(save_json, os.path.join(folder, f"indicator_results_{demand_id}.json"), content)
+
+    async def demands():
+        content = await client.request(f"/{model_id}/demands")
+        await asyncio.to_thread(save_json, os.path.join(model_dir, "demands.json"), content)
+        return json.loads(content)
+
+    async def run(label, coroutine):
+        nonlocal written
+        try:
+            await coroutine
+            written += 1
+        except (DownloadError, ValueError) as e:
+            print(f"failed to download {label}: {e}", flush=True)
+            failures.append(label)
+
+    demand_list = []
+
+    async def demand_index():
+        demand_list.extend(await demands())
+
+    await asyncio.gather(
+        *(run(name, index_file(name)) for name in INDEX_PATHS),
+        *(run(f"matrix/{name}", matrix(name)) for name in MATRICES),
+        run("demands", demand_index()),
+    )
+    await asyncio.gather(*(run(f"demands/{d['id']}", demand(d['id'])) for d in demand_list))
+
+    if matrix_format == 'npz' and arrays:
+        npz_path = os.path.join(model_dir, "matrices.npz")
+        await asyncio.to_thread(_write_atomic, npz_path, lambda f: np.savez_compressed(f, **arrays))
+    return written, failures
+
+async def download_all(endpoint, apikey=None, models=None, model_dirs=None, matrix_format='npy',
+                       dtype=np.float64, calculate=False, max_concurrent=MAX_CONCURRENT_REQUESTS,
+                       target_dir=DATA_DIR):
+    """Download the model list, the sector crosswalk and every (or the selected) model"""
+    os.makedirs(target_dir, exist_ok=True)
+    client = MatrixClient(endpoint, apikey, max_concurrent)
+    start = time.time()
+
+    async def crosswalk():
+        try:
+            content = await client.request("/sectorcrosswalk.csv")
+            await asyncio.to_thread(save_json, os.path.join(target_dir, "sectorcrosswalk.csv"), content)
+        except DownloadError as e:
+            print(f"failed to download sectorcrosswalk.csv: {e}", flush=True)
+
+    models_content = await client.request("/models")
+    save_json(os.path.join(target_dir, "models.json"), models_content)
+    model_ids = [m['id'] for m in json.loads(models_content) if m.get('id')]
+    if models:
+        model_ids = [m for m in model_ids if m in models]
+
+    results = await asyncio.gather(
+        crosswalk(),
+        *(download_model(client, model_id, os.path.join(target_dir, (model_dirs or {}).get(model_id, model_id)),
+                         matrix_format, dtype, calculate)
+          for model_id in model_ids),
+    )
+    written = sum(r[0] for r in results[1:])
+    failures = [f for r in results[1:] for f in r[1]]
+    print(f"✓ {len(model_ids)} models, {written} files in {time.time() - start:.1f} seconds "
+          f"({client.bytes_received / 1e6:.1f} MB received, {client.retries} retries, {len(failures)} failed)",
+          flush=True)
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download IO model matrices as NumPy files")
+    parser.add_argument('--endpoint', default=DEFAULT_ENDPOINT)
+    parser.add_argument('--apikey')
+    parser.add_argument('--models', nargs='*', help="Only these model ids (default: all)")
+    parser.add_argument('--model-dir', action='append', default=[], metavar='MODEL=DIR',
+                        help="Store a model under a different folder name")
+    parser.add_argument('--format', choices=['npy', 'npz'], default='npy',
+                        help="npy: one memory-mappable file per matrix; npz: one compressed file per model")
+    parser.add_argument('--float32', action='store_true', help="Store matrices as float32 (half the size)")
+    parser.add_argument('--calculate', action='store_true',
+                        help="Calculate results for every demand locally after downloading")
+    parser.add_argument('--remote-calculate', action='store_true',
+                        help="Fetch results for every demand and perspective from the /calculate endpoint")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_REQUESTS)
+    parser.add_argument('--target-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    if not args.apikey:
+        print("No API key set; use none")
+    model_dirs = dict(item.split('=', 1) for item in args.model_dir)
+    failures = asyncio.run(download_all(
+        args.endpoint, args.apikey, args.models, model_dirs, args.format,
+        np.float32 if args.float32 else np.float64, args.remote_calculate, args.concurrency, args.target_dir,
+    ))
+    if args.calculate:
+        from io_calculate import calculate_model
+        with open(os.path.join(args.target_dir, "models.json"), 'r') as f:
+            model_ids = [m['id'] for m in json.load(f) if m.get('id') and (not args.models or m['id'] in args.models)]
+        for model_id in model_ids:
+            try:
+                calculate_model(os.path.join(args.target_dir, model_dirs.get(model_id, model_id)))
+            except (OSError, ValueError) as e:
+                print(f"failed to calculate {model_id}: {e}", flush=True)
+                failures.append(model_id)
+    exit(1 if failures else 0)
@@ -0,0 +1,223 @@
+"""
+Vectorized GWP statistics per category and region.
+Loads gwp, gwp_per_kg and gwp_per_category_declared_unit into NumPy arrays and
+computes percentiles, means, standard deviations and z-scores for every
+(category, region) group in one batched pass, then compares them with the
+pct10_gwp..pct90_gwp and gwp_z values provided by the EC3 API.
+"""
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from catalog import DEFAULT_BASE_PATH, epd_country, epd_state, iter_epds, parse_quantity
+
+METRICS = ['gwp', 'gwp_per_kg', 'gwp_per_category_declared_unit']
+PERCENTILES = [10, 20, 30, 40, 50, 60, 70, 80, 90]
+# EC3 category percentiles are expressed per category declared unit
+API_PERCENTILE_METRIC = 'gwp_per_category_declared_unit'
+
+def build_gwp_table(epds):
+    """
+    Collect the columns needed for GWP statistics.
+
+    Args:
+        epds: Iterable of EPD dicts (or (path, epd) pairs from catalog.iter_epds)
+
+    Returns:
+        Dict of equal-length NumPy arrays. Missing numbers are NaN, missing labels ''.
+    """
+    columns = {name: [] for name in ['material_id', 'category_id', 'category', 'country', 'state', 'gwp_z'] + METRICS}
+    api_pct = []
+    for item in epds:
+        epd = item[1] if isinstance(item, tuple) else item
+        category = epd.get('category') or {}
+        columns['material_id'].append(epd.get('material_id') or '')
+        columns['category_id'].append(category.get('id') or '')
+        columns['category'].append(category.get('display_name') or '')
+        columns['country'].append(epd_country(epd) or '')
+        columns['state'].append(epd_state(epd) or '')
+        columns['gwp_z'].append(parse_quantity(epd.get('gwp_z')))
+        for metric in METRICS:
+            columns[metric].append(parse_quantity(epd.get(metric)))
+        api_pct.append([parse_quantity(category.get(f'pct{p}_gwp')) for p in PERCENTILES])
+
+    table = {}
+    for name, values in columns.items():
+        if name in METRICS or name == 'gwp_z':
+            table[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            table[name] = np.array(values, dtype=object)
+    table['api_pct'] = np.array(
+        [[np.nan if v is None else v for v in row] for row in api_pct], dtype=float
+    ).reshape(len(api_pct), len(PERCENTILES))
+    return table
+
+def grouped_stats(values, group_ids, n_groups, percentiles=PERCENTILES):
+    """
+    Count, mean, standard deviation and percentiles of values for every group at once.
+
+    Percentiles use linear interpolation (same as numpy.percentile's default).
+    NaN values are ignored. Groups without values get count 0 and NaN stats.
+
+    Returns:
+        Dict with 'count', 'mean', 'std' (length n_groups) and 'pct' (n_groups x len(percentiles))
+    """
+    valid = ~np.isnan(values)
+    values = values[valid]
+    groups = group_ids[valid]
+
+    count = np.bincount(groups, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(groups, weights=values, minlength=n_groups) / count
+        deviations = values - mean[groups]
+        std = np.sqrt(np.bincount(groups, weights=deviations * deviations, minlength=n_groups) / count)
+
+    # Sort by group, then value, so each group's values are a contiguous sorted run
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    q = np.asarray(percentiles, dtype=float) / 100.0
+    positions = starts[:, None] + q[None, :] * np.maximum(count - 1, 0)[:, None]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    frac = positions - lower
+    pct = np.full((n_groups, len(percentiles)), np.nan)
+    has_values = count > 0
+    if len(sorted_values):
+        lo = sorted_values[np.minimum(lower, len(sorted_values) - 1)]
+        hi = sorted_values[np.minimum(upper, len(sorted_values) - 1)]
+        pct[has_values] = (lo + (hi - lo) * frac)[has_values]
+
+    return {'count': count, 'mean': mean, 'std': std, 'pct': pct}
+
+def group_codes(table, by):
+    """
+    Integer group id per record for grouping by category plus `by` ('country', 'state' or None).
+    Returns (group_ids, keys) where keys[i] is the (category_id, region) of group i.
+    """
+    region = table[by] if by else np.full(len(table['category_id']), '', dtype=object)
+    labels = np.char.add(np.char.add(table['category_id'].astype(str), '|'), region.astype(str))
+    keys, group_ids = np.unique(labels, return_inverse=True)
+    return group_ids.ravel(), [tuple(key.split('|', 1)) for key in keys]
+
+def compute_category_stats(table, by='country', metrics=METRICS, percentiles=PERCENTILES):
+    """
+    Stats for every (category, region) group and every metric, plus per-record z-scores.
+
+    Returns:
+        Dict with 'keys' (list of (category_id, region)), 'group_ids', and per metric a
+        grouped_stats result extended with 'z' (z-score of every record within its group).
+    """
+    group_ids, keys = group_codes(table, by)
+    result = {'by': by, 'keys': keys, 'group_ids': group_ids, 'metrics': {}}
+    for metric in metrics:
+        stats = grouped_stats(table[metric], group_ids, len(keys), percentiles)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['z'] = (table[metric] - stats['mean'][group_ids]) / stats['std'][group_ids]
+        result['metrics'][metric] = stats
+    return result
+
+def compare_with_api(table, category_stats=None):
+    """
+    Compare recomputed catalog-wide category stats with the values provided by the API.
+
+    Returns:
+        List of dicts per category with computed vs API percentiles, plus the mean absolute
+        difference between recomputed and API gwp_z for the category's records.
+    """
+    if category_stats is None:
+        category_stats = compute_category_stats(table, by=None, metrics=[API_PERCENTILE_METRIC])
+    stats = category_stats['metrics'][API_PERCENTILE_METRIC]
+    group_ids = category_stats['group_ids']
+    n_groups = len(category_stats['keys'])
+
+    # API percentiles are repeated on every record of a category; take the per-group mean
+    api_pct = np.full((n_groups, len(PERCENTILES)), np.nan)
+    for column in range(len(PERCENTILES)):
+        values = table['api_pct'][:, column]
+        api_pct[:, column] = grouped_stats(values, group_ids, n_groups, [50])['mean']
+
+    z_diff = np.abs(stats['z'] - table['gwp_z'])
+    z_stats = grouped_stats(z_diff, group_ids, n_groups, [50])
+
+    rows = []
+    names = {}
+    for category_id, name in zip(table['category_id'], table['category']):
+        names.setdefault(category_id, name)
+    for index, (category_id, _) in enumerate(category_stats['keys']):
+        rows.append({
+            'category_id': category_id,
+            'category': names.get(category_id, ''),
+            'count': int(stats['count'][index]),
+            'computed_pct': _round_list(stats['pct'][index]),
+            'api_pct': _round_list(api_pct[index]),
+            'max_abs_pct_diff': _round(np.nanmax(np.abs(stats['pct'][index] - api_pct[index]))
+                                       if not np.all(np.isnan(api_pct[index])) else np.nan),
+            'mean_abs_z_diff': _round(z_stats['mean'][index]),
+        })
+    return rows
+
+def _round(value, digits=4):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+def _round_list(values, digits=4):
+    return [_round(v, digits) for v in values]
+
+def stats_rows(category_stats, table):
+    """Flatten compute_category_stats output into one row per (category, region, metric)"""
+    names = {}
+    for category_id, name in zip(table['category_id'], table['category']):
+        names.setdefault(category_id, name)
+    rows = []
+    for metric, stats in category_stats['metrics'].items():
+        for index, (category_id, region) in enumerate(category_stats['keys']):
+            if not stats['count'][index]:
+                continue
+            row = {
+                'category_id': category_id,
+                'category': names.get(category_id, ''),
+                'region': region,
+                'metric': metric,
+                'count': int(stats['count'][index]),
+                'mean': _round(stats['mean'][index]),
+                'std': _round(stats['std'][index]),
+            }
+            for p, value in zip(PERCENTILES, stats['pct'][index]):
+                row[f'pct{p}'] = _round(value)
+            rows.append(row)
+    return rows
+
+def write_stats_csv(rows, output_file):
+    if not rows:
+        return
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == "__main__":
+    base_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BASE_PATH
+    print("="*70)
+    print("Category GWP Statistics")
+    print("="*70)
+
+    start = time.perf_counter()
+    table = build_gwp_table(iter_epds(base_path))
+    print(f"Loaded {len(table['material_id'])} EPDs in {time.perf_counter() - start:.1f} seconds")
+
+    start = time.perf_counter()
+    rows = []
+    for by in ('country', 'state'):
+        rows.extend(stats_rows(compute_category_stats(table, by=by), table))
+    comparison = compare_with_api(table)
+    print(f"Computed {len(rows)} group statistics in {time.perf_counter() - start:.3f} seconds")
+
+    write_stats_csv(rows, "category_gwp_stats.csv")
+    with open("category_gwp_api_comparison.json", 'w') as f:
+        json.dump(comparison, f, indent=2)
+    print("✓ Stats saved to: category_gwp_stats.csv")
+    print("✓ API comparison saved to: category_gwp_api_comparison.json")
@@ -0,0 +1,252 @@
+"""
+Per-request metrics for the EC3 and openEPD API calls.
+HttpMetrics.request() wraps requests.request and records latency (histogram by endpoint and
+region), status codes, response bytes, plus retries, token refreshes and records per page
+reported by the callers. Metrics are exported in the Prometheus text format (for the node
+exporter's textfile collector or a quick grep) and as a JSON run summary with estimated
+latency percentiles.
+
+Usage:
+    metrics = HttpMetrics()
+    response = metrics.request('GET', url, 'epds', 'US-GA', params=params, timeout=30)
+    metrics.record_retry('epds', 'US-GA', 'rate_limited')
+    metrics.save('http_metrics.prom', 'http_metrics.json')
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+# Upper bounds of the records-per-page histogram buckets
+RECORDS_BUCKETS = (0, 10, 50, 100, 250, 500)
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+METRIC_PREFIX = "epd_pull"
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative counts per upper bound)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Estimate by linear interpolation within the bucket, as Prometheus histogram_quantile does"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if bound == float('inf'):
+                    return lower  # beyond the last bucket: report its bound
+                in_bucket = total - previous
+                return lower + (bound - lower) * ((rank - previous) / in_bucket if in_bucket else 0)
+            lower, previous = bound, total
+        return lower
+
+def _labels(**labels):
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else f"{value:g}"
+
+class HttpMetrics:
+    """
+    Thread-safe registry of API call metrics, keyed by endpoint and region.
+    Region is '' for calls that are not per region (login, openEPD lookups).
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))   # (endpoint, region)
+        self.records = defaultdict(lambda: Histogram(RECORDS_BUCKETS))   # (endpoint, region)
+        self.statuses = Counter()        # (endpoint, region, status)
+        self.retries = Counter()         # (endpoint, region, reason)
+        self.bytes = Counter()           # (endpoint, region)
+        self.token_refreshes = Counter() # endpoint
+        self._lock = threading.Lock()
+
+    def request(self, method, url, endpoint, region='', **kwargs):
+        """
+        requests.request with timing. Exceptions are counted under status 'timeout' or 'error'
+        and re-raised.
+        """
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.Timeout:
+            self.observe(endpoint, region, 'timeout', time.perf_counter() - start)
+            raise
+        except requests.exceptions.RequestException:
+            self.observe(endpoint, region, 'error', time.perf_counter() - start)
+            raise
+        self.observe(endpoint, region, response.status_code, time.perf_counter() - start, len(response.content))
+        return response
+
+    def observe(self, endpoint, region, status, seconds, size=0):
+        with self._lock:
+            self.latency[endpoint, region].observe(seconds)
+            self.statuses[endpoint, region, str(status)] += 1
+            self.bytes[endpoint, region] += size
+
+    def record_retry(self, endpoint, region, reason):
+        with self._lock:
+            self.retries[endpoint, region, reason] += 1
+
+    def record_token_refresh(self, endpoint):
+        with self._lock:
+            self.token_refreshes[endpoint] += 1
+
+    def record_page(self, endpoint, region, records):
+        with self._lock:
+            self.records[endpoint, region].observe(records)
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        p = METRIC_PREFIX
+        lines = []
+        with self._lock:
+            lines += [f"# HELP {p}_request_duration_seconds API request latency",
+                      f"# TYPE {p}_request_duration_seconds histogram"]
+            for (endpoint, region), histogram in sorted(self.latency.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f"{p}_request_duration_seconds_bucket"
+                                 f"{_labels(endpoint=endpoint, region=region, le=_bound(bound))} {total}")
+                labels = _labels(endpoint=endpoint, region=region)
+                lines.append(f"{p}_request_duration_seconds_sum{labels} {histogram.sum:.6f}")
+                lines.append(f"{p}_request_duration_seconds_count{labels} {histogram.count}")
+            lines += [f"# HELP {p}_requests_total API responses by status code ('timeout'/'error' for failures)",
+                      f"# TYPE {p}_requests_total counter"]
+            for (endpoint, region, status), count in sorted(self.statuses.items()):
+                lines.append(f"{p}_requests_total{_labels(endpoint=endpoint, region=region, status=status)} {count}")
+            lines += [f"# HELP {p}_retries_total Requests retried, by reason",
+                      f"# TYPE {p}_retries_total counter"]
+            for (endpoint, region, reason), count in sorted(self.retries.items()):
+                lines.append(f"{p}_retries_total{_labels(endpoint=endpoint, region=region, reason=reason)} {count}")
+            lines += [f"# HELP {p}_response_bytes_total Response body bytes received",
+                      f"# TYPE {p}_response_bytes_total counter"]
+            for (endpoint, region), size in sorted(self.bytes.items()):
+                lines.append(f"{p}_response_bytes_total{_labels(endpoint=endpoint, region=region)} {size}")
+            lines += [f"# HELP {p}_token_refreshes_total Authorization tokens refreshed after a 401",
+                      f"# TYPE {p}_token_refreshes_total counter"]
+            for endpoint, count in sorted(self.token_refreshes.items()):
+                lines.append(f"{p}_token_refreshes_total{_labels(endpoint=endpoint)} {count}")
+            lines += [f"# HELP {p}_page_records Records per fetched page",
+                      f"# TYPE {p}_page_records histogram"]
+            for (endpoint, region), histogram in sorted(self.records.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f"{p}_page_records_bucket{_labels(endpoint=endpoint, region=region, le=_bound(bound))} {total}")
+                labels = _labels(endpoint=endpoint, region=region)
+                lines.append(f"{p}_page_records_sum{labels} {histogram.sum:g}")
+                lines.append(f"{p}_page_records_count{labels} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        JSON run summary: totals per endpoint and per region with estimated latency percentiles.
+        """
+        finished_at = datetime.now(timezone.utc)
+        with self._lock:
+            groups = {'endpoints': defaultdict(list), 'regions': defaultdict(list)}
+            for endpoint, region in self.latency:
+                groups['endpoints'][endpoint].append((endpoint, region))
+                if region:
+                    groups['regions'][region].append((endpoint, region))
+            result = {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished_at': finished_at.isoformat(timespec='seconds'),
+                'duration_seconds': round((finished_at - self.started_at).total_seconds(), 1),
+                'token_refreshes': dict(self.token_refreshes),
+            }
+            for group, members in groups.items():
+                result[group] = {name: self._summarize(keys) for name, keys in sorted(members.items())}
+        return result
+
+    def _summarize(self, keys):
+        latency = Histogram(LATENCY_BUCKETS)
+        records = Histogram(RECORDS_BUCKETS)
+        for key in keys:
+            _merge(latency, self.latency[key])
+            if key in self.records:
+                _merge(records, self.records[key])
+        statuses = Counter()
+        retries = Counter()
+        for (endpoint, region, status), count in self.statuses.items():
+            if (endpoint, region) in keys:
+                statuses[status] += count
+        for (endpoint, region, reason), count in self.retries.items():
+            if (endpoint, region) in keys:
+                retries[reason] += count
+        return {
+            'requests': latency.count,
+            'statuses': dict(sorted(statuses.items())),
+            'retries': dict(sorted(retries.items())),
+            'bytes': sum(self.bytes[key] for key in keys),
+            'latency_seconds': {
+                'mean': round(latency.sum / latency.count, 4) if latency.count else None,
+                **{f"p{round(q * 100)}": _round(latency.quantile(q)) for q in SUMMARY_QUANTILES},
+            },
+            'pages': records.count,
+            'records_per_page': round(records.sum / records.count, 1) if records.count else None,
+        }
+
+    def save(self, prometheus_path=None, json_path=None):
+        """Write the Prometheus text file and/or JSON summary (each replaced atomically)"""
+        for path, text in ((prometheus_path, self.to_prometheus), (json_path, lambda: json.dumps(self.summary(), indent=1))):
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text())
+            os.replace(tmp_path, path)
+
+def _merge(target, histogram):
+    target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+    target.count += histogram.count
+    target.sum += histogram.sum
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+def format_http_summary(summary):
+    """Short text table of the per-endpoint summary"""
+    lines = [f"{'Endpoint':<14}{'Requests':>9}{'Retries':>9}{'MB':>8}{'p50 s':>8}{'p90 s':>8}{'p99 s':>8}  Statuses"]
+    for endpoint, s in summary['endpoints'].items():
+        latency = s['latency_seconds']
+        cells = [f"{latency[k]:>8.2f}" if latency[k] is not None else f"{'-':>8}" for k in ('p50', 'p90', 'p99')]
+        statuses = ', '.join(f"{status}: {count}" for status, count in s['statuses'].items())
+        lines.append(f"{endpoint:<14}{s['requests']:>9}{sum(s['retries'].values()):>9}{s['bytes'] / 1e6:>8.1f}"
+                     f"{''.join(cells)}  {statuses}")
+    if summary['token_refreshes']:
+        lines.append(f"Token refreshes: {sum(summary['token_refreshes'].values())}")
+    return '\n'.join(lines)
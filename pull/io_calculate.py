@@ -0,0 +1,188 @@
+"""
+Local IO model calculation, replacing one /calculate POST per demand vector and perspective.
+All demand vectors of a model are stacked into one matrix Y (sectors x demands), so each
+perspective takes a couple of matrix products for every demand at once:
+
+    x = L @ Y                         total output (scaling vector) per demand
+    direct:       D * x[:, k]         indicator results by the sector where they occur
+    intermediate: N * x[:, k]         upstream results of each sector's total output;
+                                      counts supply chains more than once, so columns
+                                      do not add up to the demand's total
+    final:        N * Y[:, k]         results assigned to the final demand sectors
+
+(A * v means scaling the columns of A by v.) Direct and final columns both sum to the
+total D @ x = N @ y. Results are written in the /calculate response layout to
+results/<perspective>/indicator_results_<demand>.json, as get-json-bt.js does.
+
+Matrix products (L @ Y, and D @ x or N @ Y for the totals) use scipy.sparse matrices when scipy
+is installed and the matrix is sparse. The per-sector perspectives scale the columns of the dense
+D and N elementwise, since their results are written out dense anyway.
+
+Usage:
+    python io_calculate.py data/bt/USEEIOv2.0
+    python io_calculate.py data/bt/USEEIOv2.0 --perspectives direct final --npy
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from get_matrices import PERSPECTIVES, load_json, load_matrix
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+SPARSE_DENSITY = 0.15  # use sparse products below this share of non-zero values
+
+def as_operator(matrix):
+    """A scipy CSR matrix when the input is sparse enough and scipy is available, else a dense array"""
+    matrix = np.asarray(matrix)
+    if sparse is not None and matrix.ndim == 2 and matrix.size:
+        if np.count_nonzero(matrix) / matrix.size < SPARSE_DENSITY:
+            return sparse.csr_matrix(matrix)
+    return matrix
+
+def _dense(matrix):
+    return matrix.toarray() if sparse is not None and sparse.issparse(matrix) else np.asarray(matrix)
+
+def _ids(items):
+    """Ids in matrix order (by 'index' when the API provides it)"""
+    if items and all('index' in item for item in items):
+        items = sorted(items, key=lambda item: item['index'])
+    return [item['id'] for item in items]
+
+def demand_matrix(demands, sector_ids):
+    """
+    Stack demand vectors into a dense sectors x demands matrix.
+
+    Args:
+        demands: List of demand vectors, each a list of {"sector": id, "amount": value}
+        sector_ids: Sector ids in matrix order
+
+    Returns:
+        (Y, unknown) where unknown lists sector ids not found in the model
+    """
+    position = {sector: i for i, sector in enumerate(sector_ids)}
+    Y = np.zeros((len(sector_ids), len(demands)))
+    unknown = set()
+    for k, demand in enumerate(demands):
+        for entry in demand:
+            i = position.get(entry.get('sector'))
+            if i is None:
+                unknown.add(entry.get('sector'))
+            else:
+                Y[i, k] += float(entry.get('amount') or 0)
+    return Y, sorted(unknown, key=str)
+
+class IOModel:
+    """
+    Matrices of one downloaded model.
+
+    Usage:
+        model = IOModel.load('data/bt/USEEIOv2.0')
+        results = model.calculate(Y, ['direct', 'final'])
+    """
+
+    def __init__(self, L, D, N, sector_ids, indicator_ids):
+        if np.shape(L) != (len(sector_ids), len(sector_ids)) or np.shape(D) != (len(indicator_ids), len(sector_ids)):
+            raise ValueError(f"Matrix shapes L {np.shape(L)}, D {np.shape(D)} do not match "
+                             f"{len(sector_ids)} sectors and {len(indicator_ids)} indicators")
+        self.L = as_operator(L)
+        self.D = np.asarray(D)
+        self.D_operator = as_operator(D)
+        self.N = np.asarray(N)
+        self.N_operator = as_operator(N)
+        self.sector_ids = sector_ids
+        self.indicator_ids = indicator_ids
+
+    @classmethod
+    def load(cls, model_dir):
+        return cls(
+            load_matrix(model_dir, 'L'),
+            load_matrix(model_dir, 'D'),
+            load_matrix(model_dir, 'N'),
+            _ids(load_json(model_dir, 'sectors')),
+            _ids(load_json(model_dir, 'indicators')),
+        )
+
+    def calculate(self, Y, perspectives=PERSPECTIVES):
+        """
+        Indicator results for every demand column of Y.
+
+        Returns:
+            Dict of perspective -> array (demands x indicators x sectors), plus 'totals'
+            (demands x indicators)
+        """
+        Y = np.asarray(Y, dtype=float)
+        if Y.ndim == 1:
+            Y = Y[:, None]
+        results = {}
+        needs_x = any(p in ('direct', 'intermediate') for p in perspectives)
+        X = _dense(self.L @ Y) if needs_x else None
+        for perspective in perspectives:
+            if perspective == 'direct':
+                results[perspective] = self.D[None, :, :] * X.T[:, None, :]
+            elif perspective == 'intermediate':
+                results[perspective] = self.N[None, :, :] * X.T[:, None, :]
+            elif perspective == 'final':
+                results[perspective] = self.N[None, :, :] * Y.T[:, None, :]
+            else:
+                raise ValueError(f"Unknown perspective: {perspective}")
+        # D @ x equals N @ y; D is usually the sparser of the two
+        results['totals'] = _dense(self.D_operator @ X if needs_x else self.N_operator @ Y).T
+        return results
+
+    def result_json(self, matrix, total):
+        """One demand's result in the /calculate response layout"""
+        return {
+            'indicators': self.indicator_ids,
+            'sectors': self.sector_ids,
+            'data': matrix.tolist(),
+            'totals': total.tolist(),
+        }
+
+def calculate_model(model_dir, perspectives=PERSPECTIVES, write_npy=False):
+    """
+    Calculate every downloaded demand vector of a model and write the result files.
+
+    Returns:
+        Number of demand vectors calculated
+    """
+    start = time.time()
+    model = IOModel.load(model_dir)
+    demand_ids = [d['id'] for d in load_json(model_dir, 'demands')]
+    demands = []
+    for demand_id in demand_ids:
+        with open(os.path.join(model_dir, 'demands', f'{demand_id}.json'), 'r') as f:
+            demands.append(json.load(f))
+    Y, unknown = demand_matrix(demands, model.sector_ids)
+    if unknown:
+        print(f"⚠ {len(unknown)} demand sectors not in the model, ignored: {', '.join(map(str, unknown[:5]))}")
+    results = model.calculate(Y, perspectives)
+    calculated = time.time()
+
+    for perspective in perspectives:
+        folder = os.path.join(model_dir, 'results', perspective)
+        os.makedirs(folder, exist_ok=True)
+        if write_npy:
+            np.save(os.path.join(folder, 'indicator_results.npy'), results[perspective])
+        for k, demand_id in enumerate(demand_ids):
+            with open(os.path.join(folder, f'indicator_results_{demand_id}.json'), 'w') as f:
+                json.dump(model.result_json(results[perspective][k], results['totals'][k]), f)
+    print(f"✓ {len(demand_ids)} demands x {len(perspectives)} perspectives for {os.path.basename(model_dir)}: "
+          f"calculated in {calculated - start:.2f} s, written in {time.time() - calculated:.2f} s")
+    return len(demand_ids)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculate IO model results for all downloaded demand vectors")
+    parser.add_argument('model_dirs', nargs='+', help="Model folders written by get_matrices.py")
+    parser.add_argument('--perspectives', nargs='+', choices=PERSPECTIVES, default=PERSPECTIVES)
+    parser.add_argument('--npy', action='store_true',
+                        help="Also save each perspective as one demands x indicators x sectors .npy")
+    args = parser.parse_args()
+    for model_dir in args.model_dirs:
+        calculate_model(model_dir, args.perspectives, args.npy)
@@ -84,7 +84,7 @@ def merge_impact_data(ec3_epd, openepd_epd=None):
     
     return merged_epd
 
-def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3):
+def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3, metrics=None):
     """
     Fetch a specific EPD from openEPD API by ID.
     
@@ -92,6 +92,7 @@ def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3):
         epd_id: EPD ID to fetch
         authorization: Bearer token
         max_retries: Maximum number of retry attempts
+        metrics: Optional http_metrics.HttpMetrics recording each request and retry
     
     Returns:
         EPD data dict or None if not found
@@ -109,10 +110,15 @@ def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3):
         
         for attempt in range(max_retries):
             try:
-                response = requests.get(openepd_url, headers=headers, params=params, timeout=30)
+                if metrics is not None:
+                    response = metrics.request('GET', openepd_url, 'openepd_epds', headers=headers, params=params, timeout=30)
+                else:
+                    response = requests.get(openepd_url, headers=headers, params=params, timeout=30)
                 
                 if response.status_code == 200:
                     epds = response.json()
+                    if metrics is not None:
+                        metrics.record_page('openepd_epds', '', len(epds))
                     
                     # Search for matching ID
                     for epd in epds:
@@ -129,6 +135,8 @@ def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3):
                     
                 elif response.status_code == 429:
                     # Rate limited, wait and retry
+                    if metrics is not None:
+                        metrics.record_retry('openepd_epds', '', 'rate_limited')
                     wait_time = 2 ** attempt + 5
                     time.sleep(wait_time)
                 else:
@@ -136,11 +144,15 @@ def fetch_from_openepd_by_id(epd_id, authorization, max_retries=3):
                     
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
+                    if metrics is not None:
+                        metrics.record_retry('openepd_epds', '', 'timeout')
                     time.sleep(2 ** attempt + 5)
                 else:
                     break
             except requests.exceptions.RequestException as e:
                 if attempt < max_retries - 1:
+                    if metrics is not None:
+                        metrics.record_retry('openepd_epds', '', 'error')
                     time.sleep(2 ** attempt + 5)
                 else:
                     break
@@ -0,0 +1,69 @@
+"""
+Single-pass output stage for EPD records.
+Each EPD of a region is visited once and handed to every registered sink
+(YAML files, CSV rows, products.csv rows, ...), so adding an output does not
+add another pass over the region's results.
+"""
+
+class OutputSink:
+    """
+    Base class for an output written from a region's EPDs.
+
+    write() is called once per EPD, close() once after the last EPD of the region.
+    Sinks that produce a single file per region should buffer rows in write()
+    and write the file in close().
+    """
+
+    def write(self, epd: dict):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class OutputStage:
+    """
+    Dispatches every EPD to all sinks in one pass.
+
+    Usage:
+        with OutputStage([YamlSink(state), StateCsvSink(state)]) as stage:
+            for epd in epds:
+                stage.write(epd)
+    """
+
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self.count = 0
+
+    def add_sink(self, sink: OutputSink):
+        self.sinks.append(sink)
+        return sink
+
+    def write(self, epd: dict):
+        for sink in self.sinks:
+            sink.write(epd)
+        self.count += 1
+
+    def write_many(self, epds):
+        for epd in epds:
+            self.write(epd)
+        return self.count
+
+    def close(self):
+        # A failing sink does not stop the others from writing their files; the first error is raised after
+        error = None
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Flush buffered sinks only on success so a failed region does not leave partial CSVs
+        if exc_type is None:
+            self.close()
+        return False
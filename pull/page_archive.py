@@ -0,0 +1,139 @@
+"""
+Archive of raw EC3 API pages, so products-data can be rebuilt offline after an output layout change.
+
+Each fetched page is stored as compressed NDJSON (one EPD record per line) at
+<archive>/<run id>/<region>/page-00001.ndjson.zst, and a line is appended to the run's
+manifest.ndjson with the run id, region, page, record count and fetch time. Queue workers
+sharing a run each append to their own manifest-<worker>.ndjson.
+zstandard is used when installed, gzip otherwise; both are readable regardless.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_FILE = "manifest.ndjson"
+MANIFEST_PREFIX = "manifest"
+ZSTD_LEVEL = 6
+GZIP_LEVEL = 6
+
+def new_run_id():
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), '.ndjson.zst'
+    return gzip.compress(data, compresslevel=GZIP_LEVEL), '.ndjson.gz'
+
+def page_number(path):
+    """Page number of an archived page file (page-00012.ndjson.gz -> 12)"""
+    return int(os.path.basename(path).split('.', 1)[0].rsplit('-', 1)[1])
+
+def read_page(path):
+    """Records of an archived page"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif path.endswith('.gz'):
+        data = gzip.decompress(data)
+    return [json.loads(line) for line in data.decode('utf-8').splitlines() if line.strip()]
+
+class PageArchive:
+    """
+    Writer for one run's pages. Safe to call from several fetch threads.
+
+    Usage:
+        archive = PageArchive('page-archive')
+        archive.write_page('US-GA', 1, records)
+    """
+
+    def __init__(self, root, run_id=None, manifest=MANIFEST_FILE):
+        self.run_id = run_id or new_run_id()
+        self.manifest = manifest
+        self.run_dir = os.path.join(root, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.pages = 0
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def write_page(self, region, page, records):
+        """Returns: path of the page file relative to the run directory"""
+        data, extension = _compress(''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records).encode('utf-8'))
+        relative_path = os.path.join(region, f"page-{page:05d}{extension}")
+        path = os.path.join(self.run_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temporary name: a re-leased region may be written by two workers at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        entry = {
+            'run_id': self.run_id, 'region': region, 'page': page, 'records': len(records),
+            'file': relative_path, 'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            with open(os.path.join(self.run_dir, self.manifest), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.pages += 1
+            self.records += len(records)
+        return relative_path
+
+def _manifests(run_dir):
+    if not os.path.isdir(run_dir):
+        return []
+    return sorted(name for name in os.listdir(run_dir)
+                  if name.startswith(MANIFEST_PREFIX) and name.endswith('.ndjson'))
+
+def list_runs(root):
+    """Archived run ids, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if _manifests(os.path.join(root, name)))
+
+def prune_runs(root, keep, protect=()):
+    """
+    Delete all but the `keep` newest archived runs.
+
+    Args:
+        root: Archive directory
+        keep: Number of runs to keep
+        protect: Run ids that are never deleted (and do not count towards keep)
+
+    Returns:
+        List of deleted run ids
+    """
+    runs = [run for run in list_runs(root) if run not in protect]
+    pruned = runs[:max(len(runs) - keep, 0)]
+    for run in pruned:
+        shutil.rmtree(os.path.join(root, run))
+    return pruned
+
+def run_pages(root, run_id):
+    """
+    Page files of an archived run.
+
+    Returns:
+        Dict of region -> list of page file paths in page order
+    """
+    run_dir = os.path.join(root, run_id)
+    pages = {}
+    for manifest in _manifests(run_dir):
+        with open(os.path.join(run_dir, manifest), 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                # A page archived twice (retried fetch) keeps one file
+                pages.setdefault(entry['region'], {})[entry['page']] = os.path.join(run_dir, entry['file'])
+    return {region: [files[page] for page in sorted(files)] for region, files in pages.items()}
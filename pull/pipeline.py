@@ -0,0 +1,195 @@
+"""
+Staged pipeline runtime: stages run concurrently in worker threads and are
+connected by bounded queues, so a slow stage applies backpressure upstream
+instead of letting items pile up in memory.
+Each stage reports busy time and utilization so the bottleneck is visible.
+"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class Stage:
+    """
+    One pipeline stage.
+
+    Args:
+        name: Stage name used in stats output
+        func: Called with each input item; returns an iterable of output items
+              (a generator, a list, or None for no output)
+        workers: Number of worker threads for this stage
+        queue_size: Capacity of the bounded input queue feeding this stage
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=8):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.stats = StageStats(name, self.workers)
+
+class StageStats:
+    """Counters collected for one stage while the pipeline runs."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0      # time spent inside the stage function
+        self.blocked_seconds = 0.0   # time spent waiting for room in the downstream queue
+        self.max_queue_depth = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, items_in=0, items_out=0, errors=0, busy=0.0, blocked=0.0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += errors
+            self.busy_seconds += busy
+            self.blocked_seconds += blocked
+
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def utilization(self):
+        """Busy time as a fraction of the stage's total worker time."""
+        wall = self.wall_seconds()
+        if wall <= 0:
+            return 0.0
+        return self.busy_seconds / (wall * self.workers)
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'wall_seconds': round(self.wall_seconds(), 3),
+            'utilization': round(self.utilization(), 3),
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+class Pipeline:
+    """
+    Runs a list of stages connected by bounded queues.
+
+    Usage:
+        pipeline = Pipeline([Stage('fetch', fetch, workers=2), Stage('write', write)])
+        stats = pipeline.run(regions)
+        print(format_stage_stats(stats))
+    """
+
+    def __init__(self, stages):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+
+    def _put(self, index, item):
+        """Put item on the input queue of stage `index`. Returns seconds spent blocked."""
+        if index >= len(self.queues):
+            return 0.0
+        start = time.perf_counter()
+        self.queues[index].put(item)
+        stats = self.stages[index].stats
+        depth = self.queues[index].qsize()
+        if depth > stats.max_queue_depth:
+            stats.max_queue_depth = depth
+        return time.perf_counter() - start
+
+    def _worker(self, index, remaining):
+        stage = self.stages[index]
+        stats = stage.stats
+        in_queue = self.queues[index]
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            busy = 0.0
+            blocked = 0.0
+            produced = 0
+            errors = 0
+            start = time.perf_counter()
+            try:
+                outputs = stage.func(item)
+                if outputs is not None:
+                    for output in outputs:
+                        # Time spent waiting downstream is backpressure, not work
+                        blocked += self._put(index + 1, output)
+                        produced += 1
+            except Exception:
+                errors = 1
+                logger.exception("Stage %s failed on item", stage.name)
+            busy = time.perf_counter() - start - blocked
+            stats.add(items_in=1, items_out=produced, errors=errors, busy=busy, blocked=blocked)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Stage item done", extra={'stage': stage.name, 'duration': busy,
+                                                       'region': getattr(item, 'state', None),
+                                                       'page': getattr(item, 'page', None)})
+
+        # The last worker of this stage to finish shuts down the next stage
+        with remaining['lock']:
+            remaining['count'] -= 1
+            last = remaining['count'] == 0
+        if last:
+            stats.finished = time.perf_counter()
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    self.queues[index + 1].put(_DONE)
+
+    def run(self, inputs):
+        """Feed inputs through every stage and block until all stages finish. Returns per-stage stats."""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage.stats.started = time.perf_counter()
+            remaining = {'count': stage.workers, 'lock': threading.Lock()}
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(index, remaining),
+                    name=f"{stage.name}-{worker + 1}", daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in inputs:
+            self._put(0, item)
+        for _ in range(self.stages[0].workers):
+            self.queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        return [stage.stats.to_dict() for stage in self.stages]
+
+def bottleneck(stats):
+    """Return the name of the stage with the highest utilization."""
+    if not stats:
+        return None
+    return max(stats, key=lambda s: s['utilization'])['stage']
+
+def format_stage_stats(stats):
+    """Format per-stage stats as a small text table."""
+    lines = [
+        f"{'Stage':<12}{'Workers':>8}{'In':>8}{'Out':>8}{'Errors':>8}{'Busy s':>10}{'Blocked s':>11}{'Util':>7}{'Max Q':>7}",
+    ]
+    for s in stats:
+        lines.append(
+            f"{s['stage']:<12}{s['workers']:>8}{s['items_in']:>8}{s['items_out']:>8}{s['errors']:>8}"
+            f"{s['busy_seconds']:>10.1f}{s['blocked_seconds']:>11.1f}{s['utilization']*100:>6.0f}%{s['max_queue_depth']:>7}"
+        )
+    name = bottleneck(stats)
+    if name:
+        lines.append(f"Bottleneck: {name}")
+    return "\n".join(lines)
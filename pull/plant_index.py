@@ -0,0 +1,270 @@
+"""
+Spatial index over plant coordinates for nearest-supplier queries.
+Plants are bucketed into a lat/lon grid per category, so "which plants within
+300 km of this site make product X" only computes haversine distances for the
+few grid cells around the site. The index is built from the pulled catalog,
+saved as JSON, and refreshed incrementally from file mtimes after a pull.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from catalog import DEFAULT_BASE_PATH, parse_quantity, scan_changes
+from analyze_emissions_data import load_yaml
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+PLANT_INDEX_FILE = "plant_index.json"
+ALL_CATEGORIES = '*'
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; inputs in degrees, NumPy broadcasting applies"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def haversine_matrix(lat_a, lon_a, lat_b, lon_b):
+    """Distance matrix in km between every point of a (rows) and every point of b (columns)"""
+    lat_a, lon_a = np.asarray(lat_a, dtype=float)[:, None], np.asarray(lon_a, dtype=float)[:, None]
+    lat_b, lon_b = np.asarray(lat_b, dtype=float)[None, :], np.asarray(lon_b, dtype=float)[None, :]
+    return haversine_km(lat_a, lon_a, lat_b, lon_b)
+
+def plant_record(epd, path=None, mtime=None):
+    """Index record for an EPD, or None if its plant has no usable coordinates"""
+    plant = epd.get('plant_or_group') or {}
+    lat = parse_quantity(plant.get('latitude'))
+    lon = parse_quantity(plant.get('longitude'))
+    material_id = epd.get('material_id')
+    if lat is None or lon is None or not material_id or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    category = epd.get('category') or {}
+    return {
+        'material_id': material_id,
+        'name': epd.get('name'),
+        'category_id': category.get('id'),
+        'category': category.get('display_name'),
+        'plant_id': plant.get('id'),
+        'plant_name': plant.get('name'),
+        'postal_code': plant.get('postal_code'),
+        'latitude': lat,
+        'longitude': lon,
+        'gwp': epd.get('gwp'),
+        'gwp_per_kg': epd.get('gwp_per_kg'),
+        'path': path,
+        'mtime': mtime,
+    }
+
+class PlantIndex:
+    """
+    Grid index of plant locations, one grid per category plus one for all categories.
+
+    Usage:
+        index = PlantIndex.load()
+        index.within(33.75, -84.39, 300, category='Ready Mix')
+        index.nearest(33.75, -84.39, k=5)
+    """
+
+    def __init__(self, cell_degrees=1.0):
+        self.cell_degrees = cell_degrees
+        self.lon_cells = int(math.ceil(360 / cell_degrees))
+        self.records = {}  # material_id -> record
+        self.grids = {}    # category key -> {(lat cell, lon cell): set of material_ids}
+        self.category_names = {}  # display name (lowercase) -> category id
+
+    def _cell(self, lat, lon):
+        iy = int(math.floor((lat + 90) / self.cell_degrees))
+        ix = int(math.floor((lon + 180) / self.cell_degrees)) % self.lon_cells
+        return iy, ix
+
+    def _category_keys(self, record):
+        keys = [ALL_CATEGORIES]
+        if record.get('category_id'):
+            keys.append(record['category_id'])
+        return keys
+
+    def upsert(self, record):
+        """Add or replace a record (keyed by material_id)"""
+        self.remove(record['material_id'])
+        self.records[record['material_id']] = record
+        cell = self._cell(record['latitude'], record['longitude'])
+        for key in self._category_keys(record):
+            self.grids.setdefault(key, {}).setdefault(cell, set()).add(record['material_id'])
+        if record.get('category') and record.get('category_id'):
+            self.category_names[record['category'].lower()] = record['category_id']
+
+    def remove(self, material_id):
+        record = self.records.pop(material_id, None)
+        if record is None:
+            return
+        cell = self._cell(record['latitude'], record['longitude'])
+        for key in self._category_keys(record):
+            members = self.grids.get(key, {}).get(cell)
+            if members is not None:
+                members.discard(material_id)
+                if not members:
+                    del self.grids[key][cell]
+
+    def __len__(self):
+        return len(self.records)
+
+    def _resolve_category(self, category):
+        if not category:
+            return ALL_CATEGORIES
+        if category in self.grids:
+            return category
+        return self.category_names.get(category.lower(), category)
+
+    def _candidate_cells(self, grid, lat, lon, radius_km):
+        """Grid cells that may hold points within radius_km of (lat, lon)"""
+        dlat = radius_km / KM_PER_DEGREE
+        if abs(lat) + dlat >= 90:
+            dlon = 180.0
+        else:
+            dlon = min(180.0, dlat / math.cos(math.radians(abs(lat) + dlat)))
+        iy_min, _ = self._cell(max(-90.0, lat - dlat), lon)
+        iy_max, _ = self._cell(min(90.0, lat + dlat) - 1e-9, lon)
+        span_x = int(math.ceil(dlon / self.cell_degrees)) + 1
+        ix_center = self._cell(lat, lon)[1]
+        if 2 * span_x + 1 >= self.lon_cells:
+            x_cells = None  # every longitude
+        else:
+            x_cells = {(ix_center + dx) % self.lon_cells for dx in range(-span_x, span_x + 1)}
+
+        # For very large radii it is cheaper to walk the occupied cells than the range
+        cell_count = (iy_max - iy_min + 1) * (len(x_cells) if x_cells is not None else self.lon_cells)
+        if cell_count > len(grid):
+            return [cell for cell in grid
+                    if iy_min <= cell[0] <= iy_max and (x_cells is None or cell[1] in x_cells)]
+        xs = x_cells if x_cells is not None else range(self.lon_cells)
+        return [(iy, ix) for iy in range(iy_min, iy_max + 1) for ix in xs if (iy, ix) in grid]
+
+    def within(self, lat, lon, radius_km, category=None, limit=None):
+        """
+        Records within radius_km of (lat, lon), nearest first.
+
+        Args:
+            category: Optional category id or display name to filter on
+            limit: Optional maximum number of results
+
+        Returns:
+            List of (distance_km, record)
+        """
+        grid = self.grids.get(self._resolve_category(category), {})
+        ids = [mid for cell in self._candidate_cells(grid, lat, lon, radius_km) for mid in grid[cell]]
+        if not ids:
+            return []
+        lats = np.fromiter((self.records[mid]['latitude'] for mid in ids), dtype=float, count=len(ids))
+        lons = np.fromiter((self.records[mid]['longitude'] for mid in ids), dtype=float, count=len(ids))
+        distances = haversine_km(lat, lon, lats, lons)
+        inside = np.nonzero(distances <= radius_km)[0]
+        order = inside[np.argsort(distances[inside], kind='stable')]
+        if limit is not None:
+            order = order[:limit]
+        return [(float(distances[i]), self.records[ids[i]]) for i in order]
+
+    def nearest(self, lat, lon, k=10, category=None, max_radius_km=None):
+        """
+        k nearest records to (lat, lon), optionally filtered by category.
+        Searches a growing radius until k records are inside it, so results are exact.
+        """
+        radius = 50.0
+        limit = max_radius_km or math.pi * EARTH_RADIUS_KM
+        while True:
+            results = self.within(lat, lon, min(radius, limit), category, limit=k)
+            if len(results) >= k or radius >= limit:
+                return results
+            radius *= 4
+
+    def to_dict(self):
+        return {'cell_degrees': self.cell_degrees, 'records': list(self.records.values())}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data.get('cell_degrees', 1.0))
+        for record in data.get('records', []):
+            index.upsert(record)
+        return index
+
+    @classmethod
+    def load(cls, path=PLANT_INDEX_FILE):
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=PLANT_INDEX_FILE):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def refresh(self, base_path=DEFAULT_BASE_PATH):
+        """
+        Bring the index up to date with the catalog, reading only new or modified files.
+        Returns counts of added/updated/removed records.
+        """
+        by_path = {record['path']: record for record in self.records.values() if record.get('path')}
+        changed, removed, unchanged = scan_changes({path: r.get('mtime') for path, r in by_path.items()}, base_path)
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': unchanged}
+        for path, mtime in changed:
+            try:
+                epd = load_yaml(path)
+            except Exception:
+                continue
+            record = plant_record(epd, path, mtime) if isinstance(epd, dict) else None
+            old = by_path.get(path)
+            if old is not None:
+                self.remove(old['material_id'])
+            if record is not None:
+                self.upsert(record)
+                counts['updated' if old is not None else 'added'] += 1
+        for path in removed:
+            self.remove(by_path[path]['material_id'])
+            counts['removed'] += 1
+        return counts
+
+def _print_results(results):
+    for distance, record in results:
+        print(f"{distance:8.1f} km  {record['material_id']}  {record.get('category') or ''}  "
+              f"{record.get('plant_name') or ''}  {record.get('name') or ''}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearest-plant queries over the pulled EPD catalog")
+    parser.add_argument('--index', default=PLANT_INDEX_FILE, help="Index file (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Build or incrementally refresh the index from products-data")
+    build.add_argument('--base-path', default=DEFAULT_BASE_PATH)
+
+    for name in ('near', 'within'):
+        query = subparsers.add_parser(name, help="k nearest plants" if name == 'near' else "Plants within a radius")
+        query.add_argument('--lat', type=float, required=True)
+        query.add_argument('--lon', type=float, required=True)
+        query.add_argument('--category', help="Category id or display name")
+        query.add_argument('-k', type=int, default=10, help="Number of results")
+        if name == 'within':
+            query.add_argument('--radius', type=float, default=300, help="Radius in km")
+
+    args = parser.parse_args()
+    index = PlantIndex.load(args.index)
+    if args.command == 'build':
+        start = time.perf_counter()
+        counts = index.refresh(args.base_path)
+        index.save(args.index)
+        print(f"Indexed {len(index)} plants in {time.perf_counter() - start:.1f} seconds: {counts}")
+        sys.exit(0)
+
+    start = time.perf_counter()
+    if args.command == 'near':
+        results = index.nearest(args.lat, args.lon, args.k, args.category)
+    else:
+        results = index.within(args.lat, args.lon, args.radius, args.category, limit=args.k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _print_results(results)
+    print(f"{len(results)} results in {elapsed_ms:.1f} ms")
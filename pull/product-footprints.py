@@ -1,7 +1,22 @@
-import requests, json, csv, logging, yaml, time, os
+import requests, json, csv, io, logging, yaml, time, os, threading, argparse
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from functools import partial
 from myconfig import email, password
 from merge_impact_data import merge_impact_data, fetch_from_openepd_by_id, should_fetch_from_openepd
+from tariff_classifier import classify_epd, get_classifier
+from output_stage import OutputSink, OutputStage
+from pipeline import Pipeline, Stage, format_stage_stats
+from quantile_sketch import SketchRegistry
+from catalog import parse_quantity, quantity_unit
+from dimensions import DimensionTable, MANUFACTURER_CSV_FIELDS, PLANT_CSV_FIELDS, NoAliasDumper
+from page_archive import PageArchive, list_runs, page_number, prune_runs, read_page, run_pages
+from epd_schema import EPD_OPTIONAL_FIELDS, EPD_SCHEMA, Quarantine, compile_schema, validate_page
+from publish import write_changes
+from work_queue import Heartbeat, LeaseLost, LeaseQueue, default_worker_id
+from http_metrics import HttpMetrics, format_http_summary
+from structured_logging import setup_logging
+from profiling import Profiler, format_profile_summary
 
 # ✅ Pull for all US states and selected countries
 # All US states (50 states + DC)
@@ -20,28 +35,139 @@ countries = ['IN', 'GB', 'DE', 'NL', 'CA', 'MX', 'CN']
 # Combine all regions
 states = us_states + countries
 
-epds_url = "https://buildingtransparency.org/api/epds"
+# EC3 API root; EC3_API_URL points the pull at another server (e.g. the simulated API of pull_benchmark.py)
+api_url = os.environ.get("EC3_API_URL", "https://buildingtransparency.org/api").rstrip('/')
+epds_url = f"{api_url}/epds"
+auth_url = f"{api_url}/rest-auth/login"
 openepd_url = "https://openepd.buildingtransparency.org/api/epds"
 page_size = 250
 
+# Configuration: pauses that keep the pull under the EC3 rate limit. EPD_DELAY_SCALE multiplies
+# all of them (0 disables them, as pull_benchmark.py does against its simulated API).
+PAGE_DELAY_SECONDS = 1      # between pages of a region
+REGION_DELAY_SECONDS = 10   # after each region
+RETRY_DELAY_SECONDS = 5     # before a retry, plus 2 ** attempt
+DELAY_SCALE = float(os.environ.get("EPD_DELAY_SCALE", 1))
+
 # Configuration: Enable/disable openEPD API fetching for additional impact/resource data
 # Set to True to fetch from openEPD API when EC3 data is missing impact/resource fields
 ENABLE_OPENEPD_FETCH = False  # Set to True to enable (may slow down processing)
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename="output.log",
-    datefmt="%Y/%m/%d %H:%M:%S",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(lineno)d - %(module)s - %(message)s",
-)
+# Configuration: run fetch, null-stripping, openEPD enrichment and writing as concurrent stages
+# Set USE_PIPELINE = False to process one region at a time (fetch, then write)
+USE_PIPELINE = True
+# Worker threads per stage. Keep 'write' at 1: region outputs are not shared between writers.
+# Keep 'fetch' at 1 as well: the page and region pauses are sized for one region fetching at a
+# time, and each extra fetch worker multiplies the request rate against the EC3 API.
+PIPELINE_WORKERS = {'fetch': 1, 'normalize': 1, 'enrich': 4, 'write': 1}
+# Items (pages) buffered between stages; a full queue makes the upstream stage wait
+PIPELINE_QUEUE_SIZE = 8
+
+# Configuration: keep streaming GWP percentile sketches per category and region during the pull.
+# Sketches persist across runs; the summary gives approximate pct10-pct90 for regional benchmarks.
+ENABLE_GWP_SKETCHES = True
+GWP_SKETCH_METRIC = 'gwp_per_category_declared_unit'
+GWP_SKETCH_FILE = "../../products-data/gwp_sketches.json"
+GWP_PERCENTILES_FILE = "../../products-data/gwp_percentiles.json"
+gwp_sketches = SketchRegistry.load(GWP_SKETCH_FILE)
+
+# Configuration: keep one shared category object per category id instead of a copy per EPD.
+# The table of full category objects is saved to CATEGORIES_FILE. With CATEGORY_REFERENCE_LAYOUT
+# the EPD YAML files store only {$ref, id, display_name, openepd_name} for the category;
+# catalog.iter_epds expands the reference again when reading.
+NORMALIZE_CATEGORIES = True
+CATEGORY_REFERENCE_LAYOUT = False
+CATEGORY_REFERENCE_FIELDS = ('display_name', 'openepd_name')
+CATEGORIES_FILE = "../../products-data/categories.yaml"
+category_table = DimensionTable.load('categories', CATEGORIES_FILE)
+
+# Configuration: the same for plant_or_group (and its owned_by) and manufacturer objects.
+# Tables are saved as YAML for expanding references and exported as plants.csv / manufacturers.csv
+# with a product count per plant and manufacturer for plant-level rollups.
+NORMALIZE_PLANTS = True
+PLANT_REFERENCE_LAYOUT = False
+PLANT_REFERENCE_FIELDS = ('name', 'country', 'admin_district', 'postal_code', 'latitude', 'longitude')
+MANUFACTURER_REFERENCE_FIELDS = ('name', 'country', 'postal_code')
+PLANTS_FILE = "../../products-data/plants.yaml"
+MANUFACTURERS_FILE = "../../products-data/manufacturers.yaml"
+PLANTS_CSV = "../../products-data/plants.csv"
+MANUFACTURERS_CSV = "../../products-data/manufacturers.csv"
+plant_table = DimensionTable.load('plants', PLANTS_FILE)
+manufacturer_table = DimensionTable.load('manufacturers', MANUFACTURERS_FILE)
+
+# Configuration: archive every fetched page (raw API records, compressed NDJSON) under
+# ARCHIVE_DIR/<run id>/<region>/ so all outputs can be regenerated without re-crawling:
+#   python product-footprints.py rebuild [--run RUN_ID]
+# Each run is a full raw copy, so a pull keeps only the newest ARCHIVE_KEEP_RUNS runs (itself
+# included; None keeps all). Queued runs are left to the queue commands.
+ARCHIVE_PAGES = True
+ARCHIVE_DIR = "page-archive"
+ARCHIVE_KEEP_RUNS = 3
+page_archive = None  # PageArchive of the current pull, created in main
+
+# Configuration: check every record against epd_schema.EPD_SCHEMA (the fields the output sinks
+# index directly) before writing. Failing records go to QUARANTINE_FILE as NDJSON with the reason
+# instead of aborting their region; the file is recreated each run.
+VALIDATE_EPDS = True
+QUARANTINE_FILE = "quarantine.ndjson"
+validate_epd = compile_schema(EPD_SCHEMA, EPD_OPTIONAL_FIELDS)
+quarantine = Quarantine(QUARANTINE_FILE)
+
+# Configuration: after a pull or rebuild, write publish-changes.json listing the files added,
+# modified and deleted (with SHA-256) since products-data/publish-manifest.json was last published.
+# Stage exactly that change set into a products-data checkout with:
+#   python publish.py stage <products-data checkout>
+WRITE_PUBLISH_CHANGES = True
+
+# Configuration: distributed crawl. `enqueue` puts one item per region in a SQLite lease queue in a
+# new run of the page archive; `worker` processes (on this host or others sharing ARCHIVE_DIR) lease
+# regions, fetch and archive their pages and renew the lease while they work; `merge` waits for the
+# queue and builds products-data from the archived pages, as rebuild does.
+QUEUE_FILE = "queue.sqlite"  # in ARCHIVE_DIR/<run id>/
+QUEUE_LEASE_SECONDS = 300    # a worker that stops heartbeating loses its region after this
+QUEUE_MAX_ATTEMPTS = 3       # leases per region before it is marked failed
+QUEUE_POLL_SECONDS = 15      # wait between checks for expired leases or queue completion
+
+# Configuration: every EC3/openEPD request is timed and counted (latency histograms by endpoint
+# and region, status codes, retries, token refreshes, bytes, records per page). The metrics are
+# written as a Prometheus text file and a JSON run summary after each region and at the end.
+HTTP_METRICS_PROM = "http_metrics.prom"
+HTTP_METRICS_JSON = "http_metrics.json"
+http_metrics = HttpMetrics()
+# Per-stage item counts and busy seconds of the last pull (the pipeline stats, or the region-level
+# fetch and write in sequential mode)
+STAGE_STATS_FILE = "stage_stats.json"
+
+# Configuration: JSON lines log written by a background listener thread (see structured_logging.py).
+# Levels per logger name; '' is the root. Override without editing, e.g.
+#   EPD_LOG_LEVELS="root=DEBUG,urllib3=INFO" python product-footprints.py
+LOG_FILE = "output.log"
+LOG_LEVELS = {
+    '': 'INFO',
+    '__main__': 'INFO',
+    'pipeline': 'INFO',
+    'urllib3': 'WARNING',  # connection pool chatter for every request
+}
+# Logging is set up by the command line entry point (and the rebuild pool's initializer), so
+# importing this module from tests or benchmarks leaves the importer's log handlers alone.
+
+# Configuration: `--profile` runs the pull under cProfile (per stage), a stack sampler and
+# tracemalloc, and writes stages.txt, <stage>.pstats, allocations.txt, stacks.collapsed and
+# summary.json to PROFILE_DIR/<timestamp>/. Profiling slows the CPU-bound stages noticeably.
+PROFILE_DIR = "profile-report"
 logger = logging.getLogger(__name__)
 
-def log_error(status_code: int, response_body: str):
-    logging.error(f"Request failed with status code: {status_code}")
-    logging.debug("Response body:" + response_body)
+def log_error(status_code: int, response_body: str, region: str = None, page: int = None):
+    context = {'status': status_code, 'region': region, 'page': page}
+    logger.error("Request failed with status code: %s", status_code, extra=context)
+    logger.debug("Response body: %s", response_body, extra=context)
+
+def pause(seconds: float):
+    """Sleep for one of the configured pauses, scaled by DELAY_SCALE."""
+    if seconds * DELAY_SCALE > 0:
+        time.sleep(seconds * DELAY_SCALE)
 
 def get_auth():
-    url_auth = "https://buildingtransparency.org/api/rest-auth/login"
     headers_auth = {
         "accept": "application/json",
         "Content-Type": "application/json"
@@ -50,7 +176,7 @@ def get_auth():
         "username": email,
         "password": password
     }
-    response_auth = requests.post(url_auth, headers=headers_auth, json=payload_auth)
+    response_auth = http_metrics.request('POST', auth_url, 'auth', headers=headers_auth, json=payload_auth)
     if response_auth.status_code == 200:
         authorization = 'Bearer ' + response_auth.json()['key']
         print("Fetched the new token successfully", flush=True)
@@ -65,14 +191,15 @@ def fetch_a_page(page: int, headers, state: str, total_pages: int = 0):
     Fetch a single page of EPDs.
     Returns: list of EPDs, or (list, new_auth) if token was refreshed
     """
-    logging.info(f'Fetching state: {state}, page: {page}')
+    logger.debug("Fetching page", extra={'region': state, 'page': page})
     params = {"plant_geography": state, "page_size": page_size, "page_number": page}
     for attempt in range(5):
         try:
             # Add timeout to prevent hanging (30 seconds per request)
-            response = requests.get(epds_url, headers=headers, params=params, timeout=30)
+            response = http_metrics.request('GET', epds_url, 'epds', state, headers=headers, params=params, timeout=30)
             if response.status_code == 200:
                 data = json.loads(response.text)
+                http_metrics.record_page('epds', state, len(data))
                 # Show progress for large datasets
                 if total_pages > 10 and page % 10 == 0:
                     print(f"  Progress: {page}/{total_pages} pages fetched for {state}", flush=True)
@@ -80,102 +207,140 @@ def fetch_a_page(page: int, headers, state: str, total_pages: int = 0):
             elif response.status_code == 401:
                 # Token expired, refresh it
                 print(f"  Authentication expired on page {page} for {state}. Refreshing token...", flush=True)
+                http_metrics.record_token_refresh('epds')
                 new_auth = get_auth()
                 if new_auth:
                     headers["Authorization"] = new_auth
                     # Retry immediately with new token
-                    response = requests.get(epds_url, headers=headers, params=params, timeout=30)
+                    http_metrics.record_retry('epds', state, 'unauthorized')
+                    response = http_metrics.request('GET', epds_url, 'epds', state, headers=headers, params=params, timeout=30)
                     if response.status_code == 200:
                         data = json.loads(response.text)
+                        http_metrics.record_page('epds', state, len(data))
                         if total_pages > 10 and page % 10 == 0:
                             print(f"  Progress: {page}/{total_pages} pages fetched for {state}", flush=True)
                         return data, new_auth  # Return tuple to signal refresh
-                log_error(401, "Failed to refresh token")
+                log_error(401, "Failed to refresh token", state, page)
                 return [], headers.get("Authorization")
             elif response.status_code == 429:
-                log_error(response.status_code, "Rate limit exceeded. Retrying...")
-                time.sleep(2 ** attempt + 5)
+                log_error(response.status_code, "Rate limit exceeded. Retrying...", state, page)
+                http_metrics.record_retry('epds', state, 'rate_limited')
+                pause(2 ** attempt + RETRY_DELAY_SECONDS)
             else:
-                log_error(response.status_code, str(response.json()) if response.text else "No response body")
+                log_error(response.status_code, response.text or "No response body", state, page)
                 return [], headers.get("Authorization", "")
         except requests.exceptions.Timeout:
-            log_error(0, f"Request timeout for {state}, page {page}. Retrying...")
-            time.sleep(2 ** attempt + 5)
+            log_error(0, "Request timeout. Retrying...", state, page)
+            http_metrics.record_retry('epds', state, 'timeout')
+            pause(2 ** attempt + RETRY_DELAY_SECONDS)
         except requests.exceptions.RequestException as e:
-            log_error(0, f"Request error for {state}, page {page}: {str(e)}. Retrying...")
-            time.sleep(2 ** attempt + 5)
+            log_error(0, f"Request error: {e}. Retrying...", state, page)
+            http_metrics.record_retry('epds', state, 'error')
+            pause(2 ** attempt + RETRY_DELAY_SECONDS)
     return [], headers.get("Authorization", "")
 
-def fetch_epds(state: str, authorization):
+def fetch_epd_pages(state: str, auth_state: dict):
     """
-    Fetch EPDs for a state/country.
-    Returns: (list of EPDs, updated_authorization) or (None, updated_authorization) on error
-    If authorization is refreshed, returns tuple so caller can update it.
+    Fetch EPDs for a state/country one page at a time.
+    Yields: (page, total_pages, list of EPDs) for each page with data.
+    auth_state['authorization'] is updated in place when the token is refreshed, and
+    auth_state['failed'] is set to True if the token could not be refreshed.
     """
     params = {"plant_geography": state, "page_size": page_size}
-    headers = {"accept": "application/json", "Authorization": authorization}
+    headers = {"accept": "application/json", "Authorization": auth_state['authorization']}
     try:
         # Add timeout to initial request
-        response = requests.get(epds_url, headers=headers, params=params, timeout=30)
+        response = http_metrics.request('GET', epds_url, 'epds', state, headers=headers, params=params, timeout=30)
     except requests.exceptions.Timeout:
         print(f"Timeout fetching initial data for {state}. Skipping...", flush=True)
-        return [], authorization
+        return
     except requests.exceptions.RequestException as e:
         print(f"Request error for {state}: {str(e)}. Skipping...", flush=True)
-        return [], authorization
+        return
     
     # Handle 401 authentication errors - token may have expired
     if response.status_code == 401:
         print(f"Authentication expired for {state}. Attempting to refresh token...", flush=True)
+        http_metrics.record_token_refresh('epds')
         new_auth = get_auth()
         if new_auth:
             # Update authorization for caller
-            authorization = new_auth
+            auth_state['authorization'] = new_auth
             # Retry with new token
             headers["Authorization"] = new_auth
-            response = requests.get(epds_url, headers=headers, params=params, timeout=30)
+            http_metrics.record_retry('epds', state, 'unauthorized')
+            response = http_metrics.request('GET', epds_url, 'epds', state, headers=headers, params=params, timeout=30)
             if response.status_code == 200:
                 print(f"Token refreshed successfully for {state}", flush=True)
             else:
-                log_error(response.status_code, str(response.json()) if response.text else "No response body")
+                log_error(response.status_code, response.text or "No response body", state)
                 print(f"Still failed after token refresh for {state} (status: {response.status_code})", flush=True)
-                return None, authorization  # Return tuple to signal refresh
+                auth_state['failed'] = True
+                return
         else:
             print(f"Failed to refresh token for {state}. Skipping...", flush=True)
-            return None, authorization  # Return tuple to signal refresh
+            auth_state['failed'] = True
+            return
     
     if response.status_code != 200:
-        log_error(response.status_code, str(response.json()) if response.text else "No response body")
+        log_error(response.status_code, response.text or "No response body", state)
         print(f"No data found for {state} (status: {response.status_code})", flush=True)
-        return [], authorization
+        return
     # Handle case where X-Total-Pages header might be missing
     total_pages = int(response.headers.get('X-Total-Pages', 0))
     if total_pages == 0:
         print(f"No data found for {state}", flush=True)
-        return [], authorization
+        return
     print(f"Found {total_pages} pages for {state}", flush=True)
-    full_response = []
+    fetched = 0
     start_time = time.time()
     for page in range(1, total_pages + 1):
+        page_start = time.perf_counter()
         page_result = fetch_a_page(page, headers, state, total_pages)
         # fetch_a_page may return (data, new_auth) if token was refreshed
         if isinstance(page_result, tuple):
-            page_data, authorization = page_result
-            headers["Authorization"] = authorization
+            page_data, auth_state['authorization'] = page_result
+            headers["Authorization"] = auth_state['authorization']
         else:
             page_data = page_result
         
+        logger.info("Fetched page", extra={'region': state, 'page': page, 'stage': 'fetch',
+                                           'records': len(page_data), 'duration': time.perf_counter() - page_start})
         if page_data:
-            full_response.extend(page_data)
+            fetched += len(page_data)
+            if page_archive is not None:
+                try:
+                    page_archive.write_page(state, page, page_data)
+                except Exception:
+                    logger.exception("Could not archive page", extra={'region': state, 'page': page})
+            yield page, total_pages, page_data
         else:
             print(f"  Warning: No data returned for page {page}, continuing...", flush=True)
         # Only sleep if not the last page
         if page < total_pages:
-            time.sleep(1)
+            pause(PAGE_DELAY_SECONDS)
     elapsed_time = time.time() - start_time
-    time.sleep(10)
-    print(f"Fetched {len(full_response)} EPDs for {state} in {elapsed_time:.1f} seconds", flush=True)
-    return full_response, authorization
+    pause(REGION_DELAY_SECONDS)
+    print(f"Fetched {fetched} EPDs for {state} in {elapsed_time:.1f} seconds", flush=True)
+    logger.info("Fetched region", extra={'region': state, 'stage': 'fetch', 'records': fetched, 'duration': elapsed_time})
+
+def fetch_epds(state: str, authorization):
+    """
+    Fetch EPDs for a state/country.
+    Returns: (list of EPDs, updated_authorization) or (None, updated_authorization) on error
+    If authorization is refreshed, returns tuple so caller can update it.
+    """
+    auth_state = {'authorization': authorization, 'failed': False}
+    full_response = []
+    for page, _, page_data in fetch_epd_pages(state, auth_state):
+        # Strip, validate and intern as pages arrive so the region's records share category objects;
+        # write_region_outputs writes them as they are
+        valid, rejected = normalize_page(page_data)
+        quarantine.write_many(state, page, rejected)
+        full_response.extend(valid)
+    if auth_state['failed']:
+        return None, auth_state['authorization']  # Return tuple to signal refresh
+    return full_response, auth_state['authorization']
 
 def remove_null_values(data):
     if isinstance(data, list):
@@ -184,6 +349,68 @@ def remove_null_values(data):
         return {k: remove_null_values(v) for k, v in data.items() if v is not None}
     return data
 
+def intern_dimensions(epd, count=True):
+    """
+    Swap the EPD's category, plant and manufacturer for the shared objects with the same ids (in place).
+    count=False leaves the per-plant/manufacturer product counts alone (records interned again later).
+    """
+    if NORMALIZE_CATEGORIES and isinstance(epd.get('category'), dict):
+        epd['category'] = category_table.intern(epd['category'], count)
+    if NORMALIZE_PLANTS:
+        plant = epd.get('plant_or_group')
+        if isinstance(plant, dict):
+            if isinstance(plant.get('owned_by'), dict):
+                plant['owned_by'] = manufacturer_table.intern(plant['owned_by'], count=False)
+            epd['plant_or_group'] = plant_table.intern(plant, count)
+        if isinstance(epd.get('manufacturer'), dict):
+            epd['manufacturer'] = manufacturer_table.intern(epd['manufacturer'], count)
+    return epd
+
+def normalize_epd(epd, count=True):
+    return intern_dimensions(remove_null_values(epd), count)
+
+def normalize_page(records, count=True):
+    """
+    Strip nulls from a page of records, validate them and intern the valid ones.
+    Returns: (valid EPDs, rejected (record, reason) pairs)
+    """
+    stripped = [remove_null_values(epd) for epd in records if epd is not None]
+    if VALIDATE_EPDS:
+        stripped, rejected = validate_page(stripped, validate_epd)
+    else:
+        rejected = []
+    return [intern_dimensions(epd, count) for epd in stripped], rejected
+
+def report_quarantine():
+    quarantine.close()
+    if len(quarantine):
+        regions = ', '.join(f"{region} ({count})" for region, count in sorted(quarantine.counts.items()))
+        print(f"⚠ {len(quarantine)} malformed EPDs quarantined to {QUARANTINE_FILE}: {regions}", flush=True)
+
+def reference_layout(epd):
+    """Copy of the EPD with shared objects replaced by references, per the *_REFERENCE_LAYOUT settings."""
+    replaced = {}
+    if CATEGORY_REFERENCE_LAYOUT and isinstance(epd.get('category'), dict):
+        replaced['category'] = category_table.reference(epd['category'], CATEGORY_REFERENCE_FIELDS)
+    if PLANT_REFERENCE_LAYOUT:
+        if isinstance(epd.get('plant_or_group'), dict):
+            replaced['plant_or_group'] = plant_table.reference(epd['plant_or_group'], PLANT_REFERENCE_FIELDS)
+        if isinstance(epd.get('manufacturer'), dict):
+            replaced['manufacturer'] = manufacturer_table.reference(epd['manufacturer'], MANUFACTURER_REFERENCE_FIELDS)
+    return dict(epd, **replaced) if replaced else epd
+
+def save_dimension_tables():
+    if NORMALIZE_CATEGORIES:
+        category_table.save(CATEGORIES_FILE)
+        print(f"✓ {len(category_table)} categories ({category_table.references} references) saved to: {CATEGORIES_FILE}", flush=True)
+    if NORMALIZE_PLANTS:
+        plant_table.save(PLANTS_FILE)
+        manufacturer_table.save(MANUFACTURERS_FILE)
+        plant_table.save_csv(PLANTS_CSV, PLANT_CSV_FIELDS)
+        manufacturer_table.save_csv(MANUFACTURERS_CSV, MANUFACTURER_CSV_FIELDS)
+        print(f"✓ {len(plant_table)} plants and {len(manufacturer_table)} manufacturers saved to: "
+              f"{PLANTS_CSV}, {MANUFACTURERS_CSV}", flush=True)
+
 def get_zipcode_from_epd(epd):
     zipcode = epd.get('manufacturer', {}).get('postal_code')
     if not zipcode:
@@ -212,51 +439,72 @@ def fetch_openepd_data_for_epd(epd, authorization):
         return None
     
     try:
-        openepd_epd = fetch_from_openepd_by_id(epd_id, authorization)
+        openepd_epd = fetch_from_openepd_by_id(epd_id, authorization, metrics=http_metrics)
         return openepd_epd
     except Exception as e:
-        logging.warning(f"Failed to fetch openEPD data for {epd_id}: {str(e)}")
+        logger.warning("Failed to fetch openEPD data for %s: %s", epd_id, e)
         return None
 
-def save_json_to_yaml(state: str, json_data: list, authorization=None):
+def enrich_with_openepd(epd: dict, authorization=None):
     """
-    Save EPD data to YAML files, optionally merging with openEPD data.
-    
-    Args:
-        state: State/country code
-        json_data: List of EPD data from EC3 API
-        authorization: Optional Bearer token for openEPD API fetching
+    Merge openEPD impact/resource data into an EPD when enabled and EC3 data is missing it.
+    Returns: (epd, fetched, merged) where fetched/merged are 0 or 1 for progress counts.
     """
-    filtered_data = remove_null_values(json_data)
-    openepd_fetched = 0
-    openepd_merged = 0
-    
-    for epd in filtered_data:
+    if not (ENABLE_OPENEPD_FETCH and authorization and should_fetch_from_openepd(epd)):
+        return epd, 0, 0
+    openepd_epd = fetch_openepd_data_for_epd(epd, authorization)
+    if not openepd_epd:
+        return epd, 0, 0
+    merged_epd = merge_impact_data(epd, openepd_epd)
+    merged = 1 if merged_epd.get('_data_sources', {}).get('merged_impacts') or \
+        merged_epd.get('_data_sources', {}).get('merged_resources') else 0
+    # Remove metadata before saving
+    merged_epd.pop('_data_sources', None)
+    return merged_epd, 1, merged
+
+class YamlSink(OutputSink):
+    """Writes each EPD to <category folder>/<material_id>.yaml, optionally merged with openEPD data."""
+
+    def __init__(self, state: str, authorization=None):
+        self.state = state
+        self.authorization = authorization
+        self.openepd_fetched = 0
+        self.openepd_merged = 0
+
+    def write(self, epd: dict):
         display_name = epd['category']['display_name'].replace(" ", "_")
         material_id = epd['material_id']
         zipcode = get_zipcode_from_epd(epd) or "unknown"
-        folder_path = create_folder_path(state, zipcode, display_name)
+        folder_path = create_folder_path(self.state, zipcode, display_name)
         os.makedirs(folder_path, exist_ok=True)
         
         # Optionally fetch from openEPD API to merge impact/resource data
-        merged_epd = epd
-        if ENABLE_OPENEPD_FETCH and authorization and should_fetch_from_openepd(epd):
-            openepd_epd = fetch_openepd_data_for_epd(epd, authorization)
-            if openepd_epd:
-                openepd_fetched += 1
-                merged_epd = merge_impact_data(epd, openepd_epd)
-                if merged_epd.get('_data_sources', {}).get('merged_impacts') or \
-                   merged_epd.get('_data_sources', {}).get('merged_resources'):
-                    openepd_merged += 1
-                # Remove metadata before saving
-                merged_epd.pop('_data_sources', None)
+        merged_epd, fetched, merged = enrich_with_openepd(epd, self.authorization)
+        self.openepd_fetched += fetched
+        self.openepd_merged += merged
         
+        merged_epd = reference_layout(merged_epd)
         file_path = os.path.join(folder_path, f"{material_id}.yaml")
+        # Serialize before opening the file so a record that cannot be dumped leaves no partial YAML
+        text = yaml.dump(merged_epd, Dumper=NoAliasDumper, default_flow_style=False)
         with open(file_path, "w") as yaml_file:
-            yaml.dump(merged_epd, yaml_file, default_flow_style=False)
+            yaml_file.write(text)
+
+    def close(self):
+        if ENABLE_OPENEPD_FETCH and self.openepd_fetched > 0:
+            print(f"  openEPD: Fetched {self.openepd_fetched} EPDs, merged {self.openepd_merged} with additional data", flush=True)
+
+def save_json_to_yaml(state: str, json_data: list, authorization=None):
+    """
+    Save EPD data to YAML files, optionally merging with openEPD data.
     
-    if ENABLE_OPENEPD_FETCH and openepd_fetched > 0:
-        print(f"  openEPD: Fetched {openepd_fetched} EPDs, merged {openepd_merged} with additional data", flush=True)
+    Args:
+        state: State/country code
+        json_data: List of EPD data from EC3 API
+        authorization: Optional Bearer token for openEPD API fetching
+    """
+    with OutputStage([YamlSink(state, authorization)]) as stage:
+        stage.write_many(normalize_epd(epd) for epd in json_data if epd is not None)
 
 def map_response(epd: dict) -> dict:
     return {
@@ -272,11 +520,14 @@ def map_response(epd: dict) -> dict:
 
 def write_csv_others(title: str, epds: list):
     os.makedirs("../../products-data", exist_ok=True)
+    # Rows are formatted before the file is opened, so a bad row leaves the previous CSV in place
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Name", "ID", "Zip", "County", "Address", "Latitude", "Longitude"])
+    for epd in epds:
+        writer.writerow([epd['Name'], epd['ID'], epd['Zip'], epd['County'], epd['Address'], epd['Latitude'], epd['Longitude']])
     with open(f"../../products-data/{title}.csv", "w") as csv_file:
-        writer = csv.writer(csv_file)
-        writer.writerow(["Name", "ID", "Zip", "County", "Address", "Latitude", "Longitude"])
-        for epd in epds:
-            writer.writerow([epd['Name'], epd['ID'], epd['Zip'], epd['County'], epd['Address'], epd['Latitude'], epd['Longitude']])
+        csv_file.write(buffer.getvalue())
 
 def write_csv_cement(epds: list):
     """Write cement rows. Instead of a single central CSV, write per-state cement CSVs and
@@ -335,7 +586,7 @@ def write_csv_cement(epds: list):
             if not os.path.exists(yaml_path):
                 with open(yaml_path, 'w') as yf:
                     # Dump the mapped dict as YAML (minimal)
-                    yaml.dump(epd, yf, default_flow_style=False)
+                    yaml.dump(epd, yf, Dumper=NoAliasDumper, default_flow_style=False)
     except Exception:
         # Do not fail the entire process for YAML write issues
         pass
@@ -358,92 +609,556 @@ def write_epd_to_csv(epds: list, state: str):
     # Non-cement products remain written per-state under products-data
     write_csv_others(state, others_list)
 
-# Products CSV for India: maps region1 (IN) to region2 (US) with category_id and tariff_percent
+# Products CSV with tariff rates: maps region1 (e.g. IN) to region2 (US) with category_id and tariff_percent
+PRODUCTS_CSV_FIELDS = ['region1', 'region2', 'category_id', 'tariff_percent']
+
+def ensure_products_csv(region: str):
+    """Create an empty products.csv for a region if it does not exist yet."""
+    try:
+        os.makedirs(os.path.join("../../products-data", region), exist_ok=True)
+        out_path = os.path.join("../../products-data", region, 'products.csv')
+        if not os.path.exists(out_path):
+            with open(out_path, 'w') as f:
+                writer = csv.DictWriter(f, fieldnames=PRODUCTS_CSV_FIELDS)
+                writer.writeheader()
+    except Exception:
+        pass
+
+def write_products_rows(region: str, products: list):
+    os.makedirs(os.path.join("../../products-data", region), exist_ok=True)
+    out_path = os.path.join("../../products-data", region, 'products.csv')
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=PRODUCTS_CSV_FIELDS)
+    writer.writeheader()
+    for row in products:
+        writer.writerow(row)
+    with open(out_path, 'w') as f:
+        f.write(buffer.getvalue())
+
 def write_products_csv(raw_epds: list, state: str):
-    if state != 'IN' or not raw_epds:
-        # Ensure directory and empty CSV exist for downstream expectations
+    """
+    Write products-data/<region>/products.csv for every region that has a tariff table.
+    US states are domestic and get no rows; IN keeps an (empty) file for downstream expectations.
+    """
+    if not raw_epds:
+        ensure_products_csv('IN')
+        return
+    with OutputStage([TariffSink(state)]) as stage:
+        stage.write_many(raw_epds)
+
+def is_cement(epd: dict) -> bool:
+    return 'cement' in (epd.get('category', {}).get('openepd_name') or '').lower()
+
+class StateCsvSink(OutputSink):
+    """Collects mapped rows of non-cement products into products-data/<state>.csv."""
+
+    def __init__(self, state: str):
+        self.state = state
+        self.rows = []
+
+    def write(self, epd: dict):
+        if not is_cement(epd):
+            self.rows.append(map_response(epd))
+
+    def close(self):
+        write_csv_others(self.state, self.rows)
+
+class CementCsvSink(OutputSink):
+    """Collects mapped rows of cement products into the per-state cement CSVs."""
+
+    def __init__(self, state: str):
+        self.state = state
+        self.rows = []
+
+    def write(self, epd: dict):
+        if is_cement(epd):
+            row = map_response(epd)
+            # tag with state for downstream per-state cement handling
+            row['State'] = self.state
+            self.rows.append(row)
+
+    def close(self):
+        write_csv_cement(self.rows)
+
+class TariffSink(OutputSink):
+    """Collects products.csv tariff rows for regions that have a tariff table."""
+
+    def __init__(self, state: str):
+        self.state = state
+        self.classifier = get_classifier(state)
+        self.rows = []
+
+    def write(self, epd: dict):
+        if self.classifier is None:
+            return
         try:
-            os.makedirs(os.path.join("../../products-data", 'IN'), exist_ok=True)
-            out_path = os.path.join("../../products-data", 'IN', 'products.csv')
-            if not os.path.exists(out_path):
-                with open(out_path, 'w') as f:
-                    writer = csv.DictWriter(f, fieldnames=['region1', 'region2', 'category_id', 'tariff_percent'])
-                    writer.writeheader()
+            row = classify_epd(epd, self.state)
+        except Exception:
+            return
+        if row is not None:
+            self.rows.append(row)
+
+    def close(self):
+        if self.classifier is None:
+            # Ensure directory and empty CSV exist for downstream expectations
+            ensure_products_csv('IN')
+            return
+        try:
+            write_products_rows(self.state, self.rows)
         except Exception:
             pass
+
+class GwpSketchSink(OutputSink):
+    """Adds each EPD's GWP to the streaming per-category sketch of its region."""
+
+    def __init__(self, state: str, registry: SketchRegistry):
+        self.state = state
+        self.registry = registry
+        # A re-pulled region replaces its sketches from earlier runs
+        registry.reset_region(state)
+
+    def write(self, epd: dict):
+        value = epd.get(GWP_SKETCH_METRIC)
+        category = epd.get('category', {})
+        self.registry.add(self.state, category.get('id'), parse_quantity(value),
+                          category.get('display_name'), quantity_unit(value))
+
+def save_gwp_sketches():
+    """Persist the sketches and write the approximate percentile summary for the frontend."""
+    gwp_sketches.save(GWP_SKETCH_FILE)
+    with open(GWP_PERCENTILES_FILE, 'w') as f:
+        json.dump(gwp_sketches.summary(GWP_SKETCH_METRIC), f, indent=1)
+    print(f"✓ GWP percentile summary saved to: {GWP_PERCENTILES_FILE}", flush=True)
+
+def save_http_metrics(label: str = None, report: bool = False):
+    """Write the request metrics files; label (a queue worker id) is added to the file names."""
+    prometheus_path, json_path = HTTP_METRICS_PROM, HTTP_METRICS_JSON
+    if label:
+        prometheus_path = prometheus_path.replace('.prom', f'-{label}.prom')
+        json_path = json_path.replace('.json', f'-{label}.json')
+    try:
+        http_metrics.save(prometheus_path, json_path)
+    except OSError:
+        logger.exception("Could not save HTTP metrics")
         return
+    if report:
+        print("\nAPI requests:", flush=True)
+        print(format_http_summary(http_metrics.summary()), flush=True)
+        print(f"✓ Request metrics saved to: {prometheus_path}, {json_path}", flush=True)
+
+def save_stage_stats(stats: list):
+    """Write per-stage stats (pipeline.format_stage_stats rows) to STAGE_STATS_FILE."""
     try:
-        products = []
-        # Map keywords to tariff percentage - search in both category and product description
-        keyword_to_tariff = {
-            'kitchen cabinet': 50,
-            'kitchen cabinets': 50,
-            'bathroom vanity': 50,
-            'bathroom vanities': 50,
-            'upholstered furniture': 30,
-            'furniture': 30,  # Broader match for furniture
-            'tables': 30,     # Tables are furniture
-            'wardrobes': 30,  # Found in descriptions
-        }
-        for epd in raw_epds:
+        with open(STAGE_STATS_FILE, 'w') as f:
+            json.dump(stats, f, indent=1)
+    except OSError:
+        logger.exception("Could not save stage stats")
+
+def build_output_sinks(state: str, authorization=None) -> list:
+    """Sinks written for every region. Add new outputs here instead of another pass over the results."""
+    sinks = [
+        YamlSink(state, authorization),
+        StateCsvSink(state),
+        CementCsvSink(state),
+        TariffSink(state),
+    ]
+    if ENABLE_GWP_SKETCHES:
+        sinks.append(GwpSketchSink(state, gwp_sketches))
+    return sinks
+
+def write_region_outputs(state: str, records: list, authorization=None) -> int:
+    """
+    Visit each EPD of a region once and dispatch it to every output sink.
+    Records must already be normalized (normalize_page), as in the pipeline's write stage.
+    """
+    with OutputStage(build_output_sinks(state, authorization)) as stage:
+        stage.write_many(records)
+    return stage.count
+
+# ✅ Staged pipeline: fetch → normalize → enrich → write, connected by bounded queues
+PageBatch = namedtuple('PageBatch', ['state', 'page', 'records'])
+RegionDone = namedtuple('RegionDone', ['state', 'pages'])
+
+def run_pipeline(regions: list, authorization, profiler: Profiler = None) -> list:
+    """
+    Pull and write all regions with the fetch, normalize, enrich and write stages running concurrently.
+    With a profiler, every stage function is profiled and memory is sampled after each written page.
+    Returns per-stage stats (see pipeline.format_stage_stats).
+    """
+    auth_state = {'authorization': authorization, 'failed': False}
+    total_regions = len(regions)
+    region_index = {state: idx for idx, state in enumerate(regions, 1)}
+
+    def fetch(state):
+        print(f"\n[{region_index[state]}/{total_regions}] Fetching and processing: {state}", flush=True)
+        pages = 0
+        try:
+            for page, _, page_data in fetch_epd_pages(state, auth_state):
+                pages += 1
+                yield PageBatch(state, page, page_data)
+        except Exception:
+            # Keep the pages already fetched; the region still gets closed below
+            logger.exception("Fetching stopped early", extra={'region': state, 'stage': 'fetch'})
+        yield RegionDone(state, pages)
+
+    def dropped(item, stage):
+        # A failed page still goes downstream (empty) so write counts it and closes the region
+        logger.exception("Page dropped", extra={'region': item.state, 'page': item.page, 'stage': stage})
+        return [PageBatch(item.state, item.page, [])]
+
+    def normalize(item):
+        if isinstance(item, PageBatch):
             try:
-                category_info = epd.get('category', {}) if isinstance(epd, dict) else {}
-                display_name = (category_info.get('display_name') or '').strip()
-                product_name = (epd.get('name') or '').strip()
-                product_description = (epd.get('description') or '').strip()
-                
-                # Get category_id from category.id (to match EPD naming)
-                category_id = category_info.get('id', '')
-                
-                # Search in category name, product name, and description
-                search_text = f"{display_name} {product_name} {product_description}".lower()
-                
-                matched_tariff = None
-                for kw, rate in keyword_to_tariff.items():
-                    if kw in search_text:
-                        matched_tariff = rate
-                        break
-                
-                if matched_tariff is None:
-                    continue
-                    
-                # Create product entry with new structure
-                products.append({
-                    'region1': 'IN',  # India
-                    'region2': 'US',  # Placeholder - actual US state mapping TBD
-                    'category_id': category_id,
-                    'tariff_percent': matched_tariff,
-                })
+                valid, rejected = normalize_page(item.records)
+                quarantine.write_many(item.state, item.page, rejected)
             except Exception:
+                return dropped(item, 'normalize')
+            item = PageBatch(item.state, item.page, valid)
+        return [item]
+
+    openepd_counts = defaultdict(lambda: [0, 0])
+    def enrich(item):
+        if isinstance(item, PageBatch) and ENABLE_OPENEPD_FETCH:
+            records = []
+            try:
+                for epd in item.records:
+                    epd, fetched, merged = enrich_with_openepd(epd, auth_state['authorization'])
+                    openepd_counts[item.state][0] += fetched
+                    openepd_counts[item.state][1] += merged
+                    records.append(epd)
+            except Exception:
+                return dropped(item, 'enrich')
+            item = PageBatch(item.state, item.page, records)
+        return [item]
+
+    # Output stages stay open until every page of the region has been written
+    open_regions = {}
+    write_lock = threading.Lock()
+    def finish_region(state, region):
+        if region['stage'] is None:
+            print(f"⚠ Skipped {state}: No data available", flush=True)
+            return
+        region['stage'].close()
+        fetched, merged = openepd_counts.pop(state, (0, 0))
+        if fetched:
+            print(f"  openEPD: Fetched {fetched} EPDs, merged {merged} with additional data", flush=True)
+        print(f"✓ Completed {state}: {region['epds']} EPDs saved", flush=True)
+        logger.info("Region written", extra={'region': state, 'stage': 'write', 'records': region['epds']})
+        save_http_metrics()
+
+    def write(item):
+        with write_lock:
+            region = open_regions.setdefault(item.state, {'stage': None, 'written': 0, 'epds': 0, 'pages': None})
+            if isinstance(item, PageBatch):
+                if region['stage'] is None:
+                    # Enrichment already ran upstream, so the YAML sink gets no authorization
+                    region['stage'] = OutputStage(build_output_sinks(item.state))
+                try:
+                    region['stage'].write_many(item.records)
+                    region['epds'] += len(item.records)
+                    if profiler is not None:
+                        profiler.sample_region(item.state)
+                finally:
+                    # Count the page even if it failed so the region still gets closed
+                    region['written'] += 1
+            else:
+                region['pages'] = item.pages
+            if region['pages'] is not None and region['written'] == region['pages']:
+                del open_regions[item.state]
+                finish_region(item.state, region)
+
+    funcs = {'fetch': fetch, 'normalize': normalize, 'enrich': enrich, 'write': write}
+    if profiler is not None:
+        funcs = {name: profiler.wrap(name, func) for name, func in funcs.items()}
+    stages = [Stage(name, func, PIPELINE_WORKERS[name], PIPELINE_QUEUE_SIZE) for name, func in funcs.items()]
+    stats = Pipeline(stages).run(regions)
+    # A page lost before the write stage leaves its region open: flush what it has rather than
+    # dropping its CSVs and products.csv rows
+    for state, region in list(open_regions.items()):
+        print(f"⚠ {state}: {region['written']} of {region['pages']} pages written", flush=True)
+        logger.warning("Region incomplete", extra={'region': state, 'stage': 'write', 'records': region['epds']})
+        finish_region(state, region)
+    open_regions.clear()
+    return stats
+
+# ✅ Offline rebuild from the page archive: one region per worker process, no network
+def rebuild_region(region: str, files: list) -> dict:
+    """
+    Regenerate one region's YAML files and CSVs from archived pages (runs in a worker process).
+    openEPD enrichment is skipped; archived pages hold the EC3 records as fetched.
+    Returns the region's GWP sketches, dimension table entries and rejected records for the
+    parent to merge (the quarantine file is written by the parent only).
+    """
+    tables = (category_table, plant_table, manufacturer_table)
+    for table in tables:
+        table.reset_counts()
+    # Cement CSVs are appended to, so start the region's files fresh
+    for cement_csv in (os.path.join("../../products-data", region, 'Cement.csv'),
+                       os.path.join("..", "..", "profile", "cement", "US", region, 'Cement.csv')):
+        if os.path.exists(cement_csv):
+            os.remove(cement_csv)
+    records = []
+    rejected = []
+    for path in files:
+        valid, page_rejected = normalize_page(read_page(path))
+        records.extend(valid)
+        if page_rejected:
+            rejected.append((page_number(path), page_rejected))
+    count = write_region_outputs(region, records)
+    return {
+        'region': region,
+        'epds': count,
+        'sketches': gwp_sketches.region_to_dict(region) if ENABLE_GWP_SKETCHES else None,
+        'tables': [table.seen_to_dict() for table in tables],
+        'rejected': rejected,
+    }
+
+def rebuild_outputs(run_id: str = None, workers: int = None, regions: list = None):
+    """Rebuild products-data from an archived run (the latest by default)."""
+    runs = list_runs(ARCHIVE_DIR)
+    if not runs:
+        print(f"✗ No archived runs in {ARCHIVE_DIR}", flush=True)
+        return False
+    run_id = run_id or runs[-1]
+    if run_id not in runs:
+        print(f"✗ Unknown run {run_id}. Archived runs: {', '.join(runs)}", flush=True)
+        return False
+    pages = run_pages(ARCHIVE_DIR, run_id)
+    if regions:
+        pages = {region: files for region, files in pages.items() if region in regions}
+    print(f"Rebuilding {len(pages)} regions from archived run {run_id}...", flush=True)
+    return rebuild_pages(pages, workers)
+
+def rebuild_pages(pages: dict, workers: int = None):
+    """Write products-data from archived page files ({region: [paths]}) using all CPU cores."""
+    quarantine.clear()
+
+    start_time = time.time()
+    tables = (category_table, plant_table, manufacturer_table)
+    for table in tables:
+        table.reset_counts()
+    total = 0
+    # Worker processes log through their own listener (a forked one would have no running thread)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=setup_logging, initargs=(LOG_FILE, LOG_LEVELS)) as executor:
+        futures = {executor.submit(rebuild_region, region, files): region for region, files in pages.items()}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception("Rebuild failed", extra={'region': futures[future]})
+                print(f"✗ Rebuild failed for {futures[future]} (see output.log)", flush=True)
                 continue
-        os.makedirs(os.path.join("../../products-data", 'IN'), exist_ok=True)
-        out_path = os.path.join("../../products-data", 'IN', 'products.csv')
-        with open(out_path, 'w') as f:
-            writer = csv.DictWriter(f, fieldnames=['region1', 'region2', 'category_id', 'tariff_percent'])
-            writer.writeheader()
-            for row in products:
-                writer.writerow(row)
-    except Exception:
-        pass
+            if result['sketches'] is not None:
+                gwp_sketches.update_region(result['region'], result['sketches'])
+            for table, seen in zip(tables, result['tables']):
+                table.merge_seen(seen)
+            for page, page_rejected in result['rejected']:
+                quarantine.write_many(result['region'], page, page_rejected)
+            total += result['epds']
+            print(f"✓ Rebuilt {result['region']}: {result['epds']} EPDs", flush=True)
+    if ENABLE_GWP_SKETCHES:
+        save_gwp_sketches()
+    save_dimension_tables()
+    report_quarantine()
+    if WRITE_PUBLISH_CHANGES:
+        write_changes("../../products-data")
+    print(f"\n✓ Rebuilt {total} EPDs in {time.time() - start_time:.1f} seconds", flush=True)
+    return True
+
+# ✅ Distributed crawl: regions in a lease queue, fetched by any number of workers
+def queue_path(run_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, run_id, QUEUE_FILE)
+
+def queue_runs() -> list:
+    """Runs of the page archive that have a queue, oldest first"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(run for run in os.listdir(ARCHIVE_DIR) if os.path.exists(queue_path(run)))
+
+def open_queue(run_id: str = None):
+    runs = queue_runs()
+    run_id = run_id or (runs[-1] if runs else None)
+    if run_id not in runs:
+        print(f"✗ No queue for run {run_id}. Queued runs: {', '.join(runs) or 'none'}", flush=True)
+        return None, None
+    return run_id, LeaseQueue(queue_path(run_id), max_attempts=QUEUE_MAX_ATTEMPTS)
+
+def enqueue_regions(regions: list) -> str:
+    """Start a queued run with one item per region. Returns the run id."""
+    archive = PageArchive(ARCHIVE_DIR)
+    queue = LeaseQueue(queue_path(archive.run_id), max_attempts=QUEUE_MAX_ATTEMPTS)
+    added = queue.enqueue((region, None) for region in regions)
+    print(f"✓ Queued {added} regions in run {archive.run_id}", flush=True)
+    print(f"  Start workers with: python product-footprints.py worker --run {archive.run_id}", flush=True)
+    return archive.run_id
+
+def fetch_leased_region(region: str, auth_state: dict, archive: PageArchive, heartbeat: Heartbeat) -> dict:
+    """Fetch and archive one leased region. Returns the queue result: archived page files and EPD count."""
+    files = []
+    epds = 0
+    for page, _, page_data in fetch_epd_pages(region, auth_state):
+        heartbeat.check()
+        files.append(archive.write_page(region, page, page_data))
+        epds += len(page_data)
+    if auth_state['failed']:
+        raise RuntimeError(f"Authorization failed while fetching {region}")
+    heartbeat.check()
+    return {'manifest': archive.manifest, 'pages': files, 'epds': epds}
+
+def run_queue_worker(run_id: str = None, worker_id: str = None) -> bool:
+    """Lease and fetch regions until the queue has nothing left to do."""
+    run_id, queue = open_queue(run_id)
+    if queue is None:
+        return False
+    worker_id = worker_id or default_worker_id()
+    # One manifest per worker, so workers on other hosts never append to the same file
+    archive = PageArchive(ARCHIVE_DIR, run_id, manifest=f"manifest-{worker_id}.ndjson")
+    authorization = get_auth()
+    if not authorization:
+        return False
+    auth_state = {'authorization': authorization, 'failed': False}
+    print(f"Worker {worker_id} started on run {run_id}", flush=True)
+    while True:
+        lease = queue.lease(worker_id, QUEUE_LEASE_SECONDS)
+        if lease is None:
+            if not queue.active():
+                break
+            # Other workers hold the remaining regions; their leases may still expire
+            time.sleep(QUEUE_POLL_SECONDS)
+            continue
+        print(f"\n[{worker_id}] Fetching {lease.key} (attempt {lease.attempt})", flush=True)
+        auth_state['failed'] = False
+        try:
+            with Heartbeat(queue, lease, QUEUE_LEASE_SECONDS) as heartbeat:
+                result = fetch_leased_region(lease.key, auth_state, archive, heartbeat)
+        except LeaseLost:
+            print(f"⚠ Lease on {lease.key} expired and was taken over; moving on", flush=True)
+            continue
+        except Exception as e:
+            logger.exception("Queue worker failed", extra={'region': lease.key, 'worker': worker_id,
+                                                           'attempt': lease.attempt})
+            queue.fail(lease, e)
+            print(f"✗ {lease.key} failed: {e}", flush=True)
+            continue
+        if queue.complete(lease, result):
+            print(f"✓ Fetched {lease.key}: {result['epds']} EPDs in {len(result['pages'])} pages", flush=True)
+        save_http_metrics(worker_id)
+    print(f"\n✓ Worker {worker_id} done: queue {queue.counts()}", flush=True)
+    save_http_metrics(worker_id, report=True)
+    return True
+
+def merge_queue_outputs(run_id: str = None, workers: int = None, wait: bool = True) -> bool:
+    """Coordinator: wait for the queue to drain, then write products-data from the pages of completed regions."""
+    run_id, queue = open_queue(run_id)
+    if queue is None:
+        return False
+    while wait and queue.active():
+        print(f"Waiting for workers: {queue.counts()}", flush=True)
+        time.sleep(QUEUE_POLL_SECONDS)
+    for region, error in queue.failures():
+        print(f"⚠ {region} failed after {QUEUE_MAX_ATTEMPTS} attempts: {error}", flush=True)
+    run_dir = os.path.join(ARCHIVE_DIR, run_id)
+    # Only the pages of the lease that completed each region, not those of expired attempts
+    pages = {region: [os.path.join(run_dir, path) for path in result['pages']]
+             for region, result in queue.results() if result and result['pages']}
+    print(f"Merging {len(pages)} regions from queued run {run_id}...", flush=True)
+    return rebuild_pages(pages, workers)
 
 # ✅ MAIN SCRIPT
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pull EPDs from EC3 into products-data")
+    parser.add_argument('command', nargs='?', choices=['pull', 'rebuild', 'enqueue', 'worker', 'merge'],
+                        default='pull',
+                        help="pull from the API (default), rebuild outputs from the page archive, or "
+                             "enqueue regions / run a queue worker / merge a queued run")
+    parser.add_argument('--run', help="Archived or queued run id (default: latest)")
+    parser.add_argument('--regions', nargs='*', help="Only pull, rebuild or enqueue these regions")
+    parser.add_argument('--workers', type=int, help="Rebuild/merge worker processes (default: CPU count)")
+    parser.add_argument('--worker-id', help="Queue worker name (default: <host>-<pid>)")
+    parser.add_argument('--no-wait', action='store_true', help="Merge without waiting for active regions")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Profile the pull per stage (CPU, memory, collapsed stacks) into {PROFILE_DIR}/")
+    parser.add_argument('--sequential', action='store_true', help="Pull one region at a time (USE_PIPELINE = False)")
+    args = parser.parse_args()
+    setup_logging(LOG_FILE, LOG_LEVELS)
+    if args.command == 'rebuild':
+        exit(0 if rebuild_outputs(args.run, args.workers, args.regions) else 1)
+    if args.command == 'enqueue':
+        enqueue_regions(args.regions or states)
+        exit(0)
+    if args.command == 'worker':
+        exit(0 if run_queue_worker(args.run, args.worker_id) else 1)
+    if args.command == 'merge':
+        exit(0 if merge_queue_outputs(args.run, args.workers, wait=not args.no_wait) else 1)
+
+    quarantine.clear()
+    if ARCHIVE_PAGES:
+        if ARCHIVE_KEEP_RUNS is not None:
+            pruned = prune_runs(ARCHIVE_DIR, max(ARCHIVE_KEEP_RUNS - 1, 0), protect=queue_runs())
+            if pruned:
+                print(f"Removed {len(pruned)} old archived runs: {', '.join(pruned)}", flush=True)
+        page_archive = PageArchive(ARCHIVE_DIR)
+        print(f"Archiving raw pages to {page_archive.run_dir}", flush=True)
+    profiler = Profiler(PROFILE_DIR) if args.profile else None
+    regions = args.regions or states
     authorization = get_auth()
-    if authorization:
-        total_regions = len(states)
+    if authorization and USE_PIPELINE and not args.sequential:
+        print(f"Starting pipelined processing of {len(regions)} regions...", flush=True)
+        stats = run_pipeline(regions, authorization, profiler)
+        print(f"\n✓ All regions processed!", flush=True)
+        print("\nStage utilization:", flush=True)
+        print(format_stage_stats(stats), flush=True)
+        save_stage_stats(stats)
+        save_http_metrics(report=True)
+        if ENABLE_GWP_SKETCHES:
+            save_gwp_sketches()
+        save_dimension_tables()
+        report_quarantine()
+        if WRITE_PUBLISH_CHANGES:
+            write_changes("../../products-data")
+    elif authorization:
+        total_regions = len(regions)
         print(f"Starting processing of {total_regions} regions...", flush=True)
-        for idx, state in enumerate(states, 1):
+        stage_time = {'fetch': [0, 0.0], 'write': [0, 0.0]}  # stage -> [regions, busy seconds]
+        if profiler is not None:
+            # Without the pipeline the stages are the region-level fetch and write
+            fetch_epds = profiler.wrap('fetch', fetch_epds)
+            write_region_outputs = profiler.wrap('write', write_region_outputs)
+        for idx, state in enumerate(regions, 1):
             print(f"\n[{idx}/{total_regions}] Fetching and processing: {state}", flush=True)
+            fetch_start = time.perf_counter()
             result = fetch_epds(state, authorization)
+            stage_time['fetch'][0] += 1
+            stage_time['fetch'][1] += time.perf_counter() - fetch_start
             # fetch_epds always returns (results, authorization) tuple
             results, authorization = result
             if results:
-                save_json_to_yaml(state, results, authorization)
-                # Create products CSV for IN with region mapping and tariff rates
-                write_products_csv(results, state)
-                mapped_results = [map_response(epd) for epd in results]
-                write_epd_to_csv(mapped_results, state)
+                # YAML files, per-state CSV, cement CSV and products.csv in one pass
+                write_start = time.perf_counter()
+                write_region_outputs(state, results, authorization)
+                stage_time['write'][0] += 1
+                stage_time['write'][1] += time.perf_counter() - write_start
+                if profiler is not None:
+                    profiler.sample_region(state)
                 print(f"✓ Completed {state}: {len(results)} EPDs saved", flush=True)
+                logger.info("Region written", extra={'region': state, 'stage': 'write', 'records': len(results),
+                                                     'duration': time.perf_counter() - write_start})
             else:
                 print(f"⚠ Skipped {state}: No data available", flush=True)
+            save_http_metrics()
         print(f"\n✓ All regions processed!", flush=True)
+        save_stage_stats([{'stage': name, 'workers': 1, 'items_in': items, 'busy_seconds': round(busy, 3)}
+                          for name, (items, busy) in stage_time.items()])
+        save_http_metrics(report=True)
+        if ENABLE_GWP_SKETCHES:
+            save_gwp_sketches()
+        save_dimension_tables()
+        report_quarantine()
+        if WRITE_PUBLISH_CHANGES:
+            write_changes("../../products-data")
+    if profiler is not None:
+        report_dir = profiler.write_report()
+        print("\nProfile:", flush=True)
+        print(format_profile_summary(report_dir), flush=True)
+        print(f"✓ Profile report saved to: {report_dir}", flush=True)
@@ -0,0 +1,395 @@
+"""
+Local read-only HTTP API over the pulled catalog.
+Serves products, category listings and region summaries as JSON, plus the raw YAML files
+under /products-data/ so the web pages can be pointed at it instead of GitHub.
+
+Responses carry a strong ETag (one per content-coding) and Cache-Control, conditional GETs
+return 304, and bodies are gzipped when the client accepts it. Encoded responses are kept in an
+in-memory LRU, so repeated requests for hot products skip YAML parsing and JSON encoding entirely.
+
+Endpoints:
+    GET /products/<material_id>         Full EPD record (references expanded)
+    GET /products?category=&state=&country=&declared_unit=&postal_prefix=&sort=&desc=1&k=
+    GET /categories                     Category ids, names and product counts
+    GET /regions                        Product counts and GWP quartiles per region
+    GET /regions/<region>               One region, with per-category counts
+    GET /products-data/<path>.yaml      Raw YAML file
+    GET /health
+
+Usage:
+    python query_catalog.py build
+    python product_api.py --port 8765
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import yaml
+
+from analyze_emissions_data import load_yaml
+from catalog import DEFAULT_BASE_PATH
+from dimensions import expand_references, load_reference_tables
+from query_catalog import CATALOG_INDEX_FILE, METRICS, CatalogIndex
+
+CACHE_MAX_AGE = 300        # seconds clients and proxies may reuse a response
+LRU_SIZE = 4096            # encoded responses kept in memory
+GZIP_MIN_BYTES = 512       # smaller bodies are sent uncompressed
+INDEX_CHECK_SECONDS = 2.0  # how often to look for a rebuilt catalog index
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+class LRUCache:
+    """Thread-safe least-recently-used cache"""
+
+    def __init__(self, maxsize=LRU_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+class Response:
+    """
+    An encoded response body with its ETag and an optional gzipped copy.
+    The gzipped copy has its own strong ETag (a strong validator differs per content-coding).
+    """
+
+    def __init__(self, status, body, content_type='application/json'):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        digest = hashlib.sha1(body).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        self.gzip_etag = f'"{digest}-gz"'
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip; q=0 refuses it, "*" accepts any coding"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    quality = accepted.get('gzip', accepted.get('x-gzip', accepted.get('*', 0.0)))
+    return quality > 0
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _as_json(data):
+    return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+
+def _quartiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    p25, p50, p75 = np.percentile(values, [25, 50, 75])
+    return {'count': int(len(values)), 'p25': float(p25), 'median': float(p50), 'p75': float(p75)}
+
+class ProductAPI:
+    """
+    Request routing and response caching, independent of the HTTP server.
+
+    Args:
+        index_file: Catalog index built by query_catalog.py
+        base_path: products-data root, for raw YAML requests
+    """
+
+    def __init__(self, index_file=CATALOG_INDEX_FILE, base_path=DEFAULT_BASE_PATH, cache_size=LRU_SIZE):
+        self.index_file = index_file
+        self.base_path = os.path.realpath(base_path)
+        self.cache = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._next_check = 0
+        self.index = None
+        self.row_ids = {}
+        self.tables = {}
+        self._reload_if_changed(force=True)
+
+    def _reload_if_changed(self, force=False):
+        """
+        Pick up a rebuilt index file; cached responses are dropped when it changes.
+        The reference tables (categories.yaml, plants.yaml, ...) are reloaded with it.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + INDEX_CHECK_SECONDS
+            try:
+                mtime = os.stat(self.index_file).st_mtime_ns
+            except OSError:
+                mtime = None
+            if not force and mtime == self._index_mtime:
+                return
+            index = CatalogIndex.load(self.index_file)
+            material_ids = index.text['material_id']
+            self.row_ids = {material_ids[i]: i for i in range(len(index))}
+            self.index = index
+            self.tables = load_reference_tables(self.base_path)
+            self._index_mtime = mtime
+            self.cache.clear()
+
+    def get(self, target):
+        """Response for a request target such as '/products?state=US-GA&k=5'"""
+        self._reload_if_changed()
+        response = self.cache.get(target)
+        if response is None:
+            response = self._build(target)
+            if response.status == 200:
+                self.cache.put(target, response)
+        return response
+
+    def _build(self, target):
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if parts and parts[0] == 'products-data':
+                return self._raw_yaml(parts[1:])
+            return Response(200, _as_json(self._route(parts, params)))
+        except APIError as e:
+            return Response(e.status, _as_json({'error': str(e)}))
+        except Exception as e:
+            # Anything unexpected still gets a JSON error instead of a dropped connection
+            return Response(500, _as_json({'error': f"Internal error: {type(e).__name__}"}))
+
+    def _route(self, parts, params):
+        if parts == ['health']:
+            return {'status': 'ok', 'products': len(self.index)}
+        if parts == ['products']:
+            return self.products(params)
+        if len(parts) == 2 and parts[0] == 'products':
+            return self.product(parts[1])
+        if parts == ['categories']:
+            return self.categories()
+        if parts == ['regions']:
+            return self.regions()
+        if len(parts) == 2 and parts[0] == 'regions':
+            return self.region(parts[1])
+        raise APIError(404, "Not found")
+
+    def product(self, material_id):
+        row = self.row_ids.get(material_id)
+        if row is None:
+            raise APIError(404, f"Unknown product: {material_id}")
+        path = self.index.text['path'][row]
+        try:
+            epd = load_yaml(path)
+        except OSError:
+            raise APIError(404, f"Product file missing: {material_id}")
+        except (yaml.YAMLError, ValueError):
+            raise APIError(500, f"Product file unreadable: {material_id}")
+        if not isinstance(epd, dict):
+            raise APIError(500, f"Product file unreadable: {material_id}")
+        # Files written with a reference layout hold $ref stubs; serve the full objects like the listings
+        return expand_references(epd, self.tables)
+
+    def products(self, params):
+        sort = params.get('sort')
+        if sort and sort not in METRICS:
+            raise APIError(400, f"sort must be one of: {', '.join(METRICS)}")
+        try:
+            k = int(params.get('k', DEFAULT_LIMIT))
+            ranges = {}
+            for metric in METRICS:
+                low, high = params.get(f'min_{metric}'), params.get(f'max_{metric}')
+                if low is not None or high is not None:
+                    ranges[metric] = (None if low is None else float(low), None if high is None else float(high))
+        except ValueError:
+            raise APIError(400, "k and min_/max_ bounds must be numbers")
+        if not 1 <= k <= MAX_LIMIT:
+            raise APIError(400, f"k must be between 1 and {MAX_LIMIT}")
+        rows = self.index.query(
+            sort=sort, k=k, descending=params.get('desc') in ('1', 'true'),
+            category=params.get('category'), country=params.get('country'), state=params.get('state'),
+            declared_unit=params.get('declared_unit'), postal_prefix=params.get('postal_prefix'),
+            ranges=ranges,
+        )
+        for row in rows:
+            row.pop('path', None)
+        return {'count': len(rows), 'products': rows}
+
+    def categories(self):
+        arrays = self.index.arrays
+        keys, bounds, rows = arrays['category_id__keys'], arrays['category_id__bounds'], arrays['category_id__rows']
+        names = self.index.text['category']
+        result = []
+        for i, category_id in enumerate(keys.tolist()):
+            count = int(bounds[i + 1] - bounds[i])
+            if category_id and count:
+                result.append({'id': category_id, 'name': names[int(rows[bounds[i]])], 'count': count})
+        return sorted(result, key=lambda c: c['name'].lower())
+
+    def _region_summary(self, rows):
+        summary = {'count': int(len(rows))}
+        for metric in METRICS:
+            summary[metric] = _quartiles(self.index.arrays[metric][rows])
+        return summary
+
+    def regions(self):
+        arrays = self.index.arrays
+        keys, bounds, rows = arrays['state__keys'], arrays['state__bounds'], arrays['state__rows']
+        result = {}
+        for i, state in enumerate(keys.tolist()):
+            if state:
+                result[state.upper()] = self._region_summary(rows[bounds[i]:bounds[i + 1]])
+        return result
+
+    def region(self, state):
+        rows = self.index.candidates(state=state)
+        if not len(rows):
+            raise APIError(404, f"Unknown region: {state}")
+        summary = self._region_summary(rows)
+        names = self.index.text['category']
+        categories = {}
+        for row in rows.tolist():
+            name = names[row]
+            categories[name] = categories.get(name, 0) + 1
+        summary['region'] = state.upper()
+        summary['categories'] = dict(sorted(categories.items()))
+        return summary
+
+    def _raw_yaml(self, parts):
+        path = os.path.realpath(os.path.join(self.base_path, *parts))
+        if not path.startswith(self.base_path + os.sep) or not path.endswith('.yaml'):
+            raise APIError(404, "Not found")
+        try:
+            with open(path, 'rb') as f:
+                return Response(200, f.read(), 'application/yaml; charset=utf-8')
+        except OSError:
+            raise APIError(404, "Not found")
+
+class ProductRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    server_version = 'ProductAPI/1.0'
+    api = None  # set by make_server
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _method_not_allowed(self):
+        body = _as_json({'error': "Read-only API"})
+        self.send_response(405)
+        self.send_header('Allow', 'GET, HEAD')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = _method_not_allowed
+
+    def _respond(self, send_body):
+        response = self.api.get(self.path)
+        gzipped = response.gzipped is not None and accepts_gzip(self.headers.get('Accept-Encoding'))
+        etag = response.gzip_etag if gzipped else response.etag
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Access-Control-Allow-Origin': '*',
+            'Cache-Control': f'public, max-age={CACHE_MAX_AGE}' if response.status == 200 else 'no-store',
+        }
+        if response.status == 200 and self._etag_matches(etag):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = response.body
+        if gzipped:
+            body = response.gzipped
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(response.status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', response.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _etag_matches(self, etag):
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+    def log_message(self, format, *args):
+        pass  # per-request logging costs more than serving a cached response
+
+def make_server(api, host='127.0.0.1', port=8765):
+    """ThreadingHTTPServer bound to api; port 0 picks a free port"""
+    handler = type('BoundProductRequestHandler', (ProductRequestHandler,), {'api': api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only local HTTP API over the pulled catalog")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--index', default=CATALOG_INDEX_FILE, help="Index built by query_catalog.py build")
+    parser.add_argument('--base-path', default=DEFAULT_BASE_PATH)
+    parser.add_argument('--cache-size', type=int, default=LRU_SIZE, help="Responses kept in the LRU")
+    args = parser.parse_args()
+
+    api = ProductAPI(args.index, args.base_path, args.cache_size)
+    server = make_server(api, args.host, args.port)
+    print(f"Serving {len(api.index)} products on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
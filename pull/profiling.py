@@ -0,0 +1,266 @@
+"""
+Profiling mode for a pull (product-footprints.py --profile).
+
+- CPU: each stage function runs under cProfile, with one profile per stage and thread
+  merged at the end. A stage's cumulative time is only its own work: time spent blocked on
+  a full downstream queue happens outside the stage call.
+- Stacks: a sampler thread records the Python stack of every stage thread every few
+  milliseconds and writes them in the collapsed format ("stage;outer;inner count") read by
+  flamegraph.pl, speedscope and inferno.
+- Memory: tracemalloc runs for the whole pull. The report lists the top allocation sites at the
+  highest traced memory seen by sample_region and at the end of the run, and per region the peak
+  RSS and traced memory sampled while its pages were written.
+
+Usage:
+    profiler = Profiler('profile-report')
+    fetch = profiler.wrap('fetch', fetch)
+    ...
+    profiler.sample_region('US-GA')   # after each page
+    profiler.write_report()
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+TRACE_FRAMES = 10          # frames kept per allocation (more is slower)
+SAMPLE_INTERVAL = 0.005    # seconds between stack samples
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 25
+PEAK_SNAPSHOT_GROWTH = 1.1  # retake the peak snapshot when traced memory grows by this factor
+
+def current_rss():
+    """Resident set size in bytes (from /proc where available, else the process peak)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def _snapshot():
+    """tracemalloc snapshot without the profiler's own allocations"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+def _write_allocations(f, title, snapshot):
+    f.write(f"{title}\n")
+    for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+        f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8} blocks  {stat.traceback}\n")
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Background thread counting collapsed stacks of the threads currently inside a stage"""
+
+    def __init__(self, stage_of_thread, interval=SAMPLE_INTERVAL):
+        self.stage_of_thread = stage_of_thread  # thread id -> stage name, kept by Profiler
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, stage in list(self.stage_of_thread.items()):
+                frame = frames.get(thread_id)
+                names = []
+                # Stop at the profiler's own frame so stacks start at the stage function
+                while frame is not None and frame.f_code is not _STAGE_CALL_CODE:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.stacks[';'.join([stage, *reversed(names)])] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Profiler:
+    """
+    Collects per-stage CPU profiles, stack samples and memory for one run and writes a report folder.
+    """
+
+    def __init__(self, root='profile-report', sample_interval=SAMPLE_INTERVAL):
+        self.started_at = datetime.now(timezone.utc)
+        self.report_dir = os.path.join(root, self.started_at.strftime('%Y%m%dT%H%M%SZ'))
+        self.profiles = defaultdict(list)   # stage -> cProfile.Profile per thread
+        self.wall = Counter()               # stage -> seconds inside the stage function
+        self.calls = Counter()              # stage -> items processed
+        self.regions = {}                   # region -> {'peak_rss', 'peak_traced', 'samples'}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stage_of_thread = {}
+        self.peak_snapshot = None
+        self._peak_snapshot_size = 0
+        self.sampler = StackSampler(self._stage_of_thread, sample_interval)
+        self._start = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self.sampler.start()
+
+    def _profile(self, stage):
+        profiles = getattr(self._local, 'profiles', None)
+        if profiles is None:
+            profiles = self._local.profiles = {}
+        profile = profiles.get(stage)
+        if profile is None:
+            profile = profiles[stage] = cProfile.Profile()
+            with self._lock:
+                self.profiles[stage].append(profile)
+        return profile
+
+    def _run(self, stage, func, *args):
+        profile = self._profile(stage)
+        thread_id = threading.get_ident()
+        self._stage_of_thread[thread_id] = stage
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            self._stage_of_thread.pop(thread_id, None)
+            with self._lock:
+                self.wall[stage] += time.perf_counter() - start
+
+    def _iterate(self, stage, generator):
+        while True:
+            try:
+                output = self._run(stage, next, generator)
+            except StopIteration:
+                return
+            yield output
+
+    def wrap(self, stage, func):
+        """Profile every call of func (and every step of a generator it returns) as `stage`."""
+        def profiled(*args):
+            with self._lock:
+                self.calls[stage] += 1
+            outputs = self._run(stage, func, *args)
+            if isinstance(outputs, types.GeneratorType):
+                return self._iterate(stage, outputs)
+            return outputs
+        return profiled
+
+    def sample_region(self, region):
+        """Record current RSS and traced memory against a region (call after each of its pages)."""
+        rss = current_rss()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        with self._lock:
+            stats = self.regions.setdefault(region, {'peak_rss': 0, 'peak_traced': 0, 'samples': 0})
+            stats['peak_rss'] = max(stats['peak_rss'], rss)
+            stats['peak_traced'] = max(stats['peak_traced'], traced)
+            stats['samples'] += 1
+            take_snapshot = traced > self._peak_snapshot_size * PEAK_SNAPSHOT_GROWTH
+            if take_snapshot:
+                self._peak_snapshot_size = traced
+        if take_snapshot:
+            self.peak_snapshot = (region, traced, _snapshot())
+
+    def stage_stats(self, stage):
+        profiles = [p for p in self.profiles[stage] if p.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def write_report(self):
+        """
+        Stop sampling and write the report folder:
+            stages.txt, <stage>.pstats   cumulative time per function for each stage
+            allocations.txt              top allocation sites (tracemalloc)
+            stacks.collapsed             sampled stacks for flamegraph tools
+            summary.json                 stage times, per-region peak memory, totals
+        Returns: the report folder
+        """
+        self.sampler.stop()
+        os.makedirs(self.report_dir, exist_ok=True)
+        summary = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._start, 2),
+            'peak_rss': max([current_rss()] + [r['peak_rss'] for r in self.regions.values()]),
+            'stages': {},
+            'regions': self.regions,
+            'stack_samples': self.sampler.samples,
+        }
+        with open(os.path.join(self.report_dir, 'stages.txt'), 'w') as f:
+            for stage in self.profiles:
+                stats = self.stage_stats(stage)
+                if stats is None:
+                    continue
+                stats.dump_stats(os.path.join(self.report_dir, f'{stage}.pstats'))
+                f.write(f"===== {stage}: {self.calls[stage]} items, {self.wall[stage]:.2f} s in stage =====\n")
+                stats.stream = f
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                summary['stages'][stage] = {
+                    'items': self.calls[stage],
+                    'seconds': round(self.wall[stage], 3),
+                    'top_cumulative': _top_functions(stats),
+                }
+        if tracemalloc.is_tracing():
+            summary['traced_peak'] = tracemalloc.get_traced_memory()[1]
+            with open(os.path.join(self.report_dir, 'allocations.txt'), 'w') as f:
+                if self.peak_snapshot is not None:
+                    region, traced, snapshot = self.peak_snapshot
+                    _write_allocations(f, f"Top {TOP_ALLOCATIONS} allocation sites at {traced / 1e6:.1f} MB traced "
+                                          f"(highest sample, writing {region})", snapshot)
+                    f.write("\n")
+                _write_allocations(f, f"Top {TOP_ALLOCATIONS} allocation sites still held at the end of the run",
+                                   _snapshot())
+            tracemalloc.stop()
+        self.sampler.write(os.path.join(self.report_dir, 'stacks.collapsed'))
+        with open(os.path.join(self.report_dir, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=1)
+        return self.report_dir
+
+_STAGE_CALL_CODE = Profiler._run.__code__
+
+def _top_functions(stats, limit=10):
+    """[(function, cumulative seconds, calls)] sorted by cumulative time"""
+    rows = []
+    for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():
+        rows.append((f"{name} ({os.path.basename(filename)}:{line})", round(cumulative, 4), calls))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:limit]
+
+def format_profile_summary(report_dir):
+    """Short text of summary.json for the console"""
+    with open(os.path.join(report_dir, 'summary.json')) as f:
+        summary = json.load(f)
+    lines = [f"{'Stage':<12}{'Items':>8}{'Seconds':>10}  Top function (cumulative)"]
+    for stage, s in summary['stages'].items():
+        # Skip builtins such as next() that wrap the whole stage call
+        top = next((row for row in s['top_cumulative'] if not row[0].startswith('<')), None)
+        lines.append(f"{stage:<12}{s['items']:>8}{s['seconds']:>10.2f}  {top[0] if top else '-'}")
+    lines.append(f"Peak RSS: {summary['peak_rss'] / 1e6:.0f} MB")
+    return '\n'.join(lines)
@@ -0,0 +1,189 @@
+"""
+Publish manifest for the products-data repo, so a push commits only what a pull really changed.
+
+The manifest maps every file under products-data to its SHA-256 and size. The manifest of the
+last publish is kept as products-data/publish-manifest.json. After a pull, the change set
+(files added, modified and deleted since that manifest, with their hashes) is written to
+publish-changes.json; the stage command copies exactly those files into a products-data checkout,
+removes the deleted ones, stages them with git and records the new manifest.
+
+Files whose size and mtime match the previous manifest are not hashed again.
+
+Usage:
+    python publish.py changes                       # change set of ../../products-data
+    python publish.py stage ~/repos/products-data   # copy and git-stage the change set
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from catalog import DEFAULT_BASE_PATH
+
+PUBLISH_MANIFEST_FILE = "publish-manifest.json"  # in products-data, published with it
+PUBLISH_CHANGES_FILE = "publish-changes.json"    # in pull, written after each pull
+HASH_WORKERS = 8
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def iter_files(base_path):
+    """Relative paths (with '/' separators) of all files to publish, skipping dotfiles and the manifest"""
+    for root, dirs, files in os.walk(base_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        relative_root = os.path.relpath(root, base_path)
+        for name in sorted(files):
+            if name.startswith('.') or name.endswith('.tmp'):
+                continue
+            relative = name if relative_root == '.' else f"{relative_root}/{name}".replace(os.sep, '/')
+            if relative != PUBLISH_MANIFEST_FILE:
+                yield relative
+
+def load_manifest(path):
+    """Manifest saved by save_manifest, or an empty one if the file is missing or unreadable"""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'generated_at': None, 'files': {}}
+    manifest.setdefault('files', {})
+    return manifest
+
+def save_manifest(manifest, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def build_manifest(base_path=DEFAULT_BASE_PATH, previous=None):
+    """
+    Hash every file under base_path.
+
+    Args:
+        previous: Earlier manifest; its hashes are reused for files with the same size and mtime
+
+    Returns:
+        Manifest dict: {'generated_at': ..., 'files': {path: [sha256, size, mtime_ns]}}
+    """
+    known = (previous or {}).get('files', {})
+    files = {}
+    to_hash = []
+    for relative in iter_files(base_path):
+        stat = os.stat(os.path.join(base_path, relative))
+        entry = known.get(relative)
+        if entry and entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns:
+            files[relative] = entry
+        else:
+            to_hash.append((relative, stat.st_size, stat.st_mtime_ns))
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        digests = executor.map(lambda item: file_sha256(os.path.join(base_path, item[0])), to_hash)
+        for (relative, size, mtime), digest in zip(to_hash, digests):
+            files[relative] = [digest, size, mtime]
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'files': dict(sorted(files.items())),
+    }
+
+def diff_manifests(previous, current):
+    """
+    Change set between two manifests.
+
+    Returns:
+        {'base': previous generated_at, 'generated_at': ..., 'added': {path: sha256},
+         'modified': {path: sha256}, 'deleted': [path], 'bytes': size of added and modified files}
+    """
+    old = previous.get('files', {})
+    new = current['files']
+    added = {path: entry[0] for path, entry in new.items() if path not in old}
+    modified = {path: entry[0] for path, entry in new.items() if path in old and old[path][0] != entry[0]}
+    return {
+        'base': previous.get('generated_at'),
+        'generated_at': current['generated_at'],
+        'added': added,
+        'modified': modified,
+        'deleted': sorted(path for path in old if path not in new),
+        'bytes': sum(new[path][1] for path in (*added, *modified)),
+    }
+
+def format_changes(changes):
+    return (f"{len(changes['added'])} added, {len(changes['modified'])} modified, "
+            f"{len(changes['deleted'])} deleted ({changes['bytes'] / 1e6:.1f} MB)")
+
+def write_changes(base_path=DEFAULT_BASE_PATH, changes_file=PUBLISH_CHANGES_FILE):
+    """
+    Compare base_path with its last published manifest and save the change set and the new
+    manifest (under 'manifest', applied by stage_changes).
+    """
+    start = time.time()
+    previous = load_manifest(os.path.join(base_path, PUBLISH_MANIFEST_FILE))
+    current = build_manifest(base_path, previous)
+    changes = diff_manifests(previous, current)
+    save_manifest(dict(changes, source=os.path.abspath(base_path), manifest=current), changes_file)
+    print(f"✓ Publish change set: {format_changes(changes)} in {time.time() - start:.1f} s, "
+          f"saved to: {changes_file}", flush=True)
+    return changes
+
+def _git(target, *args, stdin=None):
+    return subprocess.run(['git', '-C', target, *args], input=stdin, capture_output=True, text=True, check=True)
+
+def stage_changes(target, changes_file=PUBLISH_CHANGES_FILE, git=True):
+    """
+    Apply a saved change set to a products-data checkout: copy added and modified files from the
+    pull's output, delete removed files, write the new manifest and `git add` exactly those paths.
+
+    Returns:
+        Number of paths staged (including the manifest)
+    """
+    with open(changes_file, 'r') as f:
+        changes = json.load(f)
+    source = changes['source']
+    same_tree = os.path.exists(target) and os.path.samefile(source, target)
+    copied = [*changes['added'].items(), *changes['modified'].items()]
+    for relative, digest in copied:
+        source_path = os.path.join(source, relative)
+        # The change set is stale if a file was rewritten after it was computed
+        if file_sha256(source_path) != digest:
+            raise ValueError(f"{relative} changed since {changes_file} was written; run `publish.py changes` again")
+        if not same_tree:
+            target_path = os.path.join(target, relative)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(source_path, target_path)
+    for relative in changes['deleted']:
+        target_path = os.path.join(target, relative)
+        if os.path.exists(target_path):
+            os.remove(target_path)
+    save_manifest(changes['manifest'], os.path.join(target, PUBLISH_MANIFEST_FILE))
+    if not same_tree:
+        shutil.copy2(os.path.join(target, PUBLISH_MANIFEST_FILE), os.path.join(source, PUBLISH_MANIFEST_FILE))
+
+    paths = [relative for relative, _ in copied] + changes['deleted'] + [PUBLISH_MANIFEST_FILE]
+    if git:
+        if not os.path.isdir(os.path.join(target, '.git')):
+            print(f"⚠ {target} is not a git checkout; files copied but not staged", flush=True)
+        else:
+            # -A stages deletions too; only the listed paths are touched
+            _git(target, 'add', '-A', '--pathspec-from-file=-', '--pathspec-file-nul', stdin='\0'.join(paths))
+    print(f"✓ Staged {format_changes(changes)} in {target}", flush=True)
+    return len(paths)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish change sets of products-data")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    changes_parser = subparsers.add_parser('changes', help="Write the change set since the last published manifest")
+    changes_parser.add_argument('--base-path', default=DEFAULT_BASE_PATH)
+    changes_parser.add_argument('--changes-file', default=PUBLISH_CHANGES_FILE)
+    stage_parser = subparsers.add_parser('stage', help="Copy and git-stage the change set into a checkout")
+    stage_parser.add_argument('target', help="products-data checkout")
+    stage_parser.add_argument('--changes-file', default=PUBLISH_CHANGES_FILE)
+    stage_parser.add_argument('--no-git', action='store_true', help="Copy files without running git add")
+    args = parser.parse_args()
+    if args.command == 'changes':
+        write_changes(args.base_path, args.changes_file)
+    else:
+        stage_changes(args.target, args.changes_file, git=not args.no_git)
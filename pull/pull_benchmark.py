@@ -0,0 +1,208 @@
+"""
+End-to-end throughput benchmark: runs `product-footprints.py pull` against a simulated EC3 API.
+
+The simulated API (simulated_api.py) serves synthetic pages with a configurable latency distribution
+and 429 rate. The pull runs as a child process in a temporary output tree, with EC3_API_URL pointing
+at the simulated API and EPD_DELAY_SCALE scaling its rate-limit pauses (0 by default, so only the
+simulated latency and retries remain). Reported per run:
+    wall time and EPDs/second, per-stage busy time (stage_stats.json), peak RSS of the pull,
+    files and bytes written, and the requests, pages and 429s seen by the API.
+
+Each run is appended to RESULTS_FILE; runs with the same workload are listed side by side, so
+fetch and write strategies (--sequential, config changes, code changes) are compared on equal footing.
+
+Usage:
+    python pull_benchmark.py                                      # 3 regions x 4 pages
+    python pull_benchmark.py --pages 20 --latency lognormal --latency-ms 300 --rate-429 0.05
+    python pull_benchmark.py --sequential --label sequential
+    python pull_benchmark.py --delay-scale 1                      # keep the real pauses
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from simulated_api import LATENCY_KINDS, PAGE_RECORDS, LatencyModel, SimulatedApi
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(PULL_DIR, "product-footprints.py")
+RESULTS_FILE = "pull_benchmark.json"
+PULL_OUTPUT_FILE = "pull-output.txt"  # the pull's console output, in the work folder
+DEFAULT_REGIONS = ['US-GA', 'US-CA', 'IN']
+DEFAULT_PAGES = 4
+
+def tree_size(path):
+    """(files, bytes) under path"""
+    files = size = 0
+    for folder, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(folder, name))
+    return files, size
+
+def written_records(log_path):
+    """EPDs written per the pull's "Region written" log events"""
+    records = 0
+    if os.path.exists(log_path):
+        with open(log_path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get('msg') == "Region written":
+                    records += entry.get('records', 0)
+    return records
+
+def run_pull(root, api_url, regions, delay_scale=0.0, pull_args=(), verbose=False):
+    """
+    Run one pull in root/a/b (so its ../../products-data lands in root).
+    Returns: (exit code, wall seconds, peak RSS bytes, work folder)
+    """
+    workdir = os.path.join(root, 'a', 'b')
+    os.makedirs(workdir, exist_ok=True)
+    env = dict(os.environ, EC3_API_URL=api_url, EPD_DELAY_SCALE=str(delay_scale))
+    command = [sys.executable, SCRIPT, 'pull', '--regions', *regions, *pull_args]
+    with open(os.path.join(workdir, PULL_OUTPUT_FILE), 'w') as output:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env,
+                                   stdout=None if verbose else output, stderr=subprocess.STDOUT)
+        # wait4 gives the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return process.returncode, wall, peak_rss, workdir
+
+def run_benchmark(regions, pages, page_records=PAGE_RECORDS, latency=None, rate_limit_rate=0.0,
+                  delay_scale=0.0, pull_args=(), seed=0, label=None, keep=False, verbose=False):
+    """
+    Serve the workload, run the pull against it and collect the measurements.
+    Returns: result dict (as appended to RESULTS_FILE)
+    """
+    latency = latency or LatencyModel()
+    workload = {
+        'regions': list(regions),
+        'pages_per_region': pages,
+        'page_records': page_records,
+        'latency': latency.describe(),
+        'rate_429': rate_limit_rate,
+        'delay_scale': delay_scale,
+        'seed': seed,
+    }
+    print(f"Generating {len(regions) * pages * page_records} synthetic EPDs...", flush=True)
+    api = SimulatedApi({region: pages for region in regions}, page_records, latency, rate_limit_rate, seed)
+    root = tempfile.mkdtemp(prefix='pull-benchmark-')
+    try:
+        with api:
+            print(f"Pulling {len(regions)} regions from {api.url}...", flush=True)
+            exit_code, wall, peak_rss, workdir = run_pull(root, api.url, regions, delay_scale, pull_args, verbose)
+        stages = {}
+        stats_path = os.path.join(workdir, 'stage_stats.json')
+        if os.path.exists(stats_path):
+            with open(stats_path) as f:
+                stages = {s['stage']: {'items': s['items_in'], 'busy_seconds': s['busy_seconds']} for s in json.load(f)}
+        files, size = tree_size(os.path.join(root, 'products-data'))
+        profile_files, profile_size = tree_size(os.path.join(root, 'profile'))
+        epds = written_records(os.path.join(workdir, 'output.log'))
+        result = {
+            'label': label or ' '.join(pull_args) or 'default',
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'workload': workload,
+            'pull_args': list(pull_args),
+            'exit_code': exit_code,
+            'wall_seconds': round(wall, 3),
+            'epds': epds,
+            'epds_per_second': round(epds / wall, 1) if wall else 0,
+            'stages': stages,
+            'peak_rss': peak_rss,
+            'files': files + profile_files,
+            'bytes': size + profile_size,
+            'api': dict(api.counts, records_served=api.records),
+        }
+        if exit_code != 0 and not verbose:
+            with open(os.path.join(workdir, PULL_OUTPUT_FILE)) as f:
+                print(f.read()[-3000:], flush=True)
+    finally:
+        if keep:
+            print(f"Output tree kept at: {root}", flush=True)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return result
+
+def format_result(result):
+    lines = [
+        f"Wall time:   {result['wall_seconds']:.2f} s",
+        f"EPDs:        {result['epds']} written of {result['api']['records_served']} served "
+        f"({result['epds_per_second']:.1f} EPDs/s)",
+        f"Peak RSS:    {result['peak_rss'] / 1e6:.0f} MB",
+        f"Written:     {result['files']} files, {result['bytes'] / 1e6:.1f} MB",
+        f"API:         {result['api']['requests']} requests, {result['api']['pages']} pages, "
+        f"{result['api']['rate_limited']} rate limited",
+    ]
+    if result['stages']:
+        lines.append(f"{'Stage':<12}{'Items':>8}{'Busy s':>10}")
+        for stage, s in result['stages'].items():
+            lines.append(f"{stage:<12}{s['items']:>8}{s['busy_seconds']:>10.2f}")
+    return '\n'.join(lines)
+
+def format_comparison(results):
+    """Table of runs that share a workload"""
+    lines = [f"{'Run':<24}{'When':<27}{'Wall s':>8}{'EPDs/s':>9}{'Peak MB':>9}{'Files':>7}"]
+    for r in results:
+        lines.append(f"{r['label'][:23]:<24}{r['created_at']:<27}{r['wall_seconds']:>8.2f}"
+                     f"{r['epds_per_second']:>9.1f}{r['peak_rss'] / 1e6:>9.0f}{r['files']:>7}")
+    return '\n'.join(lines)
+
+def save_result(result, path=RESULTS_FILE):
+    """Append a run to the results file. Returns: earlier runs with the same workload, plus this one"""
+    history = []
+    if os.path.exists(path):
+        with open(path) as f:
+            history = json.load(f)
+    history.append(result)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=1)
+    return [r for r in history if r['workload'] == result['workload']]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a full pull against a simulated EC3 API")
+    parser.add_argument('--regions', nargs='+', default=DEFAULT_REGIONS, help="Regions served and pulled")
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help="Pages per region")
+    parser.add_argument('--page-records', type=int, default=PAGE_RECORDS, help="EPDs per page")
+    parser.add_argument('--latency', choices=LATENCY_KINDS, default='lognormal', help="Latency distribution")
+    parser.add_argument('--latency-ms', type=float, default=150, help="Median latency per request")
+    parser.add_argument('--latency-spread', type=float, default=0.5,
+                        help="Uniform: +/- share of the median; lognormal: sigma")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Share of page requests answered with 429")
+    parser.add_argument('--delay-scale', type=float, default=0.0,
+                        help="Multiplier for the pull's rate-limit pauses (1 = as configured)")
+    parser.add_argument('--sequential', action='store_true', help="Pull one region at a time")
+    parser.add_argument('--profile', action='store_true', help="Run the pull with --profile")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', help="Name of this run in the comparison")
+    parser.add_argument('--output', default=RESULTS_FILE, help="Results JSON (runs are appended)")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary output tree")
+    parser.add_argument('--verbose', action='store_true', help="Show the pull's output")
+    args = parser.parse_args(argv)
+
+    pull_args = [flag for flag, enabled in (('--sequential', args.sequential), ('--profile', args.profile)) if enabled]
+    latency = LatencyModel(args.latency, args.latency_ms / 1000, args.latency_spread, args.seed)
+    result = run_benchmark(args.regions, args.pages, args.page_records, latency, args.rate_429,
+                           args.delay_scale, pull_args, args.seed, args.label, args.keep, args.verbose)
+    print(f"\n{format_result(result)}", flush=True)
+    comparable = save_result(result, args.output)
+    print(f"\n✓ Result appended to: {args.output}", flush=True)
+    if len(comparable) > 1:
+        print("\nRuns with the same workload:", flush=True)
+        print(format_comparison(comparable), flush=True)
+    if result['exit_code'] != 0 or result['epds'] == 0:
+        print(f"✗ Pull failed (exit code {result['exit_code']}, {result['epds']} EPDs written)", flush=True)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
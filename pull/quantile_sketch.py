@@ -0,0 +1,247 @@
+"""
+Mergeable streaming quantile sketches (t-digest) for GWP benchmarks.
+Values are added as pages stream in, so approximate percentiles per category
+and region are available at pull time without holding every value in memory.
+Sketches serialize to JSON and merge across regions and runs.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+SUMMARY_PERCENTILES = [10, 20, 30, 40, 50, 60, 70, 80, 90]
+
+class TDigest:
+    """
+    Merging t-digest.
+
+    Centroids near the tails are kept small, so extreme percentiles stay accurate while
+    the whole sketch holds at most a few times `compression` centroids.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []  # sorted [mean, weight] pairs
+        self.buffer = []
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1):
+        value = float(value)
+        self.buffer.append([value, weight])
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        """Merge another digest into this one"""
+        if not other.count:
+            return self
+        self.buffer.extend([mean, weight] for mean, weight in other.centroids)
+        self.buffer.extend([mean, weight] for mean, weight in other.buffer)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        total = self.count
+        merged = []
+        cumulative = 0
+        mean, weight = items[0]
+        for next_mean, next_weight in items[1:]:
+            q = (cumulative + (weight + next_weight) / 2) / total
+            limit = 4 * total * q * (1 - q) / self.compression
+            if weight + next_weight <= max(limit, 1):
+                # Weighted mean of the two centroids
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append([mean, weight])
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0..1), or None if empty"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        # Centroid centers sit at their cumulative midpoint; interpolate between them,
+        # and between min/max and the outermost centers at the tails.
+        cumulative = 0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - prev_center
+                frac = (target - prev_center) / span if span > 0 else 0
+                return prev_mean + (mean - prev_mean) * frac
+            prev_center, prev_mean = center, mean
+            cumulative += weight
+        span = self.count - prev_center
+        frac = (target - prev_center) / span if span > 0 else 0
+        return prev_mean + (self.max - prev_mean) * frac
+
+    def to_dict(self):
+        self._compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'centroids': [[round(mean, 6), weight] for mean, weight in self.centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data.get('compression', 100))
+        digest.centroids = [list(c) for c in data.get('centroids', [])]
+        digest.count = data.get('count', 0)
+        digest.min = data.get('min')
+        digest.max = data.get('max')
+        return digest
+
+class SketchRegistry:
+    """
+    One t-digest per (region, category id).
+
+    A region pulled again replaces its previous sketches (reset_region), so regions not
+    pulled in this run keep the sketches persisted by earlier runs.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.sketches = {}    # region -> {category_id: TDigest}
+        self.categories = {}  # category_id -> {'display_name': ..., 'unit': ...}
+        self._lock = threading.Lock()
+
+    def reset_region(self, region):
+        with self._lock:
+            self.sketches[region] = {}
+
+    def add(self, region, category_id, value, display_name=None, unit=None):
+        if value is None or not category_id:
+            return
+        with self._lock:
+            region_sketches = self.sketches.setdefault(region, {})
+            digest = region_sketches.get(category_id)
+            if digest is None:
+                digest = region_sketches[category_id] = TDigest(self.compression)
+            digest.add(value)
+            if category_id not in self.categories:
+                self.categories[category_id] = {'display_name': display_name, 'unit': unit}
+
+    def region_to_dict(self, region):
+        """Sketches of one region, for replacing that region in another registry (see update_region)"""
+        with self._lock:
+            region_sketches = dict(self.sketches.get(region, {}))
+            return {
+                'categories': {c: self.categories[c] for c in region_sketches if c in self.categories},
+                'sketches': {c: digest.to_dict() for c, digest in region_sketches.items()},
+            }
+
+    def update_region(self, region, data):
+        """Replace a region's sketches with the output of region_to_dict"""
+        with self._lock:
+            self.sketches[region] = {c: TDigest.from_dict(d) for c, d in data.get('sketches', {}).items()}
+            for category_id, info in data.get('categories', {}).items():
+                self.categories.setdefault(category_id, info)
+
+    def merged(self, category_id, regions=None):
+        """Merge the sketches of a category across regions (all regions by default)"""
+        result = TDigest(self.compression)
+        for region, region_sketches in self.sketches.items():
+            if regions is not None and region not in regions:
+                continue
+            if category_id in region_sketches:
+                result.merge(region_sketches[category_id])
+        return result
+
+    def summary(self, metric=None):
+        """
+        Approximate pct10..pct90 and counts per category: overall, per pulled region,
+        and per country for US states (US-GA, US-CA, ... roll up into US).
+        """
+        rollups = {}
+        for region in self.sketches:
+            if '-' in region:
+                rollups.setdefault(region.split('-', 1)[0], set()).add(region)
+
+        categories = {}
+        for category_id, info in sorted(self.categories.items()):
+            entry = {
+                'display_name': info.get('display_name'),
+                'unit': info.get('unit'),
+                'all': _digest_summary(self.merged(category_id)),
+                'regions': {},
+            }
+            for region in sorted(self.sketches):
+                if category_id in self.sketches[region]:
+                    entry['regions'][region] = _digest_summary(self.sketches[region][category_id])
+            for country, regions in sorted(rollups.items()):
+                digest = self.merged(category_id, regions)
+                if digest.count:
+                    entry['regions'][country] = _digest_summary(digest)
+            categories[category_id] = entry
+        return {
+            'metric': metric,
+            'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'approximate': True,
+            'categories': categories,
+        }
+
+    def to_dict(self):
+        return {
+            'compression': self.compression,
+            'categories': self.categories,
+            'sketches': {
+                region: {category_id: digest.to_dict() for category_id, digest in region_sketches.items()}
+                for region, region_sketches in self.sketches.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        registry = cls(data.get('compression', 100))
+        registry.categories = data.get('categories', {})
+        registry.sketches = {
+            region: {category_id: TDigest.from_dict(d) for category_id, d in region_sketches.items()}
+            for region, region_sketches in data.get('sketches', {}).items()
+        }
+        return registry
+
+    @classmethod
+    def load(cls, path, compression=100):
+        """Load persisted sketches, or start empty if the file is missing or unreadable"""
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return cls(compression)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+def _digest_summary(digest):
+    summary = {'count': digest.count}
+    for p in SUMMARY_PERCENTILES:
+        value = digest.quantile(p / 100)
+        summary[f'pct{p}'] = None if value is None else round(value, 4)
+    return summary
@@ -0,0 +1,351 @@
+"""
+Query the pulled EPD catalog from a locally built index.
+Filters by category, country/state, postal prefix, declared unit and GWP ranges,
+and answers top-k questions such as "lowest gwp_per_kg ready mix in US-GA".
+
+The index is a columnar .npz file (catalog_index.npz) with per-field postings lists and a
+precomputed sort order per GWP metric, so queries avoid re-reading any YAML.
+
+Examples:
+    python query_catalog.py build
+    python query_catalog.py query --category "Ready Mix" --state US-GA --sort gwp_per_kg -k 10
+    python query_catalog.py query --country IN --max-gwp 300 --per-category -k 3 --format csv
+"""
+import argparse
+import csv
+import heapq
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from analyze_emissions_data import load_yaml
+from catalog import DEFAULT_BASE_PATH, epd_country, epd_state, parse_quantity, scan_changes
+
+CATALOG_INDEX_FILE = "catalog_index.npz"
+METRICS = ['gwp', 'gwp_per_kg', 'gwp_per_category_declared_unit']
+# Short codes are stored as fixed-width NumPy strings; long free text as UTF-8 blobs with offsets
+CODE_FIELDS = ['category_id', 'country', 'state', 'postal_code', 'declared_unit']
+TEXT_FIELDS = ['material_id', 'name', 'category', 'manufacturer', 'path']
+POSTING_FIELDS = ['category_id', 'category', 'country', 'state', 'declared_unit']
+
+def catalog_record(epd, path=None, mtime=None):
+    """Flat index row for an EPD"""
+    category = epd.get('category') or {}
+    plant = epd.get('plant_or_group') or {}
+    manufacturer = epd.get('manufacturer') or {}
+    record = {
+        'material_id': epd.get('material_id') or '',
+        'name': epd.get('name') or '',
+        'category_id': category.get('id') or '',
+        'category': category.get('display_name') or '',
+        'country': epd_country(epd) or '',
+        'state': epd_state(epd) or '',
+        'postal_code': str(plant.get('postal_code') or manufacturer.get('postal_code') or ''),
+        'declared_unit': str(epd.get('declared_unit') or ''),
+        'manufacturer': manufacturer.get('name') or '',
+        'path': path or '',
+        'mtime': mtime or 0,
+    }
+    for metric in METRICS:
+        record[metric] = parse_quantity(epd.get(metric))
+    return record
+
+class TextColumn:
+    """Strings packed into one UTF-8 byte array plus offsets; decoded only when a row is output"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+class CatalogIndex:
+    """
+    Columnar index over catalog rows, saved as an uncompressed .npz so it loads in milliseconds.
+
+    Holds postings lists (value -> row ids) for the filter fields and a precomputed
+    sort order and rank per GWP metric.
+
+    Usage:
+        index = CatalogIndex.load()
+        rows = index.query(category='Ready Mix', state='US-GA', sort='gwp_per_kg', k=10)
+    """
+
+    def __init__(self, arrays=None):
+        self.arrays = arrays or CatalogIndex.build_arrays([])
+        self.size = len(self.arrays['mtime'])
+        self.text = {field: TextColumn(self.arrays[f'{field}__blob'], self.arrays[f'{field}__offsets'])
+                     for field in TEXT_FIELDS}
+        self._postings = {}
+
+    @staticmethod
+    def build_arrays(records):
+        """All arrays stored in the index file, computed from row dicts"""
+        n = len(records)
+        arrays = {'mtime': np.array([r.get('mtime') or 0 for r in records], dtype=np.int64)}
+        for field in CODE_FIELDS:
+            arrays[field] = np.array([r[field] for r in records], dtype=str) if n else np.array([], dtype='<U1')
+        for field in TEXT_FIELDS:
+            column = TextColumn.from_strings([r[field] for r in records])
+            arrays[f'{field}__blob'] = column.blob
+            arrays[f'{field}__offsets'] = column.offsets
+        for metric in METRICS:
+            values = np.array([np.nan if r[metric] is None else r[metric] for r in records], dtype=float)
+            order = np.argsort(values, kind='stable')  # NaN sorts last
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n)
+            arrays[metric] = values
+            arrays[f'{metric}__order'] = order
+            arrays[f'{metric}__rank'] = rank
+        for field in POSTING_FIELDS:
+            values = [str(r[field]).lower() for r in records]
+            keys, inverse = np.unique(np.array(values, dtype=str), return_inverse=True) if n else (np.array([], dtype='<U1'), np.array([], dtype=np.int64))
+            inverse = inverse.ravel()
+            arrays[f'{field}__keys'] = keys
+            arrays[f'{field}__rows'] = np.argsort(inverse, kind='stable')
+            arrays[f'{field}__bounds'] = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(keys)))))
+        return arrays
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(cls.build_arrays(list(records)))
+
+    def __len__(self):
+        return self.size
+
+    def _posting(self, field, value):
+        if field not in self._postings:
+            keys = self.arrays[f'{field}__keys']
+            self._postings[field] = {key: i for i, key in enumerate(keys.tolist())}
+        i = self._postings[field].get(str(value).lower())
+        if i is None:
+            return np.array([], dtype=np.int64)
+        bounds = self.arrays[f'{field}__bounds']
+        return np.sort(self.arrays[f'{field}__rows'][bounds[i]:bounds[i + 1]])
+
+    def candidates(self, category=None, country=None, state=None, declared_unit=None,
+                   postal_prefix=None, ranges=None):
+        """
+        Row ids matching all filters.
+
+        Args:
+            category: Category display name or id
+            ranges: Dict of metric -> (min, max); None bounds are open
+        """
+        sets = []
+        if category:
+            rows = self._posting('category_id', category)
+            sets.append(rows if len(rows) else self._posting('category', category))
+        if country:
+            sets.append(self._posting('country', country))
+        if state:
+            sets.append(self._posting('state', state))
+        if declared_unit:
+            sets.append(self._posting('declared_unit', declared_unit))
+        if sets:
+            sets.sort(key=len)
+            rows = sets[0]
+            for other in sets[1:]:
+                rows = np.intersect1d(rows, other, assume_unique=True)
+        else:
+            rows = None
+
+        mask = None
+        for metric, (low, high) in (ranges or {}).items():
+            values = self.arrays[metric] if rows is None else self.arrays[metric][rows]
+            metric_mask = ~np.isnan(values)
+            if low is not None:
+                metric_mask &= values >= low
+            if high is not None:
+                metric_mask &= values <= high
+            mask = metric_mask if mask is None else mask & metric_mask
+        if postal_prefix:
+            codes = self.arrays['postal_code'] if rows is None else self.arrays['postal_code'][rows]
+            prefix_mask = np.char.startswith(codes, str(postal_prefix))
+            mask = prefix_mask if mask is None else mask & prefix_mask
+
+        if rows is None:
+            return np.arange(self.size) if mask is None else np.nonzero(mask)[0]
+        return rows if mask is None else rows[mask]
+
+    def top_k(self, rows, sort, k, descending=False):
+        """The k rows with the lowest (or highest) metric value, using the precomputed ranks"""
+        rows = rows[~np.isnan(self.arrays[sort][rows])]
+        if k <= 0 or not len(rows):
+            return rows[:0]
+        if descending:
+            # Negated ranks would also reverse ties; keep them in row order like the ascending order
+            values = self.arrays[sort][rows]
+            if k < len(rows):
+                keep = values >= np.partition(values, len(rows) - k)[len(rows) - k]
+                rows, values = rows[keep], values[keep]
+            return rows[np.lexsort((rows, -values))][:k]
+        if len(rows) == self.size:
+            return self.arrays[f'{sort}__order'][:k]
+        ranks = self.arrays[f'{sort}__rank'][rows]
+        if k < len(rows):
+            keep = np.argpartition(ranks, k)[:k]
+            rows, ranks = rows[keep], ranks[keep]
+        return rows[np.argsort(ranks)]
+
+    def top_k_per_category(self, rows, sort, k, descending=False):
+        """Top k rows within each category, selected with one bounded heap per category"""
+        heaps = {}
+        values = self.arrays[sort]
+        categories = self.arrays['category_id']
+        sign = -1 if descending else 1
+        for row in rows.tolist():
+            value = values[row]
+            if np.isnan(value):
+                continue
+            heap = heaps.setdefault(categories[row], [])
+            # heap[0] is the worst of the best k kept so far
+            entry = (-sign * value, -row)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        result = []
+        for category_id in sorted(heaps):
+            result.extend(-row for _, row in sorted(heaps[category_id], reverse=True))
+        return np.array(result, dtype=np.int64)
+
+    def query(self, sort=None, k=None, descending=False, per_category=False, **filters):
+        """Filter and optionally sort; returns a list of row dicts (k=None: all rows, 10 per category)"""
+        if k is not None and k <= 0:
+            return []
+        rows = self.candidates(**filters)
+        if sort and per_category:
+            rows = self.top_k_per_category(rows, sort, 10 if k is None else k, descending)
+        elif sort:
+            rows = self.top_k(rows, sort, len(rows) if k is None else k, descending)
+        elif k is not None:
+            rows = rows[:k]
+        return [self.row(i) for i in rows.tolist()]
+
+    def row(self, i):
+        record = {field: self.text[field][i] for field in TEXT_FIELDS}
+        for field in CODE_FIELDS:
+            record[field] = str(self.arrays[field][i])
+        for metric in METRICS:
+            value = float(self.arrays[metric][i])
+            record[metric] = None if np.isnan(value) else value
+        return record
+
+    def records(self):
+        """All rows as dicts, including mtime (used when refreshing)"""
+        rows = []
+        for i in range(self.size):
+            row = self.row(i)
+            row['mtime'] = int(self.arrays['mtime'][i])
+            rows.append(row)
+        return rows
+
+    @classmethod
+    def load(cls, path=CATALOG_INDEX_FILE):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls({name: data[name] for name in data.files})
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+    def save(self, path=CATALOG_INDEX_FILE):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **self.arrays)
+        os.replace(tmp_path, path)
+
+    def refresh(self, base_path=DEFAULT_BASE_PATH):
+        """Re-read only new or modified YAML files and drop deleted ones. Returns change counts."""
+        by_path = {r['path']: r for r in self.records() if r['path']}
+        changed, removed, unchanged = scan_changes({p: r['mtime'] for p, r in by_path.items()}, base_path)
+        for path, mtime in changed:
+            try:
+                epd = load_yaml(path)
+            except Exception:
+                by_path.pop(path, None)
+                continue
+            if isinstance(epd, dict):
+                by_path[path] = catalog_record(epd, path, mtime)
+        for path in removed:
+            by_path.pop(path, None)
+        self.__init__(self.build_arrays(list(by_path.values())))
+        return {'changed': len(changed), 'removed': len(removed), 'unchanged': unchanged}
+
+OUTPUT_FIELDS = ['material_id', 'name', 'category', 'country', 'state', 'postal_code',
+                 'declared_unit', 'manufacturer'] + METRICS + ['category_id', 'path']
+
+def format_rows(rows, output_format):
+    if output_format == 'json':
+        return json.dumps(rows, indent=2)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the local EPD catalog index")
+    parser.add_argument('--index', default=CATALOG_INDEX_FILE, help="Index file (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Build or incrementally refresh the index from products-data")
+    build.add_argument('--base-path', default=DEFAULT_BASE_PATH)
+
+    query = subparsers.add_parser('query', help="Filter and rank products")
+    query.add_argument('--category', help="Category display name or id")
+    query.add_argument('--country')
+    query.add_argument('--state', help="Region code such as US-GA")
+    query.add_argument('--postal-prefix')
+    query.add_argument('--declared-unit', help='e.g. "1 m3"')
+    for metric in METRICS:
+        flag = metric.replace('_', '-')
+        query.add_argument(f'--min-{flag}', type=float, dest=f'min_{metric}')
+        query.add_argument(f'--max-{flag}', type=float, dest=f'max_{metric}')
+    query.add_argument('--sort', choices=METRICS, help="Rank by this metric (lowest first)")
+    query.add_argument('--desc', action='store_true', help="Highest first")
+    query.add_argument('-k', type=int, default=10, help="Number of results (per category with --per-category)")
+    query.add_argument('--per-category', action='store_true', help="Top k within each category")
+    query.add_argument('--format', choices=['json', 'csv'], default='json')
+    query.add_argument('--output', help="Write results to a file instead of stdout")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    index = CatalogIndex.load(args.index)
+    if args.command == 'build':
+        counts = index.refresh(args.base_path)
+        index.save(args.index)
+        print(f"Indexed {len(index)} EPDs in {time.perf_counter() - start:.1f} seconds: {counts}")
+        sys.exit(0)
+
+    loaded = time.perf_counter()
+    ranges = {m: (getattr(args, f'min_{m}'), getattr(args, f'max_{m}')) for m in METRICS
+              if getattr(args, f'min_{m}') is not None or getattr(args, f'max_{m}') is not None}
+    rows = index.query(
+        sort=args.sort, k=args.k, descending=args.desc, per_category=args.per_category,
+        category=args.category, country=args.country, state=args.state,
+        declared_unit=args.declared_unit, postal_prefix=args.postal_prefix, ranges=ranges,
+    )
+    finished = time.perf_counter()
+    output = format_rows(rows, args.format)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    print(f"{len(rows)} results (load {(loaded - start) * 1000:.0f} ms, query {(finished - loaded) * 1000:.1f} ms)",
+          file=sys.stderr)
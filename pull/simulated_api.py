@@ -0,0 +1,162 @@
+"""
+Local stand-in for the EC3 API, serving synthetic EPD pages (synthetic_epds.py).
+
+Implements the two endpoints the pull uses:
+    POST /api/rest-auth/login          -> {"key": TOKEN}
+    GET  /api/epds?plant_geography=R&page_number=N
+                                       -> page N of region R, with X-Total-Pages
+Every request waits for a latency drawn from a LatencyModel, and a share of /epds requests
+(rate_limit_rate) are answered with 429 instead. Pages are generated and encoded up front so
+serving costs no CPU during a benchmark.
+
+Usage:
+    with SimulatedApi({'US-GA': 4, 'IN': 2}, latency=LatencyModel('lognormal', 0.2, 0.5)) as api:
+        os.environ['EC3_API_URL'] = api.url
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_epds import generate_epds
+
+TOKEN = "simulated-token"
+PAGE_RECORDS = 250
+LATENCY_KINDS = ('fixed', 'uniform', 'lognormal')
+
+class LatencyModel:
+    """
+    Response delay in seconds:
+        fixed      always `median`
+        uniform    between median * (1 - spread) and median * (1 + spread)
+        lognormal  median * exp(N(0, spread)), a long right tail like real API latency
+    """
+
+    def __init__(self, kind='fixed', median=0.0, spread=0.0, seed=0):
+        if kind not in LATENCY_KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.median = median
+        self.spread = spread
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.kind == 'uniform':
+                return max(0.0, self.median * (1 + self._rng.uniform(-self.spread, self.spread)))
+            if self.kind == 'lognormal':
+                return self.median * math.exp(self._rng.gauss(0, self.spread))
+            return self.median
+
+    def describe(self):
+        return {'distribution': self.kind, 'median_seconds': self.median, 'spread': self.spread}
+
+class SimulatedApi:
+    """
+    Threaded HTTP server with fixed synthetic pages per region.
+
+    Args:
+        pages: Dict of region -> page count (other regions have no data)
+        page_records: Records per page
+        latency: LatencyModel applied to every request
+        rate_limit_rate: Share of /epds requests answered with 429
+        seed: Seed for the pages and the 429 draws
+    """
+
+    def __init__(self, pages, page_records=PAGE_RECORDS, latency=None, rate_limit_rate=0.0, seed=0):
+        self.latency = latency or LatencyModel()
+        self.rate_limit_rate = rate_limit_rate
+        self.pages = {
+            region: [json.dumps(generate_epds(page_records, f"{seed}:{region}:{page}", regions=[region])).encode()
+                     for page in range(1, count + 1)]
+            for region, count in pages.items()
+        }
+        self.records = sum(count for count in pages.values()) * page_records
+        self.counts = {'requests': 0, 'pages': 0, 'rate_limited': 0, 'unauthorized': 0, 'bytes': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/api"
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.counts[key] += value
+
+    def _rate_limited(self):
+        with self._lock:
+            return self._rng.random() < self.rate_limit_rate
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, as requests sessions would use
+
+            def _send(self, status, body=b'', headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                api._count(requests=1, bytes=len(body))
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(api.latency.sample())
+                if urlparse(self.path).path.rstrip('/').endswith('/rest-auth/login'):
+                    self._send(200, json.dumps({'key': TOKEN}).encode())
+                else:
+                    self._send(404)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                time.sleep(api.latency.sample())
+                if not url.path.rstrip('/').endswith('/epds'):
+                    self._send(404)
+                    return
+                if self.headers.get('Authorization') != f"Bearer {TOKEN}":
+                    api._count(unauthorized=1)
+                    self._send(401, b'{"detail": "Invalid token."}')
+                    return
+                if api._rate_limited():
+                    api._count(rate_limited=1)
+                    self._send(429, b'{"detail": "Request was throttled."}')
+                    return
+                params = parse_qs(url.query)
+                region_pages = api.pages.get(params.get('plant_geography', [''])[0], [])
+                page = int(params.get('page_number', ['1'])[0])
+                body = region_pages[page - 1] if 1 <= page <= len(region_pages) else b'[]'
+                api._count(pages=1)
+                self._send(200, body, {'X-Total-Pages': str(len(region_pages))})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='simulated-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
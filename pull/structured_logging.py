@@ -0,0 +1,105 @@
+"""
+Structured, non-blocking logging for the pull scripts.
+Log calls only put the record on an in-memory queue; a QueueListener thread formats each record
+as one JSON line and writes it to the log file. Messages use %-style arguments, which are
+merged in the listener thread and only for records whose level is enabled, so DEBUG calls
+cost a level check when DEBUG is off.
+
+Context goes in `extra` and becomes top-level JSON fields:
+    logger.info("Fetched page", extra={'region': 'US-GA', 'page': 3, 'duration': 0.82})
+    -> {"ts": "...", "level": "INFO", "logger": "...", "msg": "Fetched page", "region": "US-GA", "page": 3, ...}
+
+Levels are set per logger name, e.g. {'': 'INFO', 'urllib3': 'WARNING'}, and can be overridden
+with the EPD_LOG_LEVELS environment variable ("pipeline=DEBUG,urllib3=INFO").
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+# Fields copied from `extra` into each JSON line when present
+CONTEXT_FIELDS = ('region', 'page', 'stage', 'duration', 'records', 'status', 'worker', 'attempt')
+LEVELS_ENV = "EPD_LOG_LEVELS"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = round(value, 4) if field == 'duration' else value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+    The stock handler formats the message on the logging thread (to make records picklable),
+    which is not needed for an in-process queue.
+    """
+
+    def prepare(self, record):
+        return record
+
+def parse_levels(text):
+    """'pipeline=DEBUG,urllib3=INFO' -> {'pipeline': 'DEBUG', 'urllib3': 'INFO'} ('root=' or '=' for the root)"""
+    levels = {}
+    for part in (text or '').split(','):
+        name, _, level = part.strip().partition('=')
+        if level:
+            levels['' if name in ('', 'root') else name] = level.strip().upper()
+    return levels
+
+_listener = None
+
+def setup_logging(path, levels=None):
+    """
+    Send all logging to a JSON lines file through a background listener.
+
+    Args:
+        path: Log file (appended to)
+        levels: Dict of logger name -> level name; '' is the root logger
+    Returns:
+        The started QueueListener (stopped and flushed at exit)
+    """
+    global _listener
+    stop_logging()
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    levels = dict(levels or {}, **parse_levels(os.environ.get(LEVELS_ENV)))
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logging)
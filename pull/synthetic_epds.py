@@ -0,0 +1,139 @@
+"""
+Seeded synthetic EPDs shaped like EC3 /api/epds records, for benchmarks and tests.
+
+Records carry the nested fields the pull touches (category, plant_or_group with owned_by,
+manufacturer, impacts, resource_uses, GWP quantities) plus scattered nulls like the live API.
+The same seed always yields the same records.
+
+Usage:
+    from synthetic_epds import generate_epds, openepd_counterpart
+    epds = generate_epds(10000, seed=1)
+"""
+import random
+import uuid
+
+# (display_name, openepd_name) pairs, weighted towards the common categories
+CATEGORIES = [
+    ('Ready Mix', 'ConstructionMaterials >> Concrete >> ReadyMix'),
+    ('Ready Mix', 'ConstructionMaterials >> Concrete >> ReadyMix'),
+    ('Ready Mix', 'ConstructionMaterials >> Concrete >> ReadyMix'),
+    ('Portland Cement', 'ConstructionMaterials >> Cementitious >> Cement >> Portland'),
+    ('Blended Cement', 'ConstructionMaterials >> Cementitious >> Cement >> Blended'),
+    ('Brick', 'ConstructionMaterials >> Masonry >> Brick'),
+    ('Steel Rebar', 'ConstructionMaterials >> Steel >> RebarSteel'),
+    ('Gypsum Board', 'ConstructionMaterials >> Gypsum >> GypsumBoard'),
+    ('Kitchen Cabinets', 'ConstructionMaterials >> Furniture >> KitchenCabinets'),
+    ('Office Furniture', 'ConstructionMaterials >> Furniture >> OfficeFurniture'),
+]
+REGIONS = ['US-GA', 'US-CA', 'US-TX', 'US-ME', 'IN', 'DE']
+PLANTS_PER_REGION = 40
+MANUFACTURERS = 60
+NULL_RATE = 0.15  # share of optional fields sent as null
+
+IMPACT_KEYS = ['gwp', 'ozone_depletion', 'acidification', 'eutrophication', 'smog', 'abiotic_resource']
+RESOURCE_KEYS = ['renewable', 'non_renewable', 'water', 'waste', 'output_flows']
+WORDS = ['structural', 'low carbon', 'high strength', 'recycled', 'modular', 'tables', 'wardrobes',
+         'architectural', 'fire rated', 'interior', 'exterior', 'precast', 'lightweight']
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _maybe(rng, value):
+    return None if rng.random() < NULL_RATE else value
+
+def _quantity(rng, low, high, unit):
+    return f"{rng.uniform(low, high):.2f} {unit}"
+
+def _manufacturers(rng):
+    return [{
+        'id': f"mfr-{i:04d}",
+        'name': f"Manufacturer {i}",
+        'country': rng.choice(['US', 'IN', 'DE']),
+        'postal_code': f"{rng.randint(10000, 99999)}",
+        'web_domain': _maybe(rng, f"mfr{i}.example.com"),
+    } for i in range(MANUFACTURERS)]
+
+def _plants(rng, region, manufacturers):
+    country, _, district = region.partition('-')
+    return [{
+        'id': f"plant-{region}-{i:03d}",
+        'name': f"{region} Plant {i}",
+        'country': country,
+        'admin_district': district or None,
+        'admin_district2': _maybe(rng, f"County {rng.randint(1, 99)}"),
+        'postal_code': _maybe(rng, f"{rng.randint(10000, 99999)}"),
+        'address': _maybe(rng, f"{rng.randint(1, 9999)} Industrial Way"),
+        'latitude': round(rng.uniform(-60, 60), 5),
+        'longitude': round(rng.uniform(-150, 150), 5),
+        'owned_by': rng.choice(manufacturers),
+    } for i in range(PLANTS_PER_REGION)]
+
+def _impacts(rng, keys):
+    return {key: {'A1A2A3': {'mean': round(rng.uniform(0.001, 500), 4), 'unit': 'kgCO2e'},
+                  'A4': _maybe(rng, {'mean': round(rng.uniform(0, 50), 4), 'unit': 'kgCO2e'})}
+            for key in keys}
+
+def generate_epds(count, seed=0, regions=REGIONS):
+    """
+    Generate `count` synthetic EPD records.
+
+    Args:
+        count: Number of records
+        seed: Random seed; equal seeds give equal records
+        regions: Regions to spread the plants over
+    Returns:
+        List of EPD dicts as returned by the EC3 API (nulls not stripped)
+    """
+    rng = random.Random(seed)
+    manufacturers = _manufacturers(rng)
+    plants = {region: _plants(rng, region, manufacturers) for region in regions}
+    category_ids = {name: f"cat-{i:03d}" for i, (name, _) in enumerate(CATEGORIES)}
+    epds = []
+    for i in range(count):
+        display_name, openepd_name = rng.choice(CATEGORIES)
+        region = rng.choice(regions)
+        # Copies, as decoded JSON pages do not share objects between records
+        plant = dict(rng.choice(plants[region]))
+        plant['owned_by'] = dict(plant['owned_by'])
+        gwp = rng.uniform(50, 900)
+        epds.append({
+            'id': _uuid(rng),
+            'material_id': f"ec3{rng.getrandbits(48):012x}",
+            'open_xpd_uuid': _uuid(rng),
+            'name': f"{display_name} {' '.join(rng.sample(WORDS, 2))} #{i}",
+            'description': _maybe(rng, ' '.join(rng.choices(WORDS, k=rng.randint(3, 12)))),
+            'category': {
+                'id': category_ids[display_name],
+                'display_name': display_name,
+                'openepd_name': openepd_name,
+                'pct10_gwp': f"{gwp * 0.6:.1f} kgCO2e",
+                'pct50_gwp': f"{gwp:.1f} kgCO2e",
+                'pct90_gwp': f"{gwp * 1.4:.1f} kgCO2e",
+                'declared_unit': '1 t',
+            },
+            'plant_or_group': plant,
+            'manufacturer': _maybe(rng, dict(plant['owned_by'])),
+            'declared_unit': '1 t',
+            'gwp': f"{gwp:.2f} kgCO2e",
+            'gwp_per_category_declared_unit': f"{gwp:.2f} kgCO2e",
+            'conservative_estimate': _maybe(rng, f"{gwp * 1.2:.2f} kgCO2e"),
+            'best_practice': _maybe(rng, _quantity(rng, 30, gwp, 'kgCO2e')),
+            'date_of_issue': f"20{rng.randint(18, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'date_validity_ends': _maybe(rng, f"20{rng.randint(26, 30)}-01-01"),
+            'impacts': _maybe(rng, _impacts(rng, rng.sample(IMPACT_KEYS, rng.randint(1, 4)))),
+            'resource_uses': _maybe(rng, {key: _quantity(rng, 0, 1000, 'MJ')
+                                          for key in rng.sample(RESOURCE_KEYS, rng.randint(0, 3))}),
+            'standards': [_maybe(rng, 'ISO 14025'), 'EN 15804'],
+            'externally_verified': rng.random() < 0.8,
+        })
+    return epds
+
+def openepd_counterpart(epd, seed=0):
+    """openEPD record for the same product, with the impact categories EC3 left out"""
+    rng = random.Random(f"{seed}:{epd['open_xpd_uuid']}")
+    return {
+        'id': epd['open_xpd_uuid'],
+        'open_xpd_uuid': epd['open_xpd_uuid'],
+        'impacts': _impacts(rng, IMPACT_KEYS),
+        'resource_uses': {key: _quantity(rng, 0, 1000, 'MJ') for key in RESOURCE_KEYS},
+    }
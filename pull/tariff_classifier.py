@@ -0,0 +1,118 @@
+"""
+Keyword-based tariff classification for EPD products.
+Compiles a keyword table once into a single regex so every keyword is matched
+in one pass over the search text, and keeps per-region tariff tables.
+"""
+import re
+
+# US import tariff rates by product keyword. Earlier keywords win when several match,
+# so list specific phrases before broader ones.
+DEFAULT_TARIFF_TABLE = {
+    'kitchen cabinet': 50,
+    'kitchen cabinets': 50,
+    'bathroom vanity': 50,
+    'bathroom vanities': 50,
+    'upholstered furniture': 30,
+    'furniture': 30,  # Broader match for furniture
+    'tables': 30,     # Tables are furniture
+    'wardrobes': 30,  # Found in descriptions
+}
+
+# Per-region overrides. Regions not listed here use DEFAULT_TARIFF_TABLE,
+# except US states, which are domestic and carry no import tariff.
+REGION_TARIFF_TABLES = {
+    'IN': DEFAULT_TARIFF_TABLE,
+}
+
+# Destination region for the tariff rows (region2 in products.csv)
+TARIFF_DESTINATION = 'US'
+
+class TariffClassifier:
+    """
+    Matches every keyword of a tariff table in a single scan of the text.
+
+    The table order is the priority order: when several keywords occur in the
+    text, the rate of the one listed first is returned, same as looping over
+    the table and stopping at the first substring hit.
+    """
+
+    def __init__(self, keyword_to_tariff):
+        self.keywords = [kw.lower() for kw in keyword_to_tariff]
+        self.rates = {kw.lower(): rate for kw, rate in keyword_to_tariff.items()}
+        self.priority = {kw: idx for idx, kw in reversed(list(enumerate(self.keywords)))}
+
+        # Longest alternatives first so each start position reports its longest keyword.
+        # The lookahead makes matches zero-width, so overlapping keywords are all seen.
+        alternatives = sorted(set(self.keywords), key=len, reverse=True)
+        self.pattern = re.compile('(?=(' + '|'.join(re.escape(kw) for kw in alternatives) + '))') if alternatives else None
+
+        # A match of a long keyword also implies every keyword that is a prefix of it
+        # (e.g. 'kitchen cabinets' implies 'kitchen cabinet').
+        self.implied = {
+            kw: {other for other in self.keywords if kw.startswith(other)}
+            for kw in self.keywords
+        }
+
+    def match_all(self, text):
+        """Return the set of table keywords found anywhere in text."""
+        if not text or self.pattern is None:
+            return set()
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            found |= self.implied[match.group(1)]
+        return found
+
+    def classify(self, text):
+        """Return the tariff rate for text, or None if no keyword matches."""
+        found = self.match_all(text)
+        if not found:
+            return None
+        return self.rates[min(found, key=self.priority.__getitem__)]
+
+_classifiers = {}
+
+def tariff_table_for(region):
+    """Return the keyword table for a region, or None if tariffs do not apply."""
+    if region in REGION_TARIFF_TABLES:
+        return REGION_TARIFF_TABLES[region]
+    if region == TARIFF_DESTINATION or region.startswith(f'{TARIFF_DESTINATION}-'):
+        return None
+    return DEFAULT_TARIFF_TABLE
+
+def get_classifier(region):
+    """Return the compiled classifier for a region (built once and cached), or None."""
+    table = tariff_table_for(region)
+    if not table:
+        return None
+    key = id(table)
+    if key not in _classifiers:
+        _classifiers[key] = TariffClassifier(table)
+    return _classifiers[key]
+
+def epd_search_text(epd):
+    """Build the text searched for tariff keywords: category display name, product name and description."""
+    category_info = epd.get('category') or {}
+    display_name = (category_info.get('display_name') or '').strip()
+    product_name = (epd.get('name') or '').strip()
+    product_description = (epd.get('description') or '').strip()
+    return f"{display_name} {product_name} {product_description}"
+
+def classify_epd(epd, region):
+    """
+    Classify a single EPD for a region.
+
+    Returns:
+        products.csv row dict, or None if the region has no tariff table or nothing matched
+    """
+    classifier = get_classifier(region)
+    if classifier is None or not isinstance(epd, dict):
+        return None
+    rate = classifier.classify(epd_search_text(epd))
+    if rate is None:
+        return None
+    return {
+        'region1': region,
+        'region2': TARIFF_DESTINATION,  # Placeholder - actual US state mapping TBD
+        'category_id': (epd.get('category') or {}).get('id', ''),
+        'tariff_percent': rate,
+    }
@@ -0,0 +1,107 @@
+"""
+Test script for the emissions data scan (incremental cache and parallel scan).
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import yaml
+
+from analyze_emissions_data import scan_all_epds, scan_incremental, stats_to_plain
+from synthetic_epds import generate_epds
+
+SAMPLE_KEYS = ('sample_epds_with_impacts', 'sample_epds_with_resources')
+
+def epd_path(root, epd):
+    country = epd['plant_or_group']['country']
+    return os.path.join(root, country, epd['category']['display_name'].replace(' ', '_'), f"{epd['material_id']}.yaml")
+
+def write_epd(root, epd, path=None):
+    path = path or epd_path(root, epd)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        yaml.safe_dump({k: v for k, v in epd.items() if v is not None}, f)
+    return path
+
+def counts(stats):
+    """Stats as plain dicts without the samples (which depend on scan order)"""
+    plain = stats_to_plain(stats)
+    return {key: value for key, value in plain.items() if key not in SAMPLE_KEYS}
+
+def test_incremental_matches_full_scan():
+    print("\n1. Testing the incremental scan equals a full scan after edits...")
+    epds = generate_epds(40, seed=11)
+    with tempfile.TemporaryDirectory() as root:
+        base = os.path.join(root, 'products-data')
+        cache_file = os.path.join(root, 'cache.json')
+        paths = [write_epd(base, epd) for epd in epds]
+        stats, summary = scan_incremental(cache_file, workers=1, base_path=base)
+        assert summary['added'] == 40 and counts(stats) == counts(scan_all_epds(workers=1, base_path=base))
+
+        # Modify one file in place (other category, no impacts), delete one, add one
+        index, original = next((i, epd) for i, epd in enumerate(epds) if epd['impacts'])
+        changed = dict(original, impacts=None, category=dict(original['category'], display_name='Test Category'))
+        write_epd(base, changed, paths[index])
+        os.remove(paths[index + 1])
+        write_epd(base, generate_epds(1, seed=12)[0])
+        with open(cache_file) as f:
+            before = f.read()
+        stats, summary = scan_incremental(cache_file, workers=1, base_path=base)
+        full = scan_all_epds(workers=1, base_path=base)
+        with open(cache_file) as f:
+            cache = json.load(f)
+    assert summary == {'unchanged': 38, 'changed': 1, 'added': 1, 'deleted': 1}, summary
+    assert counts(stats) == counts(full), "Subtracting old contributions gives the full-scan totals"
+    assert all(len(stats[key]) == len(full[key]) for key in SAMPLE_KEYS), "Samples refilled"
+    assert json.dumps(cache) != before and cache['stats']['total_epds'] == 40, "Cache rewritten"
+    assert len(cache['files']) == 40 and 'Test Category' in cache['stats']['by_category']
+    print("   ✓ 38 unchanged, 1 changed, 1 added, 1 deleted; totals match a full scan")
+
+def test_in_place_edit_is_rescanned():
+    print("\n2. Testing a file edited in place is re-analyzed...")
+    epds = generate_epds(10, seed=21)
+    with tempfile.TemporaryDirectory() as root:
+        base = os.path.join(root, 'products-data')
+        cache_file = os.path.join(root, 'cache.json')
+        paths = [write_epd(base, epd) for epd in epds]
+        scan_incremental(cache_file, workers=1, base_path=base)
+        edited = dict(epds[0], gwp=None, impacts={'ozone_depletion': {'A1A2A3': {'mean': 1}}}, resource_uses=None)
+        write_epd(base, edited)
+        stat = os.stat(paths[0])
+        os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        stats, summary = scan_incremental(cache_file, workers=1, base_path=base)
+        full = scan_all_epds(workers=1, base_path=base)
+    assert summary['changed'] == 1 and summary['unchanged'] == 9
+    assert counts(stats) == counts(full)
+    print("   ✓ Changed file subtracted and re-added")
+
+def test_parallel_scan_matches_serial():
+    print("\n3. Testing a parallel scan equals a serial scan...")
+    epds = generate_epds(240, seed=31)  # the process pool is only used from 200 files
+    with tempfile.TemporaryDirectory() as root:
+        base = os.path.join(root, 'products-data')
+        for epd in epds:
+            write_epd(base, epd)
+        serial = scan_all_epds(workers=1, base_path=base)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            parallel = scan_all_epds(workers=2, base_path=base)
+            incremental, _ = scan_incremental(os.path.join(root, 'cache.json'), workers=2, base_path=base)
+    assert "Scanning with 2 worker processes" in output.getvalue(), "Process pool used"
+    assert serial['total_epds'] == 240
+    assert stats_to_plain(parallel) == stats_to_plain(serial), "Same totals and samples"
+    assert counts(incremental) == counts(serial)
+    print("   ✓ 240 files: workers=2 matches workers=1")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_matches_full_scan()
+        test_in_place_edit_is_rescanned()
+        test_parallel_scan_matches_serial()
+        print("\n✅ All emissions analysis tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,47 @@
+"""
+Test script for the synthetic EPD generator and the benchmark baseline comparison.
+"""
+import os
+import sys
+
+from benchmark import compare_results, run_benchmarks
+from epd_schema import EPD_OPTIONAL_FIELDS, EPD_SCHEMA, compile_schema
+from synthetic_epds import generate_epds
+
+def test_synthetic_epds():
+    print("\n1. Testing synthetic EPDs are seeded and pass the schema...")
+    epds = generate_epds(200, seed=7)
+    assert epds == generate_epds(200, seed=7), "Same seed, same records"
+    assert epds != generate_epds(200, seed=8)
+    validate = compile_schema(EPD_SCHEMA, EPD_OPTIONAL_FIELDS)
+    assert all(validate({k: v for k, v in epd.items() if v is not None}) is None for epd in epds)
+    assert any(epd['description'] is None for epd in epds), "Some optional fields are null"
+    assert any('cement' in epd['category']['openepd_name'].lower() for epd in epds)
+    assert epds[0]['plant_or_group'] is not epds[1]['plant_or_group']
+    print("   ✓ 200 records, reproducible and valid")
+
+def test_run_and_compare():
+    print("\n2. Testing a small run and the regression check...")
+    cwd = os.getcwd()
+    results = run_benchmarks([50], repeat=1, only=['remove_null_values', 'map_response', 'write_epd_to_csv'])
+    assert os.getcwd() == cwd, "The working folder is restored"
+    timings = results['benchmarks']
+    assert set(timings) == {'remove_null_values', 'map_response', 'write_epd_to_csv'}
+    assert timings['map_response']['50']['seconds'] > 0 and timings['map_response']['50']['runs'] == 1
+
+    baseline = {'benchmarks': {'map_response': {'50': {'seconds': timings['map_response']['50']['seconds'] / 2}},
+                               'remove_null_values': {'50': {'seconds': timings['remove_null_values']['50']['seconds']}}}}
+    rows = {row[0]: row for row in compare_results(results, baseline, threshold=0.25)}
+    assert set(rows) == {'map_response', 'remove_null_values'}, "Only benchmarks in the baseline are compared"
+    assert rows['map_response'][-1] and rows['map_response'][4] > 1.9
+    assert not rows['remove_null_values'][-1]
+    print("   ✓ 2x slowdown flagged, unchanged timing passes")
+
+if __name__ == "__main__":
+    try:
+        test_synthetic_epds()
+        test_run_and_compare()
+        print("\n✅ All benchmark tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,75 @@
+"""
+Test script for the bulk EC3 vs openEPD snapshot diff in compare_apis.py.
+"""
+import json
+import os
+import sys
+import tempfile
+
+import yaml
+
+from compare_apis import diff_snapshots, flatten_fields, hash_join, load_snapshot
+
+EC3 = [
+    {'id': 'e1', 'material_id': 'm1', 'open_xpd_uuid': 'x1', 'gwp': '100 kgCO2e',
+     'impacts': {'TRACI 2.1': {'gwp': {'A1A2A3': {'mean': 100, 'unit': 'kgCO2e'}}}}},
+    {'id': 'e2', 'material_id': 'm2', 'gwp': '50 kgCO2e'},
+    {'id': 'e3', 'material_id': 'm3', 'gwp': '10 kgCO2e'},
+]
+OPENEPD = [
+    {'id': 'x1', 'gwp': '100 kgCO2e', 'resource_uses': {'RPRE': {'A1A2A3': {'mean': 3}}},
+     'impacts': {'TRACI 2.1': {'gwp': {'A1A2A3': {'mean': 100.0000001, 'unit': 'kgCO2e'}}}}},
+    {'id': 'o2', 'material_id': 'm2', 'gwp': '55 kgCO2e'},
+    {'id': 'o9', 'material_id': 'm9'},
+]
+
+def test_hash_join():
+    print("\n1. Testing the hash join on ID fields...")
+    pairs, ec3_only, openepd_only, matched_by = hash_join(EC3, OPENEPD)
+    assert [(a['id'], b['id']) for a, b in pairs] == [('e1', 'x1'), ('e2', 'o2')]
+    assert [r['id'] for r in ec3_only] == ['e3']
+    assert [r['id'] for r in openepd_only] == ['o9']
+    assert matched_by['material_id'] == 1 and matched_by['open_xpd_uuid'] == 1
+    print("   ✓ Records paired by material_id and open_xpd_uuid")
+
+def test_field_diffs():
+    print("\n2. Testing field coverage and value differences...")
+    assert flatten_fields(EC3[0])['impacts.TRACI 2.1.gwp.A1A2A3.mean'] == 100.0
+    summary = diff_snapshots(EC3, OPENEPD)
+    fields = summary['fields']
+    assert fields['gwp']['both'] == 2 and fields['gwp']['different'] == 1
+    assert abs(fields['gwp']['max_abs_diff'] - 5) < 1e-9
+    assert fields['impacts.TRACI 2.1.gwp.A1A2A3.mean']['equal'] == 1, "Values within tolerance are equal"
+    assert fields['resource_uses.RPRE.A1A2A3.mean']['openepd_only'] == 1
+    assert summary['records']['matched'] == 2 and summary['unmatched_ec3_ids'] == ['m3']
+    print("   ✓ Coverage and differences counted per field")
+
+def test_directory_snapshot_reads_only_epds():
+    print("\n3. Testing a products-data snapshot loads only the EPD files...")
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'US', 'Brick'))
+        for material_id in ('m1', 'm2'):
+            with open(os.path.join(root, 'US', 'Brick', f'{material_id}.yaml'), 'w') as f:
+                yaml.dump({'material_id': material_id, 'category': {'$ref': 'categories', 'id': 'c1'}}, f)
+        with open(os.path.join(root, 'categories.yaml'), 'w') as f:
+            yaml.dump({'c1': {'id': 'c1', 'display_name': 'Brick'}}, f)
+        with open(os.path.join(root, 'publish-manifest.json'), 'w') as f:
+            json.dump({'files': {'US/Brick/m1.yaml': {'sha256': 'abc'}}}, f)
+        with open(os.path.join(root, 'gwp_percentiles.json'), 'w') as f:
+            json.dump({'US-GA': {'c1': {'pct50': 300}}}, f)
+        with open(os.path.join(root, 'US', 'Brick', 'notes.json'), 'w') as f:
+            json.dump({'note': 'not an EPD'}, f)
+        records = load_snapshot(root)
+    assert sorted(str(r.get('material_id')) for r in records) == ['m1', 'm2'], "Manifests and summaries are not EPDs"
+    assert records[0]['category']['display_name'] == 'Brick', "References still expanded"
+    print("   ✓ 2 EPDs loaded, stray manifest and summaries skipped")
+
+if __name__ == "__main__":
+    try:
+        test_hash_join()
+        test_field_diffs()
+        test_directory_snapshot_reads_only_epds()
+        print("\n✅ All bulk comparison tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,116 @@
+"""
+Test script for the shared dimension tables (interning and reference layout).
+"""
+import csv
+import importlib.util
+import os
+import sys
+import tempfile
+
+import yaml
+
+from dimensions import PLANT_CSV_FIELDS, DimensionTable, expand_references
+from synthetic_epds import generate_epds
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def category(pct50='300 kgCO2e'):
+    return {'id': 'c1', 'display_name': 'Ready Mix', 'pct50_gwp': pct50}
+
+def test_intern_shares_equal_objects():
+    print("\n1. Testing equal objects are interned to one shared dict...")
+    table = DimensionTable('categories')
+    first = table.intern(category())
+    second = table.intern(category())
+    assert first is second, "Equal objects should share one dict"
+    changed = table.intern(category('280 kgCO2e'))
+    assert table.get('c1') is changed and table.variants == 1, "Changed content replaces the stored object"
+    assert table.intern({'display_name': 'no id'}) == {'display_name': 'no id'}
+    print("   ✓ One object per id, newest content kept")
+
+def test_reference_round_trip():
+    print("\n2. Testing references are expanded from a saved table...")
+    table = DimensionTable('categories')
+    full = table.intern(category())
+    epd = {'material_id': 'm1', 'category': table.reference(full, ('display_name',))}
+    assert epd['category'] == {'$ref': 'categories', 'id': 'c1', 'display_name': 'Ready Mix'}
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'categories.yaml')
+        table.save(path)
+        loaded = DimensionTable.load('categories', path)
+    assert expand_references(epd, {'categories': loaded})['category'] == full
+    print("   ✓ Reference stub expands back to the full object")
+
+def test_plants_csv():
+    print("\n3. Testing the plants.csv export...")
+    plants = DimensionTable('plants')
+    for _ in range(3):
+        plants.intern({'id': 'p1', 'name': 'Plant', 'owned_by': {'id': 'mf1', 'name': 'Acme'}, 'latitude': 33.7})
+    plants.intern({'id': 'p2', 'name': 'Other'}, count=False)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'plants.csv')
+        plants.save_csv(path, PLANT_CSV_FIELDS)
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+    assert [r['id'] for r in rows] == ['p1', 'p2']
+    assert rows[0]['owned_by_id'] == 'mf1' and rows[0]['latitude'] == '33.7'
+    assert rows[0]['products'] == '3' and rows[1]['products'] == ''
+    print("   ✓ One row per plant with product counts")
+
+def test_yaml_files_have_no_aliases():
+    print("\n4. Testing interned objects are written in full, not as YAML aliases...")
+    epd = next(e for e in generate_epds(50, seed=3) if e['manufacturer'] is not None)
+    epd['manufacturer'] = dict(epd['plant_or_group']['owned_by'])
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        workdir = os.path.join(root, 'a', 'b')
+        os.makedirs(workdir)
+        os.chdir(workdir)
+        try:
+            spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+            pf = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(pf)
+            # Layout before interning: the plain dump of the null-stripped record
+            expected = yaml.dump(pf.remove_null_values(epd), default_flow_style=False)
+            normalized = pf.normalize_epd(epd)
+            assert normalized['manufacturer'] is normalized['plant_or_group']['owned_by'], "Shared after interning"
+            sink = pf.YamlSink('US-GA')
+            sink.write(normalized)
+            written = [os.path.join(folder, name) for folder, _, names in os.walk(os.path.join(root, 'products-data'))
+                       for name in names if name == f"{epd['material_id']}.yaml"]
+            with open(written[0]) as f:
+                text = f.read()
+            pf.plant_table.save(os.path.join(root, 'plants.yaml'))
+            with open(os.path.join(root, 'plants.yaml')) as f:
+                plants_text = f.read()
+        finally:
+            os.chdir(cwd)
+    assert '&id' not in text and '*id' not in text
+    assert text == expected, "Product YAML keeps the layout written before interning"
+    assert '&id' not in plants_text and '*id' not in plants_text
+    print("   ✓ Product and plants YAML written without anchors")
+
+def test_merge_seen_keeps_uncounted_rows():
+    print("\n5. Testing rows interned without a count are merged across processes...")
+    worker = DimensionTable('manufacturers')
+    worker.intern({'id': 'm0', 'name': 'Before reset'})
+    worker.reset_counts()
+    worker.intern({'id': 'm1', 'name': 'Counted'})
+    worker.intern({'id': 'm2', 'name': 'Owner of a plant'}, count=False)
+    parent = DimensionTable('manufacturers')
+    parent.merge_seen(worker.seen_to_dict())
+    assert sorted(parent.rows) == ['m1', 'm2'], "Rows seen since the reset, counted or not"
+    assert parent.counts == {'m1': 1} and parent.references == 1
+    print("   ✓ Uncounted rows kept, counts unchanged")
+
+if __name__ == "__main__":
+    try:
+        test_intern_shares_equal_objects()
+        test_reference_round_trip()
+        test_plants_csv()
+        test_yaml_files_have_no_aliases()
+        test_merge_seen_keeps_uncounted_rows()
+        print("\n✅ All dimension table tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+"""
+Test script for EPD schema validation and the quarantine file.
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from epd_schema import EPD_OPTIONAL_FIELDS, EPD_SCHEMA, Quarantine, compile_schema, validate_page
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def epd(**changes):
+    record = {
+        'material_id': 'm1', 'name': 'Mix 4000', 'open_xpd_uuid': 'ec3abc',
+        'category': {'id': 'c1', 'display_name': 'Ready Mix', 'openepd_name': 'ReadyMix'},
+        'plant_or_group': {'id': 'p1', 'postal_code': '30301'},
+    }
+    record.update(changes)
+    return {k: v for k, v in record.items() if v is not None}
+
+def test_validate_page():
+    print("\n1. Testing a page is split into valid and rejected records...")
+    validate = compile_schema(EPD_SCHEMA, EPD_OPTIONAL_FIELDS)
+    page = [
+        epd(),
+        epd(material_id=None),
+        epd(category={'id': 'c1', 'openepd_name': 'ReadyMix'}),
+        epd(category='Ready Mix'),
+        epd(manufacturer='Acme'),
+        epd(manufacturer={'id': 'mf1'}),
+        epd(category={'id': ['c1'], 'display_name': 'Ready Mix', 'openepd_name': 'ReadyMix'}),
+        epd(plant_or_group={'id': {'uuid': 'p1'}}),
+        epd(plant_or_group={'id': 7, 'owned_by': {'id': ['mf1']}}),
+        epd(manufacturer={'id': 3.5}),
+        ['not', 'a', 'dict'],
+    ]
+    valid, rejected = validate_page(page, validate)
+    assert [r['material_id'] for r in valid] == ['m1', 'm1']
+    assert [reason for _, reason in rejected] == [
+        'missing material_id',
+        'missing category.display_name',
+        'category is str, expected dict',
+        'manufacturer is str, expected dict',
+        'category.id is list, expected str or int',
+        'plant_or_group.id is dict, expected str or int',
+        'plant_or_group.owned_by.id is list, expected str or int',
+        'manufacturer.id is float, expected str or int',
+        'record is list, not dict',
+    ]
+    print("   ✓ Reasons name the first failing field")
+
+def test_quarantine_file():
+    print("\n2. Testing rejected records are written as NDJSON...")
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'quarantine.ndjson')
+        with open(path, 'w') as f:
+            f.write('{"from": "previous run"}\n')
+        quarantine = Quarantine(path)
+        quarantine.write_many('US-GA', 3, [(epd(name=None), 'missing name')])
+        quarantine.close()
+        quarantine.write_many('IN', 1, [(epd(), 'other')])
+        quarantine.write_many('IN', 2, [])
+        quarantine.close()
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [(l['region'], l['page'], l['reason']) for l in lines] == [('US-GA', 3, 'missing name'), ('IN', 1, 'other')]
+        assert lines[0]['record']['material_id'] == 'm1'
+        assert len(quarantine) == 2 and quarantine.counts['IN'] == 1
+        Quarantine(path).clear()
+        assert not os.path.exists(path)
+    print("   ✓ Previous run replaced, one line per record")
+
+def test_unhashable_ids_are_quarantined():
+    print("\n3. Testing a record whose ids cannot be interned is rejected, not the page...")
+    page = [epd(material_id=f'm{i}') for i in range(3)]
+    page[1]['category'] = dict(page[1]['category'], id=['c1', 'c2'])
+    page.append(epd(material_id='m3', manufacturer={'id': {'uuid': 'mf1'}, 'name': 'Acme'}))
+    with tempfile.TemporaryDirectory() as root:
+        workdir = os.path.join(root, 'a', 'b')
+        os.makedirs(workdir)
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+            pf = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(pf)
+            valid, rejected = pf.normalize_page(page)
+        finally:
+            os.chdir(cwd)
+    assert [r['material_id'] for r in valid] == ['m0', 'm2']
+    assert valid[0]['category'] is valid[1]['category'], "Valid records still interned"
+    assert [(r['material_id'], reason) for r, reason in rejected] == [
+        ('m1', 'category.id is list, expected str or int'),
+        ('m3', 'manufacturer.id is dict, expected str or int'),
+    ]
+    print("   ✓ 2 records quarantined, the rest of the page kept")
+
+if __name__ == "__main__":
+    try:
+        test_validate_page()
+        test_quarantine_file()
+        test_unhashable_ids_are_quarantined()
+        print("\n✅ All EPD schema tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,134 @@
+"""
+Test script for the IO model matrix download (NumPy storage and the bounded request pool).
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from get_matrices import MATRICES, MatrixClient, download_all, load_matrix, matrix_from_json, save_matrix
+
+MODELS = ['M1', 'M2']
+
+def model_matrix(model_id, name):
+    """Small distinct matrix per model and name"""
+    seed = MODELS.index(model_id) * len(MATRICES) + MATRICES.index(name)
+    return np.random.default_rng(seed).random((3, 4))
+
+def route(path):
+    """Response body of the stubbed API for a path"""
+    parts = path.strip('/').split('/')
+    if parts == ['models']:
+        return [{'id': model_id} for model_id in MODELS]
+    if parts == ['sectorcrosswalk.csv']:
+        return "sector,code\n"
+    model_id, *rest = parts
+    if rest[0] == 'matrix':
+        return model_matrix(model_id, rest[1]).tolist()
+    if rest == ['demands']:
+        return [{'id': 'd1'}, {'id': 'd2'}]
+    if rest[0] == 'demands':
+        return [{'sector': 's1', 'amount': 1.0}]
+    return []
+
+class StubbedRequests:
+    """Replaces MatrixClient._request: counts requests in flight and answers from route()"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+
+    def __call__(self, method, path, body=None):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return 200, 'OK', json.dumps(route(path)).encode()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+def run_download(target_dir, stub, **kwargs):
+    original = MatrixClient._request
+    MatrixClient._request = lambda client, method, path, body=None: stub(method, path, body)
+    try:
+        return asyncio.run(download_all("http://stub/api", target_dir=target_dir, **kwargs))
+    finally:
+        MatrixClient._request = original
+
+def test_matrix_round_trip():
+    print("\n1. Testing matrices round-trip through .npy, .npz and JSON...")
+    array = np.random.default_rng(1).random((5, 7))
+    with tempfile.TemporaryDirectory() as model_dir:
+        os.makedirs(os.path.join(model_dir, "matrix"))
+        save_matrix(os.path.join(model_dir, "matrix", "A.npy"), array)
+        mapped = load_matrix(model_dir, "A")
+        assert isinstance(mapped, np.memmap) and np.array_equal(mapped, array), "Memory-mapped .npy"
+        assert np.array_equal(load_matrix(model_dir, "A", mmap=False), array)
+        save_matrix(os.path.join(model_dir, "matrix", "B.npy"), array.astype(np.float32))
+        assert load_matrix(model_dir, "B").dtype == np.float32
+
+        np.savez_compressed(os.path.join(model_dir, "matrices.npz"), C=array)
+        assert np.array_equal(load_matrix(model_dir, "C"), array), "Read from matrices.npz"
+        with open(os.path.join(model_dir, "matrix", "D.json"), 'w') as f:
+            json.dump(array.tolist(), f)
+        assert np.array_equal(load_matrix(model_dir, "D"), array), "JSON fallback"
+        assert np.array_equal(matrix_from_json(json.dumps(array.tolist())), array)
+        assert not [name for name in os.listdir(os.path.join(model_dir, "matrix")) if name.endswith('.tmp')]
+    print("   ✓ Same arrays back from every storage format")
+
+def test_download_respects_concurrency_limit():
+    print("\n2. Testing the download pool keeps at most max_concurrent requests in flight...")
+    stub = StubbedRequests()
+    with tempfile.TemporaryDirectory() as target_dir:
+        failures = run_download(target_dir, stub, max_concurrent=3)
+        assert failures == []
+        for model_id in MODELS:
+            model_dir = os.path.join(target_dir, model_id)
+            for name in MATRICES:
+                assert np.array_equal(load_matrix(model_dir, name), model_matrix(model_id, name)), f"{model_id}/{name}"
+            assert os.path.exists(os.path.join(model_dir, "demands", "d2.json"))
+    # models + crosswalk + per model: 3 index files, the matrices, the demand list and 2 demands
+    assert stub.requests == 2 + len(MODELS) * (3 + len(MATRICES) + 1 + 2)
+    assert stub.max_in_flight == 3, f"{stub.max_in_flight} requests in flight"
+    print(f"   ✓ {stub.requests} requests, never more than 3 at once")
+
+def test_npz_download_and_errors():
+    print("\n3. Testing the .npz format and failed files...")
+    stub = StubbedRequests(delay=0)
+
+    def failing(method, path, body=None):
+        if path.endswith('/matrix/U'):
+            return 404, 'Not Found', b''
+        return stub(method, path, body)
+
+    with tempfile.TemporaryDirectory() as target_dir:
+        failures = run_download(target_dir, failing, models=['M2'], matrix_format='npz', dtype=np.float32)
+        model_dir = os.path.join(target_dir, 'M2')
+        assert failures == ['matrix/U'], failures
+        assert not os.path.exists(os.path.join(target_dir, 'M1')), "Only the selected model"
+        with np.load(os.path.join(model_dir, "matrices.npz")) as data:
+            assert set(data.files) == set(MATRICES) - {'U'}
+        L = load_matrix(model_dir, 'L')
+        assert L.dtype == np.float32 and np.allclose(L, model_matrix('M2', 'L'))
+    print("   ✓ One .npz per model; a 404 is reported without stopping the download")
+
+if __name__ == "__main__":
+    try:
+        test_matrix_round_trip()
+        test_download_respects_concurrency_limit()
+        test_npz_download_and_errors()
+        print("\n✅ All matrix download tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,69 @@
+"""
+Test script for the vectorized category GWP statistics engine.
+"""
+import sys
+
+import numpy as np
+
+from catalog import parse_quantity
+from gwp_stats import build_gwp_table, compute_category_stats, compare_with_api, PERCENTILES
+
+def sample_epds():
+    rng = np.random.default_rng(7)
+    epds = []
+    for i in range(400):
+        category = i % 4
+        epds.append({
+            'material_id': f'm{i}',
+            'category': {'id': f'cat{category}', 'display_name': f'Category {category}', 'pct50_gwp': '100 kgCO2e'},
+            'plant_or_group': {'country': 'US', 'admin_district': 'GA' if i % 2 else 'CA'},
+            'gwp': f'{rng.uniform(10, 500):.3f} kgCO2e',
+            'gwp_per_kg': None if i % 10 == 0 else float(rng.uniform(0, 2)),
+            'gwp_per_category_declared_unit': f'{rng.normal(100 * (category + 1), 10):.3f} kgCO2e',
+            'gwp_z': '0.5',
+        })
+    return epds
+
+def test_parse_quantity():
+    print("\n1. Testing quantity parsing...")
+    assert parse_quantity("53.38 kgCO2e") == 53.38
+    assert parse_quantity("-1.5e2 kgCO2e") == -150.0
+    assert parse_quantity(7) == 7.0
+    assert parse_quantity(None) is None and parse_quantity("n/a") is None
+    print("   ✓ Quantities parsed")
+
+def test_grouped_stats_match_numpy():
+    print("\n2. Comparing batched group stats with numpy per group...")
+    table = build_gwp_table(sample_epds())
+    result = compute_category_stats(table, by='state')
+    group_ids = result['group_ids']
+    for metric in ('gwp', 'gwp_per_kg'):
+        stats = result['metrics'][metric]
+        for group in range(len(result['keys'])):
+            values = table[metric][group_ids == group]
+            values = values[~np.isnan(values)]
+            assert stats['count'][group] == len(values)
+            assert np.allclose(stats['pct'][group], np.percentile(values, PERCENTILES))
+            assert np.isclose(stats['mean'][group], values.mean())
+            assert np.isclose(stats['std'][group], values.std())
+    z = result['metrics']['gwp']['z']
+    assert np.allclose([z[group_ids == g].mean() for g in range(len(result['keys']))], 0)
+    print(f"   ✓ {len(result['keys'])} groups match numpy.percentile")
+
+def test_compare_with_api():
+    print("\n3. Testing comparison with API percentiles...")
+    rows = compare_with_api(build_gwp_table(sample_epds()))
+    assert len(rows) == 4
+    assert all(row['api_pct'][4] == 100 for row in rows)
+    assert rows[0]['max_abs_pct_diff'] is not None
+    print("   ✓ Comparison rows built")
+
+if __name__ == "__main__":
+    try:
+        test_parse_quantity()
+        test_grouped_stats_match_numpy()
+        test_compare_with_api()
+        print("\n✅ All GWP stats tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,90 @@
+"""
+Test script for the API request metrics and their Prometheus/JSON exports.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_metrics import Histogram, HttpMetrics, format_http_summary
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status = 429 if 'busy' in self.path else 200
+        body = json.dumps([{'material_id': str(i)} for i in range(3)]).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_histogram_quantiles():
+    print("\n1. Testing histogram buckets and quantile estimates...")
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(1, 1), (2, 3), (4, 4), (float('inf'), 5)]
+    assert histogram.quantile(0.5) == 1.75, "Rank 2.5 is 3/4 of the way through the (1, 2] bucket"
+    assert histogram.quantile(1.0) == 4, "Values past the last bucket report its bound"
+    assert Histogram((1,)).quantile(0.5) is None
+    print("   ✓ Cumulative counts and interpolated quantiles")
+
+def test_request_metrics_export():
+    print("\n2. Testing requests are timed, counted and exported...")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    metrics = HttpMetrics()
+    try:
+        for _ in range(2):
+            response = metrics.request('GET', f"{url}/epds", 'epds', 'US-GA', timeout=5)
+            metrics.record_page('epds', 'US-GA', len(response.json()))
+        assert metrics.request('GET', f"{url}/epds/busy", 'epds', 'IN', timeout=5).status_code == 429
+        metrics.record_retry('epds', 'IN', 'rate_limited')
+        metrics.record_token_refresh('epds')
+        try:
+            metrics.request('GET', 'http://127.0.0.1:1/', 'openepd_epds', timeout=1)
+        except requests.exceptions.RequestException:
+            pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with tempfile.TemporaryDirectory() as root:
+        prometheus_path = os.path.join(root, 'http_metrics.prom')
+        json_path = os.path.join(root, 'http_metrics.json')
+        metrics.save(prometheus_path, json_path)
+        with open(prometheus_path) as f:
+            text = f.read()
+        with open(json_path) as f:
+            summary = json.load(f)
+    assert 'epd_pull_requests_total{endpoint="epds",region="US-GA",status="200"} 2' in text
+    assert 'epd_pull_requests_total{endpoint="openepd_epds",region="",status="error"} 1' in text
+    assert 'epd_pull_request_duration_seconds_count{endpoint="epds",region="IN"} 1' in text
+    assert 'epd_pull_retries_total{endpoint="epds",region="IN",reason="rate_limited"} 1' in text
+    assert 'epd_pull_page_records_bucket{endpoint="epds",region="US-GA",le="10"} 2' in text
+
+    epds = summary['endpoints']['epds']
+    assert epds['requests'] == 3 and epds['statuses'] == {'200': 2, '429': 1}
+    assert epds['retries'] == {'rate_limited': 1} and epds['records_per_page'] == 3
+    assert epds['bytes'] > 0 and epds['latency_seconds']['p50'] is not None
+    assert summary['regions']['US-GA']['pages'] == 2 and 'IN' in summary['regions']
+    assert summary['token_refreshes'] == {'epds': 1}
+    assert 'epds' in format_http_summary(summary)
+    print("   ✓ Prometheus text and JSON summary agree with the calls made")
+
+if __name__ == "__main__":
+    try:
+        test_histogram_quantiles()
+        test_request_metrics_export()
+        print("\n✅ All HTTP metrics tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,156 @@
+"""
+Test script for the single-pass output stage (YAML files, state CSV, cement CSV and products.csv).
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+
+from output_stage import OutputSink, OutputStage
+from synthetic_epds import generate_epds
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_product_footprints():
+    spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+    pf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pf)
+    return pf
+
+def tree(root):
+    """Relative path -> bytes of every output file under root"""
+    files = {}
+    for top in ('products-data', 'profile'):
+        for folder, _, names in os.walk(os.path.join(root, top)):
+            for name in names:
+                path = os.path.join(folder, name)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+def in_workdir(root, func):
+    """Run func in root/a/b, so product-footprints.py's ../../products-data lands in root"""
+    workdir = os.path.join(root, 'a', 'b')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        return func()
+    finally:
+        os.chdir(cwd)
+
+class FailingSink(OutputSink):
+    def __init__(self, fail_on_write=None, fail_on_close=False):
+        self.fail_on_write = fail_on_write
+        self.fail_on_close = fail_on_close
+        self.count = 0
+
+    def write(self, epd):
+        self.count += 1
+        if self.count == self.fail_on_write:
+            raise ValueError("sink failed")
+
+    def close(self):
+        if self.fail_on_close:
+            raise OSError("disk full")
+
+def test_single_pass_matches_separate_passes():
+    print("\n1. Testing one pass writes the same files as the separate passes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        single, separate = os.path.join(tmp, 'single'), os.path.join(tmp, 'separate')
+        pf = in_workdir(tmp, load_product_footprints)
+        regions = {state: generate_epds(60, seed=state, regions=[state]) for state in ('US-GA', 'IN')}
+        assert any(pf.is_cement(epd) for epds in regions.values() for epd in epds), "Fixture has cement rows"
+
+        def one_pass():
+            return [pf.write_region_outputs(state, pf.normalize_page(epds)[0]) for state, epds in regions.items()]
+
+        def separate_passes():
+            for state, epds in regions.items():
+                pf.save_json_to_yaml(state, epds)
+                pf.write_products_csv(epds, state)
+                pf.write_epd_to_csv([pf.map_response(epd) for epd in epds], state)
+
+        assert in_workdir(single, one_pass) == [60, 60]
+        in_workdir(separate, separate_passes)
+        single_files, separate_files = tree(single), tree(separate)
+    assert single_files.keys() == separate_files.keys(), set(single_files) ^ set(separate_files)
+    different = [path for path in single_files if single_files[path] != separate_files[path]]
+    assert not different, f"Files differ: {different[:5]}"
+    for path in ('products-data/US-GA.csv', 'products-data/IN.csv', 'products-data/IN/products.csv'):
+        assert path in single_files, f"{path} written"
+    assert any(path.endswith('Cement.csv') for path in single_files)
+    print(f"   ✓ {len(single_files)} files identical (YAML, state CSVs, cement CSVs, products.csv)")
+
+def test_failing_sink_leaves_files_whole():
+    print("\n2. Testing a failing sink does not leave partial files...")
+    epds = generate_epds(30, seed=3, regions=['IN'])
+    with tempfile.TemporaryDirectory() as root:
+        pf = in_workdir(root, load_product_footprints)
+        in_workdir(root, lambda: pf.write_region_outputs('IN', pf.normalize_page(epds)[0]))
+        before = tree(root)
+
+        # A sink raising in write aborts the region: buffered files keep their previous content
+        def fail_in_write():
+            sinks = pf.build_output_sinks('IN') + [FailingSink(fail_on_write=10)]
+            try:
+                with OutputStage(sinks) as stage:
+                    stage.write_many(pf.normalize_epd(dict(epd, name=f"Renamed {i}")) for i, epd in enumerate(epds))
+                assert False, "The sink error should propagate"
+            except ValueError:
+                pass
+        in_workdir(root, fail_in_write)
+        after_write = tree(root)
+        csvs = [path for path in before if path.endswith('.csv')]
+        assert all(after_write[path] == before[path] for path in csvs), "CSVs untouched"
+        for path, data in after_write.items():
+            if path.endswith('.yaml'):
+                assert isinstance(pf.yaml.safe_load(data), dict), f"{path} is a whole YAML file"
+
+        # A sink failing in close (here a bad row) keeps its old file; the other sinks still write theirs
+        def fail_in_close():
+            state_sink = pf.StateCsvSink('IN')
+            stage = OutputStage([state_sink, pf.TariffSink('IN'), FailingSink(fail_on_close=True)])
+            stage.write_many(pf.normalize_epd(epd) for epd in epds[:5])
+            state_sink.rows.append({'Name': 'incomplete row'})
+            try:
+                stage.close()
+                assert False, "The close error should propagate"
+            except KeyError:
+                pass
+        in_workdir(root, fail_in_close)
+        after_close = tree(root)
+    assert after_close['products-data/IN.csv'] == before['products-data/IN.csv'], "No half-written IN.csv"
+    tariff_rows = [row for row in (pf.classify_epd(epd, 'IN') for epd in epds[:5]) if row is not None]
+    products = after_close['products-data/IN/products.csv'].decode().splitlines()
+    assert len(products) == 1 + len(tariff_rows), "products.csv rewritten despite the other failures"
+    assert not [path for path in after_close if path.endswith('.tmp')], "No temporary files left"
+    print("   ✓ No truncated CSV or YAML files, other sinks still closed")
+
+def test_records_are_normalized_once():
+    print("\n3. Testing normalized records are written without a second strip and intern pass...")
+    epds = generate_epds(40, seed=4, regions=['US-GA'])
+    with tempfile.TemporaryDirectory() as root:
+        pf = in_workdir(root, load_product_footprints)
+        records, _ = pf.normalize_page(epds)
+        calls = []
+        remove_null_values = pf.remove_null_values
+        pf.remove_null_values = lambda data: calls.append(1) or remove_null_values(data)
+        try:
+            assert in_workdir(root, lambda: pf.write_region_outputs('US-GA', records)) == 40
+        finally:
+            pf.remove_null_values = remove_null_values
+    assert not calls, "No deep copy of already normalized records"
+    assert sum(pf.category_table.counts.values()) == 40, "Each EPD counted once per dimension"
+    assert sum(pf.plant_table.counts.values()) == 40
+    print("   ✓ 40 records written as given, counted once")
+
+if __name__ == "__main__":
+    try:
+        test_single_pass_matches_separate_passes()
+        test_failing_sink_leaves_files_whole()
+        test_records_are_normalized_once()
+        print("\n✅ All output stage tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,136 @@
+"""
+Test script for the raw page archive used by `product-footprints.py rebuild`.
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from page_archive import PageArchive, list_runs, prune_runs, read_page, run_pages
+from synthetic_epds import generate_epds
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+REGIONS = ('US-GA', 'IN')
+
+def load_product_footprints():
+    spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+    pf = importlib.util.module_from_spec(spec)
+    # Registered so rebuild_region can be pickled for the worker processes
+    sys.modules[spec.name] = pf
+    spec.loader.exec_module(pf)
+    pf.WRITE_PUBLISH_CHANGES = False
+    return pf
+
+def tree(root):
+    """Relative path -> bytes of every output file under root"""
+    files = {}
+    for top in ('products-data', 'profile'):
+        for folder, _, names in os.walk(os.path.join(root, top)):
+            for name in names:
+                path = os.path.join(folder, name)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+def in_workdir(root, func):
+    """Run func in root/a/b, so product-footprints.py's ../../products-data lands in root"""
+    workdir = os.path.join(root, 'a', 'b')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        return func()
+    finally:
+        os.chdir(cwd)
+
+def test_pages_round_trip():
+    print("\n1. Testing archived pages read back in page order...")
+    with tempfile.TemporaryDirectory() as root:
+        archive = PageArchive(root, run_id='20260101T000000Z')
+        archive.write_page('US-GA', 2, [{'material_id': 'b'}])
+        archive.write_page('US-GA', 1, [{'material_id': 'a', 'gwp': '1 kgCO2e'}])
+        archive.write_page('IN', 1, [{'material_id': 'c'}])
+        archive.write_page('IN', 1, [{'material_id': 'c2'}])  # retried page replaces the first
+        assert list_runs(root) == ['20260101T000000Z']
+        pages = run_pages(root, '20260101T000000Z')
+        assert sorted(pages) == ['IN', 'US-GA']
+        records = [r['material_id'] for path in pages['US-GA'] for r in read_page(path)]
+        assert records == ['a', 'b'], "Pages should come back in page order"
+        assert [r['material_id'] for r in read_page(pages['IN'][0])] == ['c2']
+        assert archive.pages == 4 and archive.records == 4
+    print("   ✓ Records, regions and pages preserved")
+
+def test_prune_keeps_newest_runs():
+    print("\n2. Testing old runs are pruned...")
+    with tempfile.TemporaryDirectory() as root:
+        runs = [f"2026010{day}T000000Z" for day in range(1, 6)]
+        for run in runs:
+            PageArchive(root, run_id=run).write_page('IN', 1, [{'material_id': run}])
+        os.makedirs(os.path.join(root, 'not-a-run'))
+        assert prune_runs(root, 2, protect={runs[0]}) == runs[1:3]
+        assert list_runs(root) == [runs[0]] + runs[3:], "Protected and newest runs kept"
+        assert os.path.isdir(os.path.join(root, 'not-a-run')), "Only run directories are removed"
+        assert prune_runs(root, 5) == [] and prune_runs(root, 0) == [runs[0]] + runs[3:]
+        assert list_runs(root) == []
+    print("   ✓ Newest runs and protected runs kept")
+
+def test_rebuild_matches_direct_write():
+    print("\n3. Testing rebuild from archived pages matches writing the records directly...")
+    pages = {state: [generate_epds(25, seed=f"{state}-{page}", regions=[state]) for page in (1, 2)]
+             for state in REGIONS}
+    pages['IN'][1].append({'material_id': 'broken', 'name': 'No category'})
+    with tempfile.TemporaryDirectory() as tmp:
+        rebuilt, direct = os.path.join(tmp, 'rebuilt'), os.path.join(tmp, 'direct')
+
+        def rebuild():
+            pf = load_product_footprints()
+            archive = PageArchive(pf.ARCHIVE_DIR, run_id='20260101T000000Z')
+            for state, state_pages in pages.items():
+                for page, records in enumerate(state_pages, start=1):
+                    archive.write_page(state, page, records)
+            # A stale cement CSV from an earlier layout must not be appended to
+            os.makedirs("../../products-data/US-GA", exist_ok=True)
+            with open("../../products-data/US-GA/Cement.csv", 'w') as f:
+                f.write("stale,row\n")
+            assert pf.rebuild_pages(run_pages(pf.ARCHIVE_DIR, archive.run_id), workers=2)
+            with open(pf.QUARANTINE_FILE) as f:
+                return pf, [json.loads(line) for line in f]
+
+        def write_directly():
+            pf = load_product_footprints()
+            for state, state_pages in pages.items():
+                records = [epd for page in state_pages for epd in pf.normalize_page(page)[0]]
+                pf.write_region_outputs(state, records)
+            pf.save_gwp_sketches()
+            pf.save_dimension_tables()
+            return pf
+
+        pf_rebuilt, quarantined = in_workdir(rebuilt, rebuild)
+        pf_direct = in_workdir(direct, write_directly)
+        rebuilt_files, direct_files = tree(rebuilt), tree(direct)
+    assert rebuilt_files.keys() == direct_files.keys(), set(rebuilt_files) ^ set(direct_files)
+    # The percentile summary is stamped with its write time
+    for files in (rebuilt_files, direct_files):
+        summary = json.loads(files['products-data/gwp_percentiles.json'])
+        summary.pop('updated')
+        files['products-data/gwp_percentiles.json'] = json.dumps(summary).encode()
+    different = [path for path in rebuilt_files if rebuilt_files[path] != direct_files[path]]
+    assert not different, f"Files differ: {different[:5]}"
+    assert b'stale' not in rebuilt_files['products-data/US-GA/Cement.csv'], "Cement.csv reset"
+    for path in ('products-data/gwp_sketches.json', 'products-data/plants.yaml', 'products-data/categories.yaml'):
+        assert path in rebuilt_files, f"{path} merged from the workers"
+    assert pf_rebuilt.plant_table.counts == pf_direct.plant_table.counts, "Table counts merged"
+    assert [(entry['region'], entry['page'], entry['record']['material_id']) for entry in quarantined] == \
+        [('IN', 2, 'broken')], quarantined
+    print(f"   ✓ {len(rebuilt_files)} files identical; sketches, tables and quarantine merged from 2 processes")
+
+if __name__ == "__main__":
+    try:
+        test_pages_round_trip()
+        test_prune_keeps_newest_runs()
+        test_rebuild_matches_direct_write()
+        print("\n✅ All page archive tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
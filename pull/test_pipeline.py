@@ -0,0 +1,121 @@
+"""
+Test script for the staged pipeline runtime used by product-footprints.py.
+"""
+import csv
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from pipeline import Pipeline, Stage, bottleneck
+from synthetic_epds import generate_epds
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_items_flow_through_all_stages():
+    print("\n1. Testing items flow through every stage...")
+    results = []
+    lock = threading.Lock()
+
+    def split(n):
+        return [n, n + 100]
+
+    def collect(n):
+        with lock:
+            results.append(n)
+
+    stats = Pipeline([
+        Stage('split', split, workers=2),
+        Stage('double', lambda n: [n * 2], workers=3),
+        Stage('collect', collect),
+    ]).run(range(10))
+
+    assert sorted(results) == sorted([n * 2 for i in range(10) for n in (i, i + 100)])
+    assert [s['items_in'] for s in stats] == [10, 20, 20]
+    print("   ✓ All items processed")
+
+def test_backpressure_bounds_queues():
+    print("\n2. Testing bounded queues apply backpressure...")
+
+    def produce(n):
+        for i in range(50):
+            yield i
+
+    def slow(item):
+        time.sleep(0.001)
+
+    stats = Pipeline([Stage('produce', produce), Stage('slow', slow, queue_size=4)]).run([1])
+    assert stats[1]['max_queue_depth'] <= 4, "Queue should never exceed its capacity"
+    assert stats[0]['blocked_seconds'] > 0, "Producer should wait on the full queue"
+    assert bottleneck(stats) == 'slow'
+    print("   ✓ Queue depth stayed bounded")
+
+def test_stage_errors_do_not_stop_pipeline():
+    print("\n3. Testing a failing item does not stop the pipeline...")
+
+    def fail_on_three(n):
+        if n == 3:
+            raise ValueError("bad item")
+        return [n]
+
+    stats = Pipeline([Stage('check', fail_on_three), Stage('sink', lambda n: None)]).run(range(5))
+    assert stats[0]['errors'] == 1
+    assert stats[1]['items_in'] == 4
+    print("   ✓ Errors counted, remaining items processed")
+
+def test_failed_pages_still_close_region():
+    print("\n4. Testing a region is written when normalize or enrich fails on a page...")
+    pages = [generate_epds(10, seed=page, regions=['US-GA']) for page in range(4)]
+    for epd in (epd for page in pages for epd in page):
+        epd['category']['openepd_name'] = 'ConstructionMaterials >> Masonry >> Brick'  # all rows in <state>.csv
+    failing = {id(pages[1][0])}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        workdir = os.path.join(root, 'a', 'b')
+        os.makedirs(workdir)
+        os.chdir(workdir)
+        try:
+            spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+            pf = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(pf)
+            normalize_page = pf.normalize_page
+
+            def fetch_epd_pages(state, auth_state):
+                for page, records in enumerate(pages, 1):
+                    yield page, len(pages), records
+
+            def flaky_normalize(records, count=True):
+                if id(records[0]) in failing:
+                    raise OSError("quarantine disk full")
+                return normalize_page(records, count)
+
+            def flaky_enrich(epd, authorization=None):
+                if epd['material_id'] == pages[2][0]['material_id']:
+                    raise ValueError("openEPD response")
+                return epd, 0, 0
+
+            pf.fetch_epd_pages = fetch_epd_pages
+            pf.normalize_page = flaky_normalize
+            pf.enrich_with_openepd = flaky_enrich
+            pf.ENABLE_OPENEPD_FETCH = True
+            stats = pf.run_pipeline(['US-GA'], 'Bearer test')
+            with open(os.path.join(root, 'products-data', 'US-GA.csv'), newline='') as f:
+                rows = list(csv.DictReader(f))
+        finally:
+            os.chdir(cwd)
+    assert {s['stage']: s['errors'] for s in stats}['write'] == 0
+    assert len(rows) == 20, "Pages 1 and 4 written, the failed pages 2 and 3 dropped"
+    print("   ✓ Region closed with the pages that survived")
+
+if __name__ == "__main__":
+    try:
+        test_items_flow_through_all_stages()
+        test_backpressure_bounds_queues()
+        test_stage_errors_do_not_stop_pipeline()
+        test_failed_pages_still_close_region()
+        print("\n✅ All pipeline tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,58 @@
+"""
+Test script for the plant spatial index (radius and k-nearest queries).
+"""
+import sys
+
+import numpy as np
+
+from plant_index import PlantIndex, haversine_km
+
+def build_index(n=5000, seed=11):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-85, 85, n)
+    lons = rng.uniform(-180, 180, n)
+    index = PlantIndex()
+    for i in range(n):
+        index.upsert({
+            'material_id': f'm{i}', 'category_id': f'c{i % 4}', 'category': f'Category {i % 4}',
+            'latitude': lats[i], 'longitude': lons[i],
+        })
+    return index, lats, lons
+
+def test_haversine():
+    print("\n1. Testing haversine distance...")
+    # Atlanta to Chicago is about 944 km
+    assert abs(haversine_km(33.749, -84.388, 41.878, -87.630) - 944) < 5
+    print("   ✓ Distance matches known value")
+
+def test_radius_matches_brute_force():
+    print("\n2. Comparing radius queries with a brute-force scan...")
+    index, lats, lons = build_index()
+    categories = np.arange(len(lats)) % 4
+    for lat, lon in ((33.7, -84.4), (0.0, 179.8), (84.0, 20.0)):
+        distances = haversine_km(lat, lon, lats, lons)
+        expected = np.sum((distances <= 1500) & (categories == 2))
+        results = index.within(lat, lon, 1500, category='Category 2')
+        assert len(results) == expected, (lat, lon)
+        assert all(a[0] <= b[0] for a, b in zip(results, results[1:])), "Results should be nearest first"
+    print("   ✓ Radius queries exact, including across the antimeridian")
+
+def test_nearest_and_remove():
+    print("\n3. Testing k-nearest and incremental removal...")
+    index, lats, lons = build_index()
+    distances = haversine_km(10.0, 10.0, lats, lons)
+    expected = [f'm{i}' for i in np.argsort(distances)[:5]]
+    assert [r['material_id'] for _, r in index.nearest(10.0, 10.0, k=5)] == expected
+    index.remove(expected[0])
+    assert [r['material_id'] for _, r in index.nearest(10.0, 10.0, k=1)] == [expected[1]]
+    print("   ✓ k-nearest exact and removals applied")
+
+if __name__ == "__main__":
+    try:
+        test_haversine()
+        test_radius_matches_brute_force()
+        test_nearest_and_remove()
+        print("\n✅ All plant index tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""
+Test script for the local product API (routing, ETags, gzip and conditional GETs).
+"""
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+import yaml
+
+from dimensions import DimensionTable
+from product_api import ProductAPI, accepts_gzip, make_server
+from query_catalog import CatalogIndex, catalog_record
+
+def write_catalog(root):
+    paths = []
+    for i, (state, gwp) in enumerate([('GA', 300), ('GA', 250), ('CA', 410)]):
+        epd = {
+            'material_id': f'mat{i}', 'name': f'Mix {i}', 'gwp': f'{gwp} kgCO2e', 'declared_unit': '1 m3',
+            'description': 'Ready mix concrete ' * 40,
+            'category': {'id': 'rmc', 'display_name': 'Ready Mix'},
+            'plant_or_group': {'country': 'US', 'admin_district': state, 'postal_code': '30301'},
+        }
+        path = os.path.join(root, 'US', state, f'mat{i}.yaml')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            yaml.safe_dump(epd, f)
+        paths.append((path, epd))
+    index_file = os.path.join(root, 'catalog_index.npz')
+    CatalogIndex.from_records(catalog_record(epd, path) for path, epd in paths).save(index_file)
+    return index_file
+
+def start_server(root):
+    api = ProductAPI(write_catalog(root), root)
+    server = make_server(api, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def fetch(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+def test_routes():
+    print("\n1. Testing product, listing and region routes...")
+    with tempfile.TemporaryDirectory() as root:
+        server, base = start_server(root)
+        try:
+            status, _, body = fetch(f"{base}/products/mat1")
+            assert status == 200 and json.loads(body)['name'] == 'Mix 1'
+            status, _, body = fetch(f"{base}/products?state=US-GA&sort=gwp&k=1")
+            assert [p['material_id'] for p in json.loads(body)['products']] == ['mat1']
+            status, _, body = fetch(f"{base}/regions/US-GA")
+            assert json.loads(body)['count'] == 2
+            status, _, body = fetch(f"{base}/categories")
+            assert json.loads(body) == [{'id': 'rmc', 'name': 'Ready Mix', 'count': 3}]
+            status, _, body = fetch(f"{base}/products-data/US/CA/mat2.yaml")
+            assert status == 200 and yaml.safe_load(body)['material_id'] == 'mat2'
+            assert fetch(f"{base}/products-data/../catalog_index.npz")[0] == 404
+            assert fetch(f"{base}/products/missing")[0] == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+    print("   ✓ Routes return the expected records")
+
+def test_etag_and_gzip():
+    print("\n2. Testing ETags, conditional GETs and gzip...")
+    with tempfile.TemporaryDirectory() as root:
+        server, base = start_server(root)
+        try:
+            status, headers, body = fetch(f"{base}/products/mat0")
+            assert headers['ETag'].startswith('"') and 'max-age' in headers['Cache-Control']
+            status, _, _ = fetch(f"{base}/products/mat0", {'If-None-Match': headers['ETag']})
+            assert status == 304, "Matching ETag should return 304"
+            status, gz_headers, gz_body = fetch(f"{base}/products/mat0", {'Accept-Encoding': 'gzip'})
+            assert gz_headers.get('Content-Encoding') == 'gzip'
+            assert gzip.decompress(gz_body) == body
+            assert gz_headers['ETag'] != headers['ETag'], "Each content-coding has its own strong ETag"
+            status, _, _ = fetch(f"{base}/products/mat0", {'Accept-Encoding': 'gzip', 'If-None-Match': gz_headers['ETag']})
+            assert status == 304
+            status, other_headers, other_body = fetch(f"{base}/products/mat0",
+                                                      {'Accept-Encoding': 'gzip', 'If-None-Match': headers['ETag']})
+            assert status == 200 and gzip.decompress(other_body) == body, "Identity ETag does not validate gzip"
+            status, _, _ = fetch(f"{base}/products/mat0", {'If-None-Match': gz_headers['ETag']})
+            assert status == 200, "gzip ETag does not validate the identity body"
+            status, q0_headers, q0_body = fetch(f"{base}/products/mat0", {'Accept-Encoding': 'gzip;q=0, identity'})
+            assert 'Content-Encoding' not in q0_headers and q0_body == body and q0_headers['ETag'] == headers['ETag']
+            assert server.RequestHandlerClass.api.cache.hits >= 2, "Repeat requests should hit the LRU"
+        finally:
+            server.shutdown()
+            server.server_close()
+    cases = {'gzip': True, 'GZIP;q=0.5, br': True, 'br, *': True, 'x-gzip': True, 'gzip;q=0': False,
+             'gzip; q=0.0': False, '*;q=0': False, 'identity': False, '': False, None: False}
+    for header, expected in cases.items():
+        assert accepts_gzip(header) == expected, f"Accept-Encoding: {header!r}"
+    print("   ✓ 304 on matching ETag, separate gzip ETag, q-values honoured")
+
+def test_bad_requests_and_files():
+    print("\n3. Testing out-of-range k and corrupt files return JSON errors...")
+    with tempfile.TemporaryDirectory() as root:
+        server, base = start_server(root)
+        try:
+            for k in ('0', '-1', '1001'):
+                status, _, body = fetch(f"{base}/products?sort=gwp&k={k}")
+                assert status == 400 and 'k must be between' in json.loads(body)['error'], f"k={k} is rejected"
+            status, _, body = fetch(f"{base}/products?k=1000")
+            assert status == 200 and json.loads(body)['count'] == 3
+            with open(os.path.join(root, 'US', 'CA', 'mat2.yaml'), 'w') as f:
+                f.write("material_id: mat2\nname: [unclosed\n  gwp: {")
+            status, headers, body = fetch(f"{base}/products/mat2")
+            assert status == 500 and headers['Content-Type'].startswith('application/json')
+            assert 'unreadable' in json.loads(body)['error']
+        finally:
+            server.shutdown()
+            server.server_close()
+    print("   ✓ 400 for k outside 1..1000, 500 JSON for a corrupt YAML file")
+
+def test_reference_layout_is_expanded():
+    print("\n4. Testing products saved with the reference layout are served in full...")
+    category = {'id': 'rmc', 'display_name': 'Ready Mix', 'openepd_name': 'ReadyMix', 'default_distance': '100 km'}
+    plant = {'id': 'p1', 'name': 'Plant 1', 'country': 'US', 'admin_district': 'GA', 'postal_code': '30301'}
+    categories, plants = DimensionTable('categories'), DimensionTable('plants')
+    categories.intern(category)
+    plants.intern(plant)
+    with tempfile.TemporaryDirectory() as root:
+        categories.save(os.path.join(root, 'categories.yaml'))
+        plants.save(os.path.join(root, 'plants.yaml'))
+        epd = {'material_id': 'mat0', 'name': 'Mix 0', 'gwp': '300 kgCO2e',
+               'category': categories.reference(category, ('id', 'display_name')),
+               'plant_or_group': plants.reference(plant, ('id', 'name'))}
+        path = os.path.join(root, 'US', 'Ready_Mix', 'mat0.yaml')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            yaml.safe_dump(epd, f)
+        index_file = os.path.join(root, 'catalog_index.npz')
+        CatalogIndex.from_records([catalog_record(dict(epd, category=category, plant_or_group=plant), path)]).save(index_file)
+        api = ProductAPI(index_file, root)
+        response = api.get('/products/mat0')
+        assert response.status == 200
+        served = json.loads(response.body)
+        assert served['category'] == category and served['plant_or_group'] == plant, "No $ref stubs"
+        listed = json.loads(api.get('/products?category=rmc').body)['products'][0]
+        assert listed['category'] == served['category']['display_name'] and listed['state'] == 'US-GA'
+    print("   ✓ $ref stubs replaced with the categories.yaml and plants.yaml rows")
+
+if __name__ == "__main__":
+    try:
+        test_routes()
+        test_etag_and_gzip()
+        test_bad_requests_and_files()
+        test_reference_layout_is_expanded()
+        print("\n✅ All product API tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,62 @@
+"""
+Test script for the --profile report (per-stage cProfile, stack samples, memory).
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from profiling import Profiler, format_profile_summary
+
+def busy_normalize(records):
+    return [{key: str(value) * 20 for key, value in record.items()} for record in records]
+
+def busy_fetch(region):
+    for page in range(3):
+        yield [{'material_id': f"{region}-{page}-{i}", 'gwp': i} for i in range(500)]
+
+def test_profile_report():
+    print("\n1. Testing stage profiles, stacks and memory are written...")
+    with tempfile.TemporaryDirectory() as root:
+        profiler = Profiler(root, sample_interval=0.002)
+        fetch = profiler.wrap('fetch', busy_fetch)
+        normalize = profiler.wrap('normalize', busy_normalize)
+
+        def worker(region):
+            for page in fetch(region):
+                normalize(page)
+                profiler.sample_region(region)
+
+        threads = [threading.Thread(target=worker, args=(region,)) for region in ('US-GA', 'IN')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report_dir = profiler.write_report()
+
+        files = set(os.listdir(report_dir))
+        assert {'stages.txt', 'fetch.pstats', 'normalize.pstats', 'allocations.txt',
+                'stacks.collapsed', 'summary.json'} <= files
+        with open(os.path.join(report_dir, 'summary.json')) as f:
+            summary = json.load(f)
+        assert summary['stages']['fetch']['items'] == 2 and summary['stages']['normalize']['items'] == 6
+        assert any('busy_normalize' in row[0] for row in summary['stages']['normalize']['top_cumulative'])
+        assert summary['regions']['US-GA']['samples'] == 3 and summary['regions']['IN']['peak_rss'] > 0
+        with open(os.path.join(report_dir, 'stacks.collapsed')) as f:
+            stacks = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+        assert stacks and all(stack.split(';')[0] in ('fetch', 'normalize') and int(count) > 0
+                              for stack, count in stacks)
+        assert not any('_run (profiling.py' in stack for stack, _ in stacks), "Stacks start at the stage function"
+        with open(os.path.join(report_dir, 'allocations.txt')) as f:
+            assert 'test_profiling.py' in f.read()
+        assert 'normalize' in format_profile_summary(report_dir)
+    print("   ✓ Report folder complete")
+
+if __name__ == "__main__":
+    try:
+        test_profile_report()
+        print("\n✅ All profiling tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
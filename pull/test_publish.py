@@ -0,0 +1,60 @@
+"""
+Test script for the products-data publish manifest and change set staging.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from publish import PUBLISH_MANIFEST_FILE, load_manifest, stage_changes, write_changes
+
+def write(root, relative, text):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def staged(target):
+    result = subprocess.run(['git', '-C', target, 'diff', '--cached', '--name-status'],
+                            capture_output=True, text=True, check=True)
+    return sorted(tuple(line.split('\t')) for line in result.stdout.splitlines())
+
+def test_change_set_staging():
+    print("\n1. Testing only added, modified and deleted files are staged...")
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, 'out')
+        target = os.path.join(root, 'products-data')
+        changes_file = os.path.join(root, 'publish-changes.json')
+        git = ['git', '-C', target, '-c', 'user.name=t', '-c', 'user.email=t@t']
+        os.makedirs(target)
+        subprocess.run(['git', 'init', '-q', target], check=True)
+        write(source, 'US/Cement/a.yaml', 'gwp: 1\n')
+        write(source, 'US/Cement/b.yaml', 'gwp: 2\n')
+        write(source, 'US-GA.csv', 'Name\n')
+
+        changes = write_changes(source, changes_file)
+        assert sorted(changes['added']) == ['US-GA.csv', 'US/Cement/a.yaml', 'US/Cement/b.yaml']
+        stage_changes(target, changes_file)
+        assert len(staged(target)) == 4, "Three files plus the manifest"
+        subprocess.run(git + ['commit', '-q', '-m', 'first'], check=True)
+
+        # Rewritten with identical content, changed, removed and new
+        write(source, 'US/Cement/a.yaml', 'gwp: 1\n')
+        write(source, 'US/Cement/b.yaml', 'gwp: 3\n')
+        os.remove(os.path.join(source, 'US-GA.csv'))
+        write(source, 'IN/products.csv', 'region1\n')
+        changes = write_changes(source, changes_file)
+        assert list(changes['modified']) == ['US/Cement/b.yaml'] and changes['deleted'] == ['US-GA.csv']
+        stage_changes(target, changes_file)
+        assert staged(target) == [('A', 'IN/products.csv'), ('D', 'US-GA.csv'),
+                                  ('M', 'US/Cement/b.yaml'), ('M', PUBLISH_MANIFEST_FILE)]
+        assert 'US-GA.csv' not in load_manifest(os.path.join(source, PUBLISH_MANIFEST_FILE))['files']
+    print("   ✓ Change set staged, unchanged rewrites left out")
+
+if __name__ == "__main__":
+    try:
+        test_change_set_staging()
+        print("\n✅ All publish tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,56 @@
+"""
+Test script for the simulated EC3 API and the end-to-end pull benchmark.
+"""
+import sys
+
+import requests
+
+from pull_benchmark import run_benchmark
+from simulated_api import TOKEN, LatencyModel, SimulatedApi
+
+def test_simulated_api():
+    print("\n1. Testing the simulated API pages, auth and 429s...")
+    with SimulatedApi({'US-GA': 2}, page_records=5) as api:
+        token = requests.post(f"{api.url}/rest-auth/login", json={}, timeout=5).json()['key']
+        assert token == TOKEN
+        headers = {'Authorization': f"Bearer {token}"}
+        response = requests.get(f"{api.url}/epds", headers=headers, timeout=5,
+                                params={'plant_geography': 'US-GA', 'page_number': 2})
+        assert response.status_code == 200 and response.headers['X-Total-Pages'] == '2'
+        assert len(response.json()) == 5 and response.json()[0]['plant_or_group']['country'] == 'US'
+        empty = requests.get(f"{api.url}/epds", headers=headers, params={'plant_geography': 'IN'}, timeout=5)
+        assert empty.json() == [] and empty.headers['X-Total-Pages'] == '0'
+        assert requests.get(f"{api.url}/epds", timeout=5).status_code == 401
+    with SimulatedApi({'US-GA': 1}, page_records=1, rate_limit_rate=1.0) as api:
+        assert requests.get(f"{api.url}/epds", headers=headers, timeout=5).status_code == 429
+        assert api.counts['rate_limited'] == 1
+    print("   ✓ Pages, empty regions, 401 and 429 served")
+
+def test_latency_model():
+    print("\n2. Testing latency distributions...")
+    assert LatencyModel('fixed', 0.2).sample() == 0.2
+    uniform = [LatencyModel('uniform', 0.2, 0.5, seed=1).sample() for _ in range(100)]
+    assert all(0.1 <= value <= 0.3 for value in uniform)
+    lognormal = LatencyModel('lognormal', 0.2, 1.0, seed=1)
+    assert max(lognormal.sample() for _ in range(200)) > 0.4, "Long right tail"
+    print("   ✓ fixed, uniform and lognormal")
+
+def test_end_to_end_pull():
+    print("\n3. Testing a full pull against the simulated API...")
+    result = run_benchmark(['US-GA', 'IN'], pages=2, page_records=20)
+    assert result['exit_code'] == 0
+    assert result['epds'] == 80 and result['api']['records_served'] == 80
+    assert {'fetch', 'write'} <= set(result['stages']) and result['stages']['write']['items'] >= 4
+    assert result['files'] > 80 and result['peak_rss'] > 0
+    assert result['api']['unauthorized'] == 0
+    print(f"   ✓ 80 EPDs pulled and written in {result['wall_seconds']:.1f} s")
+
+if __name__ == "__main__":
+    try:
+        test_simulated_api()
+        test_latency_model()
+        test_end_to_end_pull()
+        print("\n✅ All pull benchmark tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
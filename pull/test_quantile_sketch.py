@@ -0,0 +1,66 @@
+"""
+Test script for the streaming t-digest quantile sketches.
+"""
+import random
+import sys
+
+from quantile_sketch import TDigest, SketchRegistry
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def test_quantiles_close_to_exact():
+    print("\n1. Comparing sketch percentiles with exact values...")
+    rng = random.Random(3)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+    for q in (0.1, 0.5, 0.9):
+        exact = exact_quantile(values, q)
+        assert abs(digest.quantile(q) - exact) / exact < 0.02, f"pct{int(q * 100)} too far from exact"
+    assert len(digest.to_dict()['centroids']) < 1000, "Sketch should stay small"
+    print("   ✓ Percentiles within 2% of exact")
+
+def test_merge_and_serialize():
+    print("\n2. Testing merge across sketches and JSON round trip...")
+    rng = random.Random(5)
+    values = [rng.uniform(0, 100) for _ in range(6000)]
+    parts = [TDigest() for _ in range(3)]
+    for i, value in enumerate(values):
+        parts[i % 3].add(value)
+    merged = TDigest()
+    for part in parts:
+        merged.merge(TDigest.from_dict(part.to_dict()))
+    assert merged.count == len(values)
+    assert abs(merged.quantile(0.5) - exact_quantile(values, 0.5)) < 2
+    print("   ✓ Merged sketch matches the full data")
+
+def test_registry_replaces_repulled_region():
+    print("\n3. Testing registry rollups and region replacement...")
+    registry = SketchRegistry()
+    for value in range(100):
+        registry.add('US-GA', 'cat', value, 'Category', 'kgCO2e')
+        registry.add('US-CA', 'cat', value + 100, 'Category', 'kgCO2e')
+    restored = SketchRegistry.from_dict(registry.to_dict())
+    restored.reset_region('US-CA')
+    restored.add('US-CA', 'cat', 5)
+    summary = restored.summary('gwp')['categories']['cat']
+    assert summary['all']['count'] == 101
+    assert summary['regions']['US']['count'] == 101
+    assert summary['regions']['US-GA']['count'] == 100
+    print("   ✓ Re-pulled region replaced, US rollup updated")
+
+if __name__ == "__main__":
+    try:
+        test_quantiles_close_to_exact()
+        test_merge_and_serialize()
+        test_registry_replaces_repulled_region()
+        print("\n✅ All quantile sketch tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
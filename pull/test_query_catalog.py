@@ -0,0 +1,112 @@
+"""
+Test script for the catalog index filters and top-k selection against plain sorted() results.
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from query_catalog import CatalogIndex, catalog_record
+from synthetic_epds import generate_epds
+
+def build_records(count=300, seed=5):
+    """Catalog rows with repeated GWP values (ties) and some missing ones"""
+    records = [catalog_record(epd, f"{epd['material_id']}.yaml") for epd in generate_epds(count, seed=seed)]
+    for i, record in enumerate(records):
+        record['gwp'] = None if i % 17 == 0 else float(round(record['gwp'] or 0, -2))
+    return records
+
+def expected_top_k(records, rows, sort, k, descending=False):
+    rows = [row for row in rows if records[row][sort] is not None]
+    return sorted(rows, key=lambda row: records[row][sort], reverse=descending)[:k]
+
+def expected_per_category(records, rows, sort, k, descending=False):
+    result = []
+    for category_id in sorted({records[row]['category_id'] for row in rows}):
+        result.extend(expected_top_k(records, [row for row in rows if records[row]['category_id'] == category_id],
+                                     sort, k, descending))
+    return result
+
+def test_candidates():
+    print("\n1. Testing filters against a plain scan...")
+    records = build_records()
+    index = CatalogIndex.from_records(records)
+    category = records[0]['category']
+    state = records[0]['state']
+    cases = [
+        ({}, lambda r: True),
+        ({'category': category}, lambda r: r['category'] == category),
+        ({'category': category.upper()}, lambda r: r['category'] == category),
+        ({'category': records[0]['category_id']}, lambda r: r['category_id'] == records[0]['category_id']),
+        ({'country': 'us', 'state': state}, lambda r: r['country'] == 'US' and r['state'] == state),
+        ({'category': category, 'ranges': {'gwp': (200, 500)}},
+         lambda r: r['category'] == category and r['gwp'] is not None and 200 <= r['gwp'] <= 500),
+        ({'ranges': {'gwp': (None, 300)}}, lambda r: r['gwp'] is not None and r['gwp'] <= 300),
+        ({'postal_prefix': records[0]['postal_code'][:2]},
+         lambda r: r['postal_code'].startswith(records[0]['postal_code'][:2])),
+        ({'category': 'No Such Category'}, lambda r: False),
+        ({'state': state, 'country': 'ZZ'}, lambda r: False),
+    ]
+    for filters, keep in cases:
+        expected = [i for i, record in enumerate(records) if keep(record)]
+        assert index.candidates(**filters).tolist() == expected, f"candidates({filters})"
+    assert len(index.candidates()) == len(records), "No filters: every row"
+    print(f"   ✓ {len(cases)} filter combinations match a plain scan")
+
+def test_top_k():
+    print("\n2. Testing top-k against sorted()...")
+    records = build_records()
+    index = CatalogIndex.from_records(records)
+    subsets = {
+        'all': np.arange(len(records)),
+        'state': index.candidates(state=records[0]['state']),
+        'empty': index.candidates(category='No Such Category'),
+    }
+    for name, rows in subsets.items():
+        for sort in ('gwp', 'gwp_per_kg'):
+            for descending in (False, True):
+                for k in (1, 5, 40, len(records) + 10):
+                    got = index.top_k(rows, sort, k, descending).tolist()
+                    expected = expected_top_k(records, rows.tolist(), sort, k, descending)
+                    assert got == expected, f"top_k {name} {sort} k={k} descending={descending}"
+    print("   ✓ Both directions, ties in row order, k past the row count, empty input")
+
+def test_top_k_per_category():
+    print("\n3. Testing top-k per category against sorted()...")
+    records = build_records()
+    index = CatalogIndex.from_records(records)
+    for rows in (np.arange(len(records)), index.candidates(country='US'), np.array([], dtype=np.int64)):
+        for descending in (False, True):
+            for k in (1, 3, len(records)):
+                got = index.top_k_per_category(rows, 'gwp', k, descending).tolist()
+                assert got == expected_per_category(records, rows.tolist(), 'gwp', k, descending), \
+                    f"per category k={k} descending={descending}"
+    print("   ✓ Per-category selections match")
+
+def test_query_and_saved_index():
+    print("\n4. Testing queries on a saved and reloaded index...")
+    records = build_records(60, seed=9)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'catalog_index.npz')
+        CatalogIndex.from_records(records).save(path)
+        index = CatalogIndex.load(path)
+    category = records[0]['category']
+    rows = [i for i, record in enumerate(records) if record['category'] == category]
+    result = index.query(category=category, sort='gwp', k=3, descending=True)
+    expected = expected_top_k(records, rows, 'gwp', 3, descending=True)
+    assert [r['material_id'] for r in result] == [records[i]['material_id'] for i in expected]
+    assert len(index.query()) == 60 and len(index.query(k=5)) == 5 and index.query(k=0) == []
+    assert index.query(category='No Such Category', sort='gwp', k=5) == []
+    print("   ✓ Reloaded index answers the same queries")
+
+if __name__ == "__main__":
+    try:
+        test_candidates()
+        test_top_k()
+        test_top_k_per_category()
+        test_query_and_saved_index()
+        print("\n✅ All catalog query tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
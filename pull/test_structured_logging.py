@@ -0,0 +1,97 @@
+"""
+Test script for the background JSON logging setup.
+"""
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from structured_logging import LEVELS_ENV, parse_levels, setup_logging, stop_logging
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Expensive:
+    """Log argument that records whether it was ever formatted"""
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+def test_json_lines_and_levels():
+    print("\n1. Testing JSON lines, context fields and per-module levels...")
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    os.environ[LEVELS_ENV] = "noisy.module=ERROR"
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'output.log')
+            setup_logging(path, {'': 'INFO', 'noisy.module': 'DEBUG'})
+            logger = logging.getLogger('pull.test')
+            logger.info("Fetched page %s", 3, extra={'region': 'US-GA', 'page': 3, 'duration': 0.123456})
+            logger.debug("Body: %s", Expensive())
+            logging.getLogger('noisy.module').warning("dropped by the environment override")
+            try:
+                raise ValueError("bad page")
+            except ValueError:
+                logger.exception("Could not archive page", extra={'region': 'IN', 'stage': 'fetch'})
+            start = time.perf_counter()
+            for i in range(10000):
+                logger.info("Fetched page", extra={'region': 'US-CA', 'page': i})
+            elapsed = time.perf_counter() - start
+            stop_logging()
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+    finally:
+        os.environ.pop(LEVELS_ENV, None)
+        stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+        logging.getLogger('noisy.module').setLevel(logging.NOTSET)
+
+    first = lines[0]
+    assert first['msg'] == "Fetched page 3" and first['level'] == 'INFO' and first['logger'] == 'pull.test'
+    assert first['region'] == 'US-GA' and first['page'] == 3 and first['duration'] == 0.1235
+    assert Expensive.formatted == 0, "Disabled DEBUG arguments must not be formatted"
+    assert not any('dropped' in line['msg'] for line in lines)
+    assert lines[1]['stage'] == 'fetch' and 'ValueError: bad page' in lines[1]['exc']
+    assert len(lines) == 10002, "Every record is written once the listener is stopped"
+    print(f"   ✓ 10000 records queued in {elapsed * 1000:.0f} ms on the calling thread")
+
+def test_parse_levels():
+    print("\n2. Testing level overrides are parsed...")
+    assert parse_levels("root=debug, urllib3=INFO,,bad") == {'': 'DEBUG', 'urllib3': 'INFO'}
+    assert parse_levels(None) == {}
+    print("   ✓ Overrides parsed")
+
+def test_import_leaves_logging_alone():
+    print("\n3. Testing importing product-footprints.py does not configure logging...")
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    with tempfile.TemporaryDirectory() as root:
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        finally:
+            os.chdir(cwd)
+        assert not os.path.exists(os.path.join(root, 'output.log')), "No log file written on import"
+    assert root_logger.handlers == handlers, "Root handlers untouched"
+    print("   ✓ Only the command line entry point sets up the log file")
+
+if __name__ == "__main__":
+    try:
+        test_json_lines_and_levels()
+        test_parse_levels()
+        test_import_leaves_logging_alone()
+        print("\n✅ All structured logging tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
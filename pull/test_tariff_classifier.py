@@ -0,0 +1,57 @@
+"""
+Test script for the keyword tariff classifier used by write_products_csv.
+"""
+import sys
+
+from tariff_classifier import TariffClassifier, DEFAULT_TARIFF_TABLE, classify_epd, get_classifier
+
+def naive_classify(text, table):
+    """Reference implementation: the original per-keyword substring loop."""
+    text = text.lower()
+    for kw, rate in table.items():
+        if kw in text:
+            return rate
+    return None
+
+def test_matches_naive_loop():
+    print("\n1. Comparing single-pass classifier with per-keyword loop...")
+    classifier = TariffClassifier(DEFAULT_TARIFF_TABLE)
+    samples = [
+        "Cabinets Kitchen Cabinets solid wood",
+        "Furniture Upholstered Furniture sofa",
+        "Wood Bathroom Vanities and wardrobes",
+        "Concrete Ready Mix 4000 psi",
+        "Steel tables and office furniture",
+        "",
+    ]
+    for text in samples:
+        assert classifier.classify(text) == naive_classify(text, DEFAULT_TARIFF_TABLE), text
+    print("   ✓ Results match the original loop")
+
+def test_priority_and_overlap():
+    print("\n2. Testing keyword priority with overlapping keywords...")
+    classifier = TariffClassifier({'furniture': 10, 'upholstered furniture': 30, 'kitchen cabinets': 50})
+    assert classifier.match_all("upholstered furniture") == {'furniture', 'upholstered furniture'}
+    assert classifier.classify("upholstered furniture") == 10, "Earlier table entry should win"
+    assert classifier.classify("KITCHEN CABINETS") == 50, "Matching should be case-insensitive"
+    assert classifier.classify("kitchen cabinet") is None
+    print("   ✓ Overlapping keywords resolved by table order")
+
+def test_region_tables():
+    print("\n3. Testing per-region tables...")
+    assert get_classifier('US-GA') is None, "US states are domestic"
+    assert get_classifier('IN') is get_classifier('IN'), "Classifier should be compiled once"
+    epd = {'category': {'id': 'abc', 'display_name': 'Casework'}, 'name': 'Kitchen Cabinets'}
+    assert classify_epd(epd, 'GB') == {'region1': 'GB', 'region2': 'US', 'category_id': 'abc', 'tariff_percent': 50}
+    assert classify_epd(epd, 'US-CA') is None
+    print("   ✓ Region tables applied")
+
+if __name__ == "__main__":
+    try:
+        test_matches_naive_loop()
+        test_priority_and_overlap()
+        test_region_tables()
+        print("\n✅ All tariff classifier tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,89 @@
+"""
+Test script for the transport-adjusted GWP (A4 stage) calculation.
+"""
+import sys
+
+import numpy as np
+
+from plant_index import KM_PER_DEGREE
+from transport_gwp import EMISSION_FACTORS, adjusted_gwp_matrix, product_arrays, transport_mode
+
+def epd(material_id, gwp, mass, distance, mode="truck, unspecified", lat=0.0, lon=0.0):
+    return {
+        'material_id': material_id,
+        'name': f"Product {material_id}",
+        'gwp': gwp,
+        'mass_per_declared_unit': mass,
+        'plant_or_group': {'latitude': lat, 'longitude': lon},
+        'category': {'default_distance': distance, 'default_transport_mode': mode},
+    }
+
+def test_transport_mode():
+    print("\n1. Testing transport mode names map on whole words...")
+    cases = {
+        "truck, unspecified": 'truck',
+        "Trucks": 'truck',
+        "semi-trailer": 'truck',
+        "truck trailer": 'truck',
+        "freight, lorry >32 metric ton, EURO6": 'truck',
+        "road": 'truck',
+        "Rail": 'rail',
+        "freight train": 'rail',
+        "railroad": 'rail',
+        "barge": 'barge',
+        "container ship": 'ship',
+        "transoceanic vessel": 'ship',
+        "airfreight": 'air',
+        "Air freight, long haul": 'air',
+        "air cargo": 'air',
+        "aircraft": 'air',
+        "": 'truck',
+        None: 'truck',
+    }
+    for text, expected in cases.items():
+        assert transport_mode(text) == expected, f"{text!r} -> {transport_mode(text)}, expected {expected}"
+    print(f"   ✓ {len(cases)} mode texts, no substring matches (trailer is not rail)")
+
+def test_readme_example():
+    print("\n2. Testing the README example calculation...")
+    # 500 km due north of the plant
+    products = product_arrays([epd('p1', "468 kgCO2e", "357.43 kg", "1647.968 km")])
+    result = adjusted_gwp_matrix(products, [500 / KM_PER_DEGREE], [0.0])
+    assert np.isclose(result['distance_km'][0, 0], 500)
+    assert np.isclose(result['default_transport_gwp'][0], 1647.968 * 357.43 * 0.062 / 1000)
+    assert round(float(result['default_transport_gwp'][0]), 1) == 36.5
+    assert round(float(result['transport_gwp'][0, 0]), 1) == 11.1
+    assert round(float(result['adjusted_gwp'][0, 0]), 1) == 442.6
+    print("   ✓ 468 + (11.1 - 36.5) = 442.6 kgCO2e")
+
+def test_modes_units_and_missing_values():
+    print("\n3. Testing default modes, units and missing inputs...")
+    products = product_arrays([
+        epd('rail', 100, "1 t", "1000 km", mode="freight train"),
+        epd('trailer', 100, "1000 kg", "1000 km", mode="semi-trailer"),
+        epd('no-mass', 100, None, "1000 km"),
+    ])
+    assert list(products['default_mode']) == ['rail', 'truck', 'truck']
+    result = adjusted_gwp_matrix(products, [0.0], [0.0], mode='barge')
+    default = result['default_transport_gwp']
+    assert np.isclose(default[0], 1000 * EMISSION_FACTORS['rail']) and np.isclose(default[1], 1000 * EMISSION_FACTORS['truck'])
+    assert np.allclose(result['adjusted_gwp'][:2, 0], 100 - default[:2]), "Zero distance removes the default transport"
+    assert np.isnan(result['adjusted_gwp'][2, 0]), "Missing mass gives NaN"
+    overridden = adjusted_gwp_matrix(products, [0.0], [0.0], emission_factors={'rail': 0.0})
+    assert np.isclose(overridden['adjusted_gwp'][0, 0], 100)
+    try:
+        adjusted_gwp_matrix(products, [0.0], [0.0], mode='teleport')
+        assert False, "Unknown mode should raise"
+    except ValueError:
+        pass
+    print("   ✓ Mode factors, overrides, unit conversion and NaN handling")
+
+if __name__ == "__main__":
+    try:
+        test_transport_mode()
+        test_readme_example()
+        test_modes_units_and_missing_values()
+        print("\n✅ All transport GWP tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
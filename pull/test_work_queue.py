@@ -0,0 +1,195 @@
+"""
+Test script for the SQLite lease queue used by the distributed crawl.
+"""
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from page_archive import read_page, run_pages
+from simulated_api import SimulatedApi
+from synthetic_epds import generate_epds
+from work_queue import Heartbeat, LeaseQueue
+
+PULL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def drain(path, owner):
+    """Lease and complete items until none are left (runs in a worker process)"""
+    queue = LeaseQueue(path)
+    keys = []
+    while True:
+        lease = queue.lease(owner, lease_seconds=30)
+        if lease is None:
+            return keys
+        assert queue.complete(lease, {'owner': owner})
+        keys.append(lease.key)
+
+def load_product_footprints(api_url=None):
+    spec = importlib.util.spec_from_file_location("product_footprints", os.path.join(PULL_DIR, "product-footprints.py"))
+    pf = importlib.util.module_from_spec(spec)
+    # Registered so rebuild_region can be pickled for the merge's worker processes
+    sys.modules[spec.name] = pf
+    spec.loader.exec_module(pf)
+    if api_url:
+        pf.epds_url, pf.auth_url = f"{api_url}/epds", f"{api_url}/rest-auth/login"
+    pf.DELAY_SCALE = 0
+    pf.WRITE_PUBLISH_CHANGES = False
+    return pf
+
+def tree(root):
+    """Relative path -> bytes of every output file under root (percentile summary without its timestamp)"""
+    files = {}
+    for top in ('products-data', 'profile'):
+        for folder, _, names in os.walk(os.path.join(root, top)):
+            for name in names:
+                path = os.path.join(folder, name)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    summary = json.loads(files.pop('products-data/gwp_percentiles.json'))
+    summary.pop('updated')
+    files['products-data/gwp_percentiles.json'] = json.dumps(summary).encode()
+    return files
+
+def in_workdir(root, func):
+    """Run func in root/a/b, so product-footprints.py's ../../products-data lands in root"""
+    workdir = os.path.join(root, 'a', 'b')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        return func()
+    finally:
+        os.chdir(cwd)
+
+def test_lease_expiry_and_retries():
+    print("\n1. Testing expired leases are taken over and failures retried...")
+    with tempfile.TemporaryDirectory() as root:
+        queue = LeaseQueue(os.path.join(root, 'queue.sqlite'), max_attempts=2)
+        assert queue.enqueue([('US-GA', {'pages': [1, 2]}), ('IN', None)]) == 2
+        assert queue.enqueue([('US-GA', None)]) == 0, "Existing keys are not queued twice"
+
+        stale = queue.lease('w1', lease_seconds=0.05)
+        assert stale.key == 'US-GA' and stale.payload == {'pages': [1, 2]} and stale.attempt == 1
+        other = queue.lease('w2', lease_seconds=30)
+        assert other.key == 'IN'
+        time.sleep(0.1)
+        taken = queue.lease('w2', lease_seconds=30)
+        assert taken.key == 'US-GA' and taken.attempt == 2, "Expired lease goes to the next worker"
+        assert not queue.heartbeat(stale, 30) and not queue.complete(stale, {}), "Old owner lost the item"
+        assert queue.complete(taken, {'pages': ['US-GA/page-00001.ndjson.gz']})
+
+        assert queue.fail(other, 'timeout')
+        retry = queue.lease('w3', lease_seconds=30)
+        assert retry.key == 'IN' and retry.attempt == 2
+        assert queue.fail(retry, 'timeout again')
+        assert queue.lease('w3', lease_seconds=30) is None
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 1}
+        assert queue.results() == [('US-GA', {'pages': ['US-GA/page-00001.ndjson.gz']})]
+        assert queue.failures() == [('IN', 'timeout again')]
+    print("   ✓ Takeover, retry and failure states recorded")
+
+def test_heartbeat_keeps_lease():
+    print("\n2. Testing heartbeats keep a long-running lease...")
+    with tempfile.TemporaryDirectory() as root:
+        queue = LeaseQueue(os.path.join(root, 'queue.sqlite'))
+        queue.enqueue([('US-CA', None)])
+        lease = queue.lease('w1', lease_seconds=0.3)
+        with Heartbeat(queue, lease, 0.3, interval=0.05) as heartbeat:
+            time.sleep(0.6)
+            assert queue.lease('w2', lease_seconds=30) is None, "Renewed lease must not be taken over"
+        heartbeat.check()
+        assert queue.complete(lease)
+    print("   ✓ Lease renewed past its initial expiry")
+
+def test_workers_take_each_item_once():
+    print("\n3. Testing parallel worker processes complete every item once...")
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'queue.sqlite')
+        LeaseQueue(path).enqueue((f"region-{i}", None) for i in range(60))
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            done = [key for keys in executor.map(drain, [path] * 4, [f"w{i}" for i in range(4)]) for key in keys]
+        assert sorted(done) == sorted(f"region-{i}" for i in range(60)), "Each item leased exactly once"
+        assert LeaseQueue(path).counts()['done'] == 60
+    print("   ✓ 60 items, no duplicates across 4 processes")
+
+def test_queued_run_end_to_end():
+    print("\n4. Testing two queue workers against the simulated API, then the merge...")
+    served = {'US-GA': 2, 'IN': 2, 'CA': 1}
+    with SimulatedApi(served, page_records=10) as api, tempfile.TemporaryDirectory() as tmp:
+        merged, direct = os.path.join(tmp, 'merged'), os.path.join(tmp, 'direct')
+        attempts = {}
+        lock = threading.Lock()
+        stray_page = generate_epds(1, seed='stray', regions=['IN'])
+
+        def run_queue():
+            pf = load_product_footprints(api.url)
+            pf.QUEUE_LEASE_SECONDS = 0.3
+            pf.QUEUE_POLL_SECONDS = 0.05
+            fetch_epd_pages = pf.fetch_epd_pages
+
+            def flaky_fetch(region, auth_state):
+                with lock:
+                    attempts[region] = attempt = attempts.get(region, 0) + 1
+                if region == 'MX' or (region == 'CA' and attempt == 1):
+                    raise ConnectionError(f"{region} unavailable")
+                yield from fetch_epd_pages(region, auth_state)
+                if region == 'IN' and attempt == 1:
+                    # Archive a stray page, then lose the lease before completing the region
+                    yield 3, 3, stray_page
+                    connection = sqlite3.connect(pf.queue_path(run_id))
+                    connection.execute("UPDATE items SET owner = 'other', lease_expires = 0 WHERE key = 'IN'")
+                    connection.commit()
+                    connection.close()
+                    time.sleep(pf.QUEUE_LEASE_SECONDS)
+
+            pf.fetch_epd_pages = flaky_fetch
+            run_id = pf.enqueue_regions(['US-GA', 'IN', 'CA', 'MX', 'FR'])
+            workers = [threading.Thread(target=pf.run_queue_worker, args=(run_id, f"worker-{i}")) for i in range(2)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            _, queue = pf.open_queue(run_id)
+            assert pf.merge_queue_outputs(run_id, workers=2)
+            archived = run_pages(pf.ARCHIVE_DIR, run_id)
+            return queue, {region: [read_page(path) for path in files] for region, files in archived.items()}
+
+        def write_directly():
+            pf = load_product_footprints()
+            for region, pages in api.pages.items():
+                records = [epd for page in pages for epd in pf.normalize_page(json.loads(page))[0]]
+                pf.write_region_outputs(region, records)
+            pf.save_gwp_sketches()
+            pf.save_dimension_tables()
+
+        queue, archived = in_workdir(merged, run_queue)
+        in_workdir(direct, write_directly)
+        merged_files, direct_files = tree(merged), tree(direct)
+    assert attempts == {'US-GA': 1, 'IN': 2, 'CA': 2, 'MX': 3, 'FR': 1}, attempts
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 4, 'failed': 1}
+    assert queue.failures() == [('MX', 'MX unavailable')]
+    results = dict(queue.results())
+    assert results['FR'] == {'manifest': results['FR']['manifest'], 'pages': [], 'epds': 0}
+    assert results['IN']['pages'] == ['IN/page-00001.ndjson.gz', 'IN/page-00002.ndjson.gz'] and results['IN']['epds'] == 20
+    # The manifests still list the stray page of the lost lease; the merge must not use it
+    assert archived['IN'][-1] == stray_page
+    assert merged_files.keys() == direct_files.keys(), set(merged_files) ^ set(direct_files)
+    different = [path for path in merged_files if merged_files[path] != direct_files[path]]
+    assert not different, f"Files differ: {different[:5]}"
+    print(f"   ✓ Retried, failed and taken-over regions handled; merge wrote the {len(merged_files)} files of a direct write")
+
+if __name__ == "__main__":
+    try:
+        test_lease_expiry_and_retries()
+        test_heartbeat_keeps_lease()
+        test_workers_take_each_item_once()
+        test_queued_run_end_to_end()
+        print("\n✅ All work queue tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        sys.exit(1)
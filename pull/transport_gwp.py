@@ -0,0 +1,176 @@
+"""
+Batch transport-adjusted GWP (A4 stage) for candidate products and project sites.
+Implements the README adjustment:
+
+    Adjusted GWP = gwp + (actual transport impact - default transport impact)
+    transport impact = distance (km) x mass_per_declared_unit (kg) x factor (kgCO2e/ton-km) / 1000
+
+for every product x destination pair at once, using a NumPy great-circle distance matrix.
+"""
+import argparse
+import csv
+import re
+import sys
+
+import numpy as np
+
+from catalog import DEFAULT_BASE_PATH, iter_epds, parse_quantity, quantity_unit
+from plant_index import haversine_matrix
+
+# Typical emission factors in kgCO2e per ton-km. Override per call with emission_factors=.
+EMISSION_FACTORS = {
+    'truck': 0.062,  # diesel truck (README value)
+    'rail': 0.022,
+    'barge': 0.031,
+    'ship': 0.016,   # container ship
+    'air': 0.602,
+}
+DEFAULT_MODE = 'truck'
+
+_MASS_TO_KG = {'kg': 1.0, 'g': 0.001, 't': 1000.0, 'ton': 1000.0, 'tonne': 1000.0, 'lb': 0.45359237, 'lbs': 0.45359237}
+_DISTANCE_TO_KM = {'km': 1.0, 'm': 0.001, 'mi': 1.609344, 'mile': 1.609344, 'miles': 1.609344}
+
+def _converted(value, factors, default_unit):
+    number = parse_quantity(value)
+    if number is None:
+        return np.nan
+    unit = (quantity_unit(value) or default_unit).lower()
+    return number * factors.get(unit, np.nan)
+
+# Other words for the modes in category default_transport_mode texts
+_MODE_SYNONYMS = {
+    'lorry': 'truck',
+    'road': 'truck',
+    'train': 'rail',
+    'railway': 'rail',
+    'railroad': 'rail',
+    'vessel': 'ship',
+    'sea': 'ship',
+    'ocean': 'ship',
+    'aircraft': 'air',
+    'airfreight': 'air',
+    'air freight': 'air',
+}
+
+def transport_mode(mode_text):
+    """
+    Map a category default_transport_mode such as "truck, unspecified" to an EMISSION_FACTORS key.
+    Only whole words count (an optional plural s included), so "trailer" is not rail.
+    """
+    text = (mode_text or '').lower()
+    for word, mode in [(mode, mode) for mode in EMISSION_FACTORS] + list(_MODE_SYNONYMS.items()):
+        if re.search(rf'\b{word}s?\b', text):
+            return mode
+    return DEFAULT_MODE
+
+def product_arrays(epds):
+    """
+    Columns needed for the calculation, one entry per product.
+
+    Returns:
+        Dict of NumPy arrays: material_id, name, latitude, longitude, gwp, mass_kg,
+        default_distance_km and default_mode. Missing numbers are NaN.
+    """
+    rows = []
+    for item in epds:
+        epd = item[1] if isinstance(item, tuple) else item
+        plant = epd.get('plant_or_group') or {}
+        category = epd.get('category') or {}
+        rows.append((
+            epd.get('material_id') or '',
+            epd.get('name') or '',
+            parse_quantity(plant.get('latitude')),
+            parse_quantity(plant.get('longitude')),
+            parse_quantity(epd.get('gwp')),
+            _converted(epd.get('mass_per_declared_unit'), _MASS_TO_KG, 'kg'),
+            _converted(category.get('default_distance'), _DISTANCE_TO_KM, 'km'),
+            transport_mode(category.get('default_transport_mode')),
+        ))
+    columns = list(zip(*rows)) if rows else [()] * 8
+    as_float = lambda values: np.array([np.nan if v is None else v for v in values], dtype=float)
+    return {
+        'material_id': np.array(columns[0], dtype=object),
+        'name': np.array(columns[1], dtype=object),
+        'latitude': as_float(columns[2]),
+        'longitude': as_float(columns[3]),
+        'gwp': as_float(columns[4]),
+        'mass_kg': as_float(columns[5]),
+        'default_distance_km': as_float(columns[6]),
+        'default_mode': np.array(columns[7], dtype=object),
+    }
+
+def adjusted_gwp_matrix(products, dest_lat, dest_lon, mode=DEFAULT_MODE, emission_factors=None, circuity=1.0):
+    """
+    Transport-adjusted GWP for every product (rows) at every destination (columns).
+
+    Args:
+        products: Output of product_arrays
+        dest_lat, dest_lon: Destination coordinates in degrees
+        mode: Transport mode to the destinations (key of the emission factor table)
+        emission_factors: Optional overrides for EMISSION_FACTORS
+        circuity: Road/rail distance as a multiple of great-circle distance (1.0 = straight line)
+
+    Returns:
+        Dict with 'distance_km' and 'transport_gwp' and 'adjusted_gwp' (products x destinations),
+        and 'default_transport_gwp' (per product). NaN where inputs are missing.
+    """
+    factors = dict(EMISSION_FACTORS, **(emission_factors or {}))
+    if mode not in factors:
+        raise ValueError(f"Unknown transport mode: {mode} (known: {', '.join(sorted(factors))})")
+
+    distance = haversine_matrix(products['latitude'], products['longitude'], dest_lat, dest_lon) * circuity
+    mass_tons = products['mass_kg'] / 1000
+    default_factor = np.array([factors.get(m, factors[DEFAULT_MODE]) for m in products['default_mode']], dtype=float)
+
+    default_transport = products['default_distance_km'] * mass_tons * default_factor
+    transport = distance * (mass_tons * factors[mode])[:, None]
+    adjusted = products['gwp'][:, None] + transport - default_transport[:, None]
+    return {
+        'distance_km': distance,
+        'transport_gwp': transport,
+        'default_transport_gwp': default_transport,
+        'adjusted_gwp': adjusted,
+    }
+
+def read_sites(path):
+    """Read destination sites from a CSV with name, latitude and longitude columns"""
+    names, lats, lons = [], [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            names.append(row.get('name') or row.get('Name') or f"site{len(names) + 1}")
+            lats.append(float(row.get('latitude') or row.get('Latitude') or row['lat']))
+            lons.append(float(row.get('longitude') or row.get('Longitude') or row['lon']))
+    return names, np.array(lats), np.array(lons)
+
+def write_matrix_csv(path, products, site_names, values):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['material_id', 'name'] + list(site_names))
+        for i in range(len(products['material_id'])):
+            writer.writerow([products['material_id'][i], products['name'][i]] +
+                            ['' if np.isnan(v) else round(float(v), 4) for v in values[i]])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transport-adjusted GWP for every product x project site")
+    parser.add_argument('--sites', required=True, help="CSV with name, latitude, longitude columns")
+    parser.add_argument('--category', help="Only products in this category (display name or id)")
+    parser.add_argument('--mode', default=DEFAULT_MODE, choices=sorted(EMISSION_FACTORS))
+    parser.add_argument('--circuity', type=float, default=1.0, help="Route distance / great-circle distance")
+    parser.add_argument('--base-path', default=DEFAULT_BASE_PATH)
+    parser.add_argument('--output', default="transport_adjusted_gwp.csv")
+    args = parser.parse_args()
+
+    def selected(items):
+        for path, epd in items:
+            category = epd.get('category') or {}
+            if not args.category or args.category in (category.get('id'), category.get('display_name')):
+                yield epd
+
+    products = product_arrays(selected(iter_epds(args.base_path)))
+    if not len(products['material_id']):
+        print("No products found")
+        sys.exit(1)
+    site_names, site_lats, site_lons = read_sites(args.sites)
+    result = adjusted_gwp_matrix(products, site_lats, site_lons, args.mode, circuity=args.circuity)
+    write_matrix_csv(args.output, products, site_names, result['adjusted_gwp'])
+    print(f"✓ Adjusted GWP for {len(products['material_id'])} products x {len(site_names)} sites saved to: {args.output}")
@@ -0,0 +1,213 @@
+"""
+File-backed work queue with leases, for spreading a pull across worker processes and hosts.
+
+Items live in one SQLite file. A worker leases an item for a number of seconds and renews the
+lease with heartbeats while it works; an item whose lease expires (worker crashed or lost the
+volume) is handed to the next worker that asks. Completed items keep a JSON result for the
+coordinator. No broker is needed: workers on several hosts only share the directory.
+
+Leases compare wall-clock times, so hosts sharing a queue need synchronized clocks. The database
+uses SQLite's default rollback journal rather than WAL, which does not work on network volumes.
+
+Usage:
+    queue = LeaseQueue('page-archive/20260101T000000Z/queue.sqlite')
+    queue.enqueue([('US-GA', None), ('IN', None)])
+    lease = queue.lease('host-1234', lease_seconds=120)
+    with Heartbeat(queue, lease, 120) as heartbeat:
+        ...
+    queue.complete(lease, {'pages': 3})
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+Lease = namedtuple('Lease', ['id', 'key', 'payload', 'owner', 'attempt'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+"""
+
+class LeaseLost(Exception):
+    """The lease expired and another worker took the item over"""
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseQueue:
+    """
+    SQLite-backed queue of keyed items. Safe to use from several threads, processes and hosts.
+
+    Item states: pending -> leased -> done, or back to pending on fail/expiry until
+    max_attempts leases have been used, then failed.
+    """
+
+    def __init__(self, path, max_attempts=3, timeout=60):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit mode; writes take the database lock with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def _write(self, sql, params=()):
+        return self._connection().execute(sql, params).rowcount
+
+    def enqueue(self, items):
+        """
+        Add (key, payload) items; keys already in the queue are left as they are.
+        Returns: Number of items added
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            added = 0
+            for key, payload in items:
+                added += connection.execute(
+                    "INSERT OR IGNORE INTO items (key, payload, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(payload), time.time())).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, owner, lease_seconds):
+        """
+        Lease the oldest pending item, or an item whose lease has expired.
+        Returns: Lease, or None if nothing is available right now
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            # Items that used up their attempts while leased (their worker kept dying) are given up
+            connection.execute(
+                "UPDATE items SET state = 'failed', owner = NULL, error = 'lease expired', updated_at = ? "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, self.max_attempts))
+            row = connection.execute(
+                "SELECT id, key, payload, attempts FROM items "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,)).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE items SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?", (owner, now + lease_seconds, now, row[0]))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return Lease(row[0], row[1], json.loads(row[2]) if row[2] else None, owner, row[3] + 1)
+
+    def heartbeat(self, lease, lease_seconds):
+        """Extend a lease. Returns False if it was lost to another worker."""
+        now = time.time()
+        return self._write(
+            "UPDATE items SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+            (now + lease_seconds, now, lease.id, lease.owner)) == 1
+
+    def complete(self, lease, result=None):
+        """Mark a leased item done with a JSON result. Returns False if the lease was lost."""
+        return self._write(
+            "UPDATE items SET state = 'done', result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (json.dumps(result), time.time(), lease.id, lease.owner)) == 1
+
+    def fail(self, lease, error):
+        """Release a leased item after an error: pending again, or failed after max_attempts."""
+        return self._write(
+            "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (self.max_attempts, str(error), time.time(), lease.id, lease.owner)) == 1
+
+    def counts(self):
+        """Items per state, e.g. {'pending': 3, 'leased': 2, 'done': 50, 'failed': 0}"""
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for state, count in self._connection().execute("SELECT state, COUNT(*) FROM items GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def active(self):
+        """Items still pending or leased"""
+        counts = self.counts()
+        return counts['pending'] + counts['leased']
+
+    def results(self):
+        """(key, result) of done items in queue order"""
+        rows = self._connection().execute("SELECT key, result FROM items WHERE state = 'done' ORDER BY id")
+        return [(key, json.loads(result) if result else None) for key, result in rows]
+
+    def failures(self):
+        """(key, error) of failed items in queue order"""
+        return list(self._connection().execute("SELECT key, error FROM items WHERE state = 'failed' ORDER BY id"))
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class Heartbeat:
+    """
+    Renews a lease from a background thread while the with-block runs.
+    `lost` is set when a renewal finds the item taken over; long loops should check it.
+    """
+
+    def __init__(self, queue, lease, lease_seconds, interval=None):
+        self.queue = queue
+        self.lease = lease
+        self.lease_seconds = lease_seconds
+        self.interval = interval or lease_seconds / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not self.queue.heartbeat(self.lease, self.lease_seconds):
+                        self.lost = True
+                        return
+                except sqlite3.OperationalError:
+                    pass  # database busy; the next beat retries before the lease runs out
+        finally:
+            self.queue.close()  # this thread's connection
+
+    def check(self):
+        if self.lost:
+            raise LeaseLost(f"Lease on {self.lease.key} was taken over")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False